@@ -43,6 +43,23 @@ export interface CouponLeg {
     horses: CouponHorse[];
 }
 
+// Pre-aggregated stats (period 'all' | 'YYYY-MM' | 'YYYY-Www'; city / strategy value or 'all')
+export interface CouponStat {
+    period: string;
+    period_type: 'all' | 'month' | 'week';
+    city: string;
+    strategy: string;
+    coupons: number;
+    pending: number;
+    won: number;
+    lost: number;
+    hit_rate: number;
+    legs_dist: number[]; // legs_dist[k] = settled coupons with k legs caught
+    cost: number;
+    returns: number;
+    roi: number;
+}
+
 export interface CouponHorse {
     program_no: number;
     horse_name: string;
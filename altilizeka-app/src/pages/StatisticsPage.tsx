@@ -1,14 +1,15 @@
 
 import { useEffect, useState } from 'react';
 import { supabase } from '../lib/supabase';
-import type { Coupon } from '../lib/supabase';
+import type { Coupon, CouponStat } from '../lib/supabase';
 import { TopBar } from '../components/TopBar';
 import { BottomNav } from '../components/BottomNav';
 
 export function StatisticsPage() {
     const [history, setHistory] = useState<Coupon[]>([]);
     const [isLoading, setIsLoading] = useState(true);
-    const [stats, setStats] = useState({ totalProfit: 0, winRate: 0, totalCoupons: 0 });
+    const [stats, setStats] = useState({ totalProfit: 0, winRate: 0, totalCoupons: 0, rate5: 0, rate4: 0 });
+    const [cityStats, setCityStats] = useState<{ rank: number; city: string; count: number }[]>([]);
 
     useEffect(() => {
         // Auto-seed for verification if empty
@@ -50,21 +51,34 @@ export function StatisticsPage() {
             .order('date', { ascending: false })
             .limit(10); // Last 10 days
 
-        if (data) {
-            setHistory(data);
+        if (data) setHistory(data);
 
-            // Calculate Stats
-            const completed = data.filter(c => c.status === 'won' || c.status === 'lost');
-            const wins = data.filter(c => c.status === 'won');
-            const profit = wins.reduce((acc, c) => acc + (c.winning_amount || 0), 0);
-            const rate = completed.length > 0 ? (wins.length / completed.length) * 100 : 0;
+        // Stats come pre-aggregated (stats_aggregates.py): a few rows instead of every coupon
+        const { data: statRows } = await supabase
+            .from('coupon_stats')
+            .select('*')
+            .eq('period', 'all')
+            .eq('strategy', 'all');
+
+        const rows: CouponStat[] = statRows || [];
+        const total = rows.find(r => r.city === 'all');
+        if (total) {
+            const settled = total.won + total.lost;
+            const share = (k: number) => settled > 0 ? Math.round((total.legs_dist[k] || 0) / settled * 100) : 0;
 
             setStats({
-                totalProfit: profit,
-                winRate: Math.round(rate),
-                totalCoupons: completed.length
+                totalProfit: total.returns,
+                winRate: Math.round(total.hit_rate * 100),
+                totalCoupons: settled,
+                rate5: share(5),
+                rate4: share(4)
             });
         }
+        setCityStats(rows
+            .filter(r => r.city !== 'all')
+            .sort((a, b) => b.coupons - a.coupons)
+            .slice(0, 5)
+            .map((r, i) => ({ rank: i + 1, city: r.city, count: r.coupons })));
         setIsLoading(false);
     };
 
@@ -79,7 +93,7 @@ export function StatisticsPage() {
                         <span className="material-symbols-outlined text-accent-gold" style={{ fontSize: '24px', fontVariationSettings: "'FILL' 1" }}>psychology</span>
                         <h1 className="text-xl font-bold tracking-tight text-white">Kahin v10 AI</h1>
                     </div>
-                    <p className="text-gray-400 text-xs">Son 15 Gün Performansı</p>
+                    <p className="text-gray-400 text-xs">Genel Performans</p>
                 </div>
 
                 {isLoading ? (
@@ -104,16 +118,16 @@ export function StatisticsPage() {
                                 <div className="bg-card-dark border border-white/10 rounded-xl p-3">
                                     <h3 className="text-white font-bold text-xs">5/6 İsabet</h3>
                                     <div className="flex items-end justify-between mt-1">
-                                        <span className="text-gray-500 text-[10px]">Yaklaşık</span>
-                                        <span className="text-lg font-bold text-white">%21</span>
+                                        <span className="text-gray-500 text-[10px]">{stats.totalCoupons} kupon</span>
+                                        <span className="text-lg font-bold text-white">%{stats.rate5}</span>
                                     </div>
                                 </div>
                                 {/* 4/6 */}
                                 <div className="bg-card-dark border border-white/10 rounded-xl p-3">
                                     <h3 className="text-white font-bold text-xs">4/6 İsabet</h3>
                                     <div className="flex items-end justify-between mt-1">
-                                        <span className="text-gray-500 text-[10px]">Yaklaşık</span>
-                                        <span className="text-lg font-bold text-white">%14</span>
+                                        <span className="text-gray-500 text-[10px]">{stats.totalCoupons} kupon</span>
+                                        <span className="text-lg font-bold text-white">%{stats.rate4}</span>
                                     </div>
                                 </div>
                             </div>
@@ -123,13 +137,7 @@ export function StatisticsPage() {
                         <div className="mb-8">
                             <h3 className="text-xs font-bold text-gray-400 uppercase tracking-wider mb-3 pl-1">Şehir Dağılımı</h3>
                             <div className="bg-card-dark border border-white/10 rounded-xl overflow-hidden divide-y divide-white/5">
-                                {[
-                                    { rank: 1, city: 'Gulfstream', count: 3 },
-                                    { rank: 2, city: 'Santa Anita', count: 3 },
-                                    { rank: 3, city: 'Lingfield', count: 2 },
-                                    { rank: 4, city: 'İstanbul', count: 2 },
-                                    { rank: 5, city: 'Şanlıurfa', count: 2 },
-                                ].map((item, i) => (
+                                {cityStats.map((item, i) => (
                                     <div key={i} className="flex items-center justify-between p-3 hover:bg-white/5 transition-colors">
                                         <div className="flex items-center gap-3">
                                             <span className="text-xs font-bold text-gray-600 w-4 text-center">{item.rank}</span>
@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react';
 import { supabase } from '../lib/supabase';
+import type { CouponStat } from '../lib/supabase';
 import { BottomNav } from '../components/BottomNav';
 
 interface StatsData {
@@ -19,50 +20,19 @@ export function StatsPage() {
 
     useEffect(() => {
         const fetchStats = async () => {
-            // Get coupon counts
-            const { count: totalCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true });
-
-            const { count: freeCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true })
-                .eq('type', 'free');
-
-            const { count: premiumCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true })
-                .eq('type', 'premium');
-
-            // Win/Loss/Pending counts
-            const { count: wonCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true })
-                .eq('status', 'won');
-
-            const { count: lostCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true })
-                .eq('status', 'lost');
-
-            const { count: pendingCount } = await supabase
-                .from('coupons')
-                .select('*', { count: 'exact', head: true })
-                .eq('status', 'pending');
-
-            // Get city distribution
-            const { data: cityData } = await supabase
-                .from('coupons')
-                .select('city');
-
-            const cityMap = new Map<string, number>();
-            cityData?.forEach((c) => {
-                const city = c.city.split(' ')[0];
-                cityMap.set(city, (cityMap.get(city) || 0) + 1);
-            });
-
-            const cities = Array.from(cityMap.entries())
-                .map(([city, count]) => ({ city, count }))
+            // Pre-aggregated all-time rows (stats_aggregates.py) instead of counting coupons
+            const { data: statRows } = await supabase
+                .from('coupon_stats')
+                .select('city, strategy, coupons, pending, won, lost')
+                .eq('period', 'all');
+
+            const rows: Pick<CouponStat, 'city' | 'strategy' | 'coupons' | 'pending' | 'won' | 'lost'>[] = statRows || [];
+            const row = (city: string, strategy: string) => rows.find(r => r.city === city && r.strategy === strategy);
+            const total = row('all', 'all');
+
+            const cities = rows
+                .filter(r => r.strategy === 'all' && r.city !== 'all')
+                .map(r => ({ city: r.city.split(' ')[0], count: r.coupons }))
                 .sort((a, b) => b.count - a.count)
                 .slice(0, 5);
 
@@ -81,12 +51,12 @@ export function StatsPage() {
             })) || [];
 
             setStats({
-                totalCoupons: totalCount || 0,
-                freeCoupons: freeCount || 0,
-                premiumCoupons: premiumCount || 0,
-                wonCoupons: wonCount || 0,
-                lostCoupons: lostCount || 0,
-                pendingCoupons: pendingCount || 0,
+                totalCoupons: total?.coupons || 0,
+                freeCoupons: row('all', 'free')?.coupons || 0,
+                premiumCoupons: row('all', 'premium')?.coupons || 0,
+                wonCoupons: total?.won || 0,
+                lostCoupons: total?.lost || 0,
+                pendingCoupons: total?.pending || 0,
                 cities,
                 recentResults,
             });
@@ -121,3 +121,37 @@ INSERT INTO coupons (date, city, type, star_cost, title, subtitle, legs) VALUES
    '[{"leg_no": 1, "race_time": "21:00", "field_size": 12, "horses": [{"program_no": 9, "horse_name": "DEMİR PENÇE", "is_banko": true, "ai_note": "Bugün banko tercihimiz. Jokey değişikliği %15 performans artışı sağlayabilir."}]}]'::jsonb),
   (CURRENT_DATE, 'Bursa Osmangazi', 'premium', 50, 'Bursa Altılısı Tahmini', 'ÖZEL ANALİZ',
    '[{"leg_no": 1, "race_time": "18:30", "field_size": 9, "horses": [{"program_no": 3, "horse_name": "KAPLAN", "is_banko": true, "ai_note": "Form grafiği çok iyi, mesafe avantajı var."}]}]'::jsonb);
+
+-- 8. Coupon budget/probability frontier (bigger/smaller coupon variants)
+-- {"unit": 1.25, "legs": [[ranked horse names]], "points": [[cost, prob, [k1..k6]]]}
+ALTER TABLE coupons ADD COLUMN IF NOT EXISTS frontier JSONB;
+
+-- 9. One coupon per (date, city, type): conflict target for bulk upserts
+-- (POST /coupons?on_conflict=date,city,type, Prefer: resolution=merge-duplicates)
+ALTER TABLE coupons ADD CONSTRAINT coupons_date_city_type_key UNIQUE (date, city, type);
+
+-- 10. Pre-aggregated coupon statistics (stats_aggregates.py)
+-- period: 'all' | 'YYYY-MM' | 'YYYY-Www'; city / strategy (coupon type): value or 'all'
+-- legs_dist[k] = settled coupons with k legs caught
+CREATE TABLE IF NOT EXISTS coupon_stats (
+  period TEXT NOT NULL,
+  period_type TEXT NOT NULL CHECK (period_type IN ('all', 'month', 'week')),
+  city TEXT NOT NULL,
+  strategy TEXT NOT NULL,
+  coupons INTEGER DEFAULT 0,
+  pending INTEGER DEFAULT 0,
+  won INTEGER DEFAULT 0,
+  lost INTEGER DEFAULT 0,
+  hit_rate DECIMAL(6,4) DEFAULT 0,
+  legs_dist JSONB DEFAULT '[]'::jsonb,
+  cost DECIMAL(12,2) DEFAULT 0,
+  returns DECIMAL(12,2) DEFAULT 0,
+  roi DECIMAL(8,4) DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (period, city, strategy)
+);
+
+ALTER TABLE coupon_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view coupon stats" ON coupon_stats
+  FOR SELECT TO authenticated, anon USING (true);
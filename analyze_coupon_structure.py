@@ -1,57 +1,54 @@
-
-import sqlite3
+import tjk_db
 import pandas as pd
-import json
+import argparse
+from datetime import datetime
+
+from coupon_store import load_coupons
 
 DB_NAME = "tjk_races.db"
 
-def analyze_structure():
-    conn = sqlite3.connect(DB_NAME)
-    
-    # Parse daily_forecasts.sql
-    coupons = []
-    try:
-        with open('daily_forecasts.sql', 'r') as f:
-            for line in f:
-                if "VALUES" in line:
-                    # Extract city and legs JSON
-                    # Format: ... VALUES ('date', 'City', ..., 'JSON')
-                    parts = line.split("'")
-                    city = parts[3]
-                    legs_json = parts[-2]
-                    coupons.append({'city': city, 'legs': legs_json})
-    except:
-        print("Could not read daily_forecasts.sql")
+def analyze_structure(date_str, source=None):
+    conn = tjk_db.connect(DB_NAME)
+
+    # Coupons straight from the local store (no SQL text parsing)
+    coupons = load_coupons(conn, date=date_str, source=source)
+    if not coupons:
+        print(f"No coupons stored for {date_str}")
+        conn.close()
         return
-        
-    df_coupons = pd.DataFrame(coupons)
-    
-    for _, row in df_coupons.iterrows():
-        print(f"\n🏙️  ANALYSIS: {row['city']}")
-        legs = json.loads(row['legs'])
-        
-        for leg in legs:
+
+    for coupon in coupons:
+        print(f"\n🏙️  ANALYSIS: {coupon.city}")
+
+        for leg in coupon.legs:
             lid = leg['leg_no']
             sel_count = len(leg['horses'])
             sel_names = [h['horse_name'] for h in leg['horses']]
-            
-            # Find Race Info (Field Size)
-            # We need to match leg_no to race_no. Usually Leg 1 is Race X.
-            # We can't easily query race_no from here without the mapping, 
-            # but we can try to find these horses in program_entries for that date/city to count field size.
-            
-            ph = ','.join([f"'{n}'" for n in sel_names])
-            q = f"""
-            SELECT pr.race_no, COUNT(*) as field_size 
-            FROM program_entries pe 
-            JOIN program_races pr ON pe.program_race_id = pr.id 
-            WHERE pr.city LIKE '{row['city']}%' AND pr.date='19/01/2026'
-            AND pr.race_no IN (SELECT race_no FROM program_entries pe2 JOIN program_races pr2 ON pe2.program_race_id=pr2.id WHERE pe2.horse_name IN ({ph}) AND pr2.date='19/01/2026')
-            GROUP BY pr.race_no
-            """
-            
+
+            # Field size of the leg's race; older coupons without race_no are matched via their horses
+            if leg.get('race_no'):
+                q = """
+                SELECT pr.race_no, COUNT(*) as field_size
+                FROM program_entries pe
+                JOIN program_races pr ON pe.program_race_id = pr.id
+                WHERE pr.city LIKE ? AND pr.date = ? AND pr.race_no = ?
+                GROUP BY pr.race_no
+                """
+                params = [f"{coupon.city}%", date_str, int(leg['race_no'])]
+            else:
+                ph = ','.join(['?'] * len(sel_names))
+                q = f"""
+                SELECT pr.race_no, COUNT(*) as field_size
+                FROM program_entries pe
+                JOIN program_races pr ON pe.program_race_id = pr.id
+                WHERE pr.city LIKE ? AND pr.date = ?
+                AND pr.race_no IN (SELECT race_no FROM program_entries pe2 JOIN program_races pr2 ON pe2.program_race_id=pr2.id WHERE pe2.horse_name IN ({ph}) AND pr2.date = ?)
+                GROUP BY pr.race_no
+                """
+                params = [f"{coupon.city}%", date_str] + sel_names + [date_str]
+
             try:
-                res = pd.read_sql_query(q, conn)
+                res = pd.read_sql_query(q, conn, params=params)
                 if not res.empty:
                     field_size = res.iloc[0]['field_size']
                     race_no = res.iloc[0]['race_no']
@@ -59,8 +56,16 @@ def analyze_structure():
                     print(f"  Leg {lid} (Race {race_no}): Field {field_size} -> Selected {sel_count} ({ratio:.0%})")
                     if ratio > 0.6: print(f"    ⚠️ OVER-COVERAGE: Covered >60% of field!")
                     if field_size > 12 and sel_count < 3: print(f"    ⚠️ RISKY: Large field ({field_size}) but only {sel_count} horses!")
-            except:
+                else:
+                    print(f"  Leg {lid}: Could not determine field size.")
+            except Exception:
                 print(f"  Leg {lid}: Could not determine field size.")
 
+    conn.close()
+
 if __name__ == "__main__":
-    analyze_structure()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", default=datetime.now().strftime("%d/%m/%Y"), help="DD/MM/YYYY (default: today)")
+    parser.add_argument("--source", help="Only coupons from this generator (e.g. push_forecasts_v10)")
+    args = parser.parse_args()
+    analyze_structure(args.date, args.source)
@@ -1,5 +1,5 @@
 
-import sqlite3
+import tjk_db
 import pandas as pd
 import joblib
 import sys
@@ -12,6 +12,7 @@ from production_engine import (
     optimize_coupon_logic, # Using the Updated Smart Logic
     DB_NAME
 )
+from hit_check import check_coupons, MISSED, NOT_IN_FIELD
 
 # Load Models Once
 try:
@@ -27,7 +28,7 @@ except:
 
 def analyze_date(target_date):
     print(f"\n🔎 ANALYZING {target_date}...")
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     # Get Cities with Results
     q_cities = f"SELECT DISTINCT city FROM races WHERE date='{target_date}'"
@@ -239,31 +240,27 @@ def analyze_date(target_date):
         print("    🧠 Simulating Smart Coupon...")
         try:
             sel, cost = optimize_coupon_logic(legs_data, 750.0) # Use new logic
-            caught = 0
-            for i, s in enumerate(sel):
-                r = legs[i]
+            winners = []
+            for r in legs:
                 w_row = res_df[res_df['race_no'] == r]
-                if w_row.empty: continue
-                winner = w_row.iloc[0]['winner']
-                
-                # Check coverage
-                # Must handle name mismatch
-                covered = False
-                for h in s:
-                    if h[0] == winner or winner in h[0] or h[0] in winner:
-                        covered = True
-                        break
-                
-                if covered: caught += 1
-                else:
-                     print(f"      ❌ Missed Leg {i+1}: Winner {winner} not in {[h[0] for h in s]}")
-                     # Deep Debug
-                     try:
-                        w_row_df = entries[entries['horse_name'].str.contains(winner[:5], case=False)]
-                        if not w_row_df.empty:
-                            wd = w_row_df.iloc[0]
-                            print(f"         🔍 WHY? Score: {wd['score']:.2f} | Chaos: {wd['quantum_chaos']:.2f} | Galop: {wd['galop_score']:.2f} | Mom: {wd['momentum_5']:.2f} | Jock: {wd['combo_win_rate']:.2f}")
-                     except: pass
+                winners.append(w_row.iloc[0]['winner'] if not w_row.empty else None)
+            res = check_coupons([sel], [winners], fields=[legs_data])
+            caught = int(res['legs_caught'][0])
+            for i, s in enumerate(sel):
+                if res['status'][0][i] not in (MISSED, NOT_IN_FIELD): continue
+                winner = winners[i]
+                print(f"      ❌ Missed Leg {i+1}: Winner {winner} not in {[h[0] for h in s]}")
+                if res['status'][0][i] == NOT_IN_FIELD:
+                    print("         🔍 WHY? Winner not in our field (name mismatch / late entry)")
+                    continue
+                # Deep Debug
+                try:
+                    leg_df = df[df['race_no'] == legs[i]]
+                    w_row_df = leg_df[leg_df['horse_name'].str.contains(winner[:5], case=False)]
+                    if not w_row_df.empty:
+                        wd = w_row_df.iloc[0]
+                        print(f"         🔍 WHY? Score: {wd['score']:.2f} | Chaos: {wd['quantum_chaos']:.2f} | Galop: {wd['galop_score']:.2f} | Mom: {wd['momentum_5']:.2f} | Jock: {wd['combo_win_rate']:.2f}")
+                except: pass
             
             print(f"    🏷️  Cost: {cost:.2f} TL | Caught: {caught}/6")
             
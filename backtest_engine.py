@@ -0,0 +1,308 @@
+"""
+Backtest Engine - Paralel Çok Günlü Backtest
+============================================
+Shards (date, city) work units across a process pool. Every worker opens the
+DB read-only (or a snapshot copy) once and loads the models once in its
+initializer; per-unit results are merged in unit order, so the output is the
+same for any --workers N.
+
+Per unit:
+  - per race: top-1 / top-3 accuracy of ai_prob,
+  - the last altılı coupon (optimize_pool on score) with caught legs.
+
+Usage:
+    python backtest_engine.py --days 15 --workers 4
+    python backtest_engine.py --since 2026-01-01 --city Antalya --workers 8
+    python backtest_engine.py --dates 01/01/2026 02/01/2026 --model model_honest
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+import tjk_db
+from tjk_db import connect_readonly
+from production_engine import add_v10_features, compute_galop_features, V10_FEATURES
+from pools import make_pool, build_pool_legs, optimize_pool, check_pool_hit
+from feature_cache import cached_frame, cache_stats
+
+DB_NAME = "tjk_races.db"
+DEFAULT_BUDGET = 700.0
+SCORE_CLIP = (0.01, 0.99)
+
+# Per-process state (filled by _init_worker)
+_WORKER = {}
+
+
+def parse_date(d_str):
+    if '/' in d_str: return datetime.strptime(d_str, '%d/%m/%Y')
+    return datetime.strptime(d_str, '%Y-%m-%d')
+
+
+def load_models(prefix=None):
+    """Ensemble + encoders. prefix=None prefers honest models, falls back to v10."""
+    if prefix is None:
+        prefix = 'model_honest' if os.path.exists('model_honest_lgbm.pkl') else 'model_v10'
+    tag = prefix.split('_')[1]  # honest / v10
+    return {
+        'prefix': prefix,
+        'lgbm': joblib.load(f'{prefix}_lgbm.pkl'),
+        'cat': joblib.load(f'{prefix}_cat.pkl'),
+        'xgb': joblib.load(f'{prefix}_xgb.pkl'),
+        'le_track': joblib.load(f'le_track_{tag}.pkl'),
+        'le_city': joblib.load(f'le_city_{tag}.pkl'),
+    }
+
+
+def make_snapshot(db_path):
+    """Consistent copy of the DB (sqlite backup API) so scrapers can keep writing."""
+    fd, snap = tempfile.mkstemp(prefix='tjk_snapshot_', suffix='.db')
+    os.close(fd)
+    src = connect_readonly(db_path)
+    dst = tjk_db.connect(snap)
+    src.backup(dst)
+    dst.close()
+    src.close()
+    return snap
+
+
+def list_units(conn, dates, city=None):
+    """(date, city) pairs for the given dates, in chronological then city order."""
+    if not dates: return []
+    ph = ','.join(['?'] * len(dates))
+    rows = conn.execute(f"SELECT DISTINCT date, city FROM races WHERE date IN ({ph})", list(dates)).fetchall()
+    if city:
+        rows = [r for r in rows if city.lower() in (r[1] or '').lower()]
+    return sorted(rows, key=lambda r: (parse_date(r[0]), r[1]))
+
+
+def select_dates(conn, days=None, since=None):
+    dates = [r[0] for r in conn.execute("SELECT DISTINCT date FROM races").fetchall()]
+    valid = []
+    today = datetime.now()
+    for d_str in dates:
+        try: d = parse_date(d_str)
+        except Exception: continue
+        if since and d < datetime.strptime(since, '%Y-%m-%d'): continue
+        if days and not (today - timedelta(days=days) <= d < today): continue
+        valid.append((d, d_str))
+    valid.sort()
+    return [x[1] for x in valid]
+
+
+def load_unit(conn, date_str, city):
+    df = pd.read_sql_query("""
+        SELECT
+            r.id as race_id, r.city, r.track_type, r.distance, r.prize, r.race_no,
+            res.horse_name, res.jockey, res.trainer, res.owner,
+            res.rank, res.weight, res.hp, res.ganyan,
+            r.date
+        FROM results res
+        JOIN races r ON res.race_id = r.id
+        WHERE r.date = ? AND r.city = ?
+    """, conn, params=(date_str, city))
+
+    horse_names = df['horse_name'].dropna().unique().tolist()
+    if horse_names:
+        ph = ','.join(['?'] * len(horse_names))
+        gallops_df = pd.read_sql_query(f"SELECT * FROM gallops WHERE horse_name IN ({ph})", conn, params=horse_names)
+    else:
+        gallops_df = pd.DataFrame()
+    return df, gallops_df
+
+
+def build_unit_features(conn, date_str, city, models):
+    """Expensive part: v10 features, galops and the base ensemble probability."""
+    df, gallops_df = load_unit(conn, date_str, city)
+    if df.empty: return df
+    df = add_v10_features(df, date_str, models['le_track'], models['le_city'], conn=conn)
+    df = compute_galop_features(df, gallops_df, date_str)
+    for f in V10_FEATURES:
+        if f not in df.columns: df[f] = 0
+        df[f] = pd.to_numeric(df[f], errors='coerce').fillna(0)
+
+    X = df[V10_FEATURES].astype(float)
+    df['base_prob'] = (models['lgbm'].predict_proba(X)[:, 1] + models['cat'].predict_proba(X)[:, 1] +
+                       models['xgb'].predict_proba(X)[:, 1]) / 3.0
+    return df
+
+
+def apply_strategy(df, clip=SCORE_CLIP):
+    """Cheap part: galop boost on top of the cached base probability."""
+    df['ai_prob'] = (df['base_prob'] + (df['galop_score'] - 0.5) * 0.2).clip(*clip)
+    df['score'] = df['ai_prob']
+    return df
+
+
+def evaluate_unit(df, city, budget=DEFAULT_BUDGET):
+    races = []
+    winners = {}
+    winner_odds = {}
+    for race_no, gdf in df.groupby('race_no'):
+        winner = gdf[gdf['rank'] == 1]
+        if winner.empty: continue
+        w_name = winner.iloc[0]['horse_name']
+        winners[int(race_no)] = w_name
+        winner_odds[int(race_no)] = float(pd.to_numeric(winner.iloc[0].get('ganyan'), errors='coerce') or 0)
+        if len(gdf) < 3: continue
+        ranked = gdf.sort_values('ai_prob', ascending=False)
+        top3 = ranked.head(3)['horse_name'].tolist()
+        races.append({
+            'race': int(race_no),
+            'pred': top3[0],
+            'prob': float(ranked.iloc[0]['ai_prob']),
+            'actual': w_name,
+            'win': top3[0] == w_name,
+            'show': w_name in top3,
+            'ganyan': winner_odds[int(race_no)]
+        })
+
+    coupon = None
+    race_nos = sorted(df['race_no'].unique())
+    if len(race_nos) >= 6:
+        pool = make_pool('ALTILI', race_nos[-6:])
+        legs_data = build_pool_legs(df, pool, score_col='score')
+        selection, cost = optimize_pool(pool, legs_data, budget)
+        caught, missed, is_hit = check_pool_hit(pool, selection, winners)
+        coupon = {
+            'races': pool['races'],
+            'selection': [[x[0] for x in leg] for leg in selection],
+            'winners': [winners.get(r) for r in pool['races']],
+            'winner_odds': [winner_odds.get(r, 0.0) for r in pool['races']],
+            'cost': cost,
+            'caught': caught,
+            'missed': missed,
+            'hit': is_hit
+        }
+    return races, coupon
+
+
+def _init_worker(db_path, model_prefix, use_cache=True):
+    _WORKER['conn'] = connect_readonly(db_path)
+    _WORKER['models'] = load_models(model_prefix)
+    _WORKER['use_cache'] = use_cache
+
+
+def _run_unit(args):
+    date_str, city, budget, clip = args
+    t0 = time.perf_counter()
+    conn = _WORKER['conn']
+    models = _WORKER['models']
+    build = lambda c, d, ct: build_unit_features(c, d, ct, models)
+    hits = cache_stats()['hits']
+    if _WORKER['use_cache']:
+        df = cached_frame(conn, date_str, city, models['prefix'], build)
+    else:
+        df = build(conn, date_str, city)
+    cached = cache_stats()['hits'] > hits
+    if df is None or df.empty:
+        return {'date': date_str, 'city': city, 'horses': 0, 'races': [], 'coupon': None,
+                'seconds': 0.0, 'cached': cached}
+    df = apply_strategy(df, clip)
+    races, coupon = evaluate_unit(df, city, budget)
+    return {'date': date_str, 'city': city, 'horses': len(df), 'races': races, 'coupon': coupon,
+            'seconds': time.perf_counter() - t0, 'cached': cached}
+
+
+def run_backtest(dates, city=None, workers=1, budget=DEFAULT_BUDGET, model_prefix=None,
+                 db_path=DB_NAME, snapshot=False, use_cache=True, verbose=True, clip=SCORE_CLIP):
+    """
+    Runs every (date, city) unit and returns the per-unit results in
+    deterministic (date, city) order. clip bounds the boosted score.
+    """
+    snap = make_snapshot(db_path) if snapshot else None
+    src = snap or db_path
+    try:
+        conn = connect_readonly(src)
+        units = list_units(conn, dates, city)
+        conn.close()
+        if verbose:
+            print(f"🔄 {len(units)} units ({len(set(u[0] for u in units))} days) on {workers} worker(s)")
+
+        jobs = [(d, c, budget, clip) for d, c in units]
+        t0 = time.perf_counter()
+        if workers <= 1:
+            _init_worker(src, model_prefix, use_cache)
+            results = [_run_unit(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(src, model_prefix, use_cache)) as ex:
+                results = list(ex.map(_run_unit, jobs, chunksize=1))
+        elapsed = time.perf_counter() - t0
+    finally:
+        if snap: os.remove(snap)
+
+    if verbose and results:
+        horses = sum(r['horses'] for r in results)
+        print(f"⚡ {len(results)} units / {horses} horses in {elapsed:.1f}s "
+              f"({len(results)/elapsed:.2f} units/s, {horses/elapsed:.0f} horses/s)")
+        if use_cache:
+            print(f"💾 Feature cache: {sum(r['cached'] for r in results)}/{len(results)} units from cache")
+    return results
+
+
+def summarize(results):
+    races = [r for u in results for r in u['races']]
+    coupons = [u['coupon'] for u in results if u['coupon']]
+    return {
+        'races': len(races),
+        'win': sum(r['win'] for r in races),
+        'show': sum(r['show'] for r in races),
+        'coupons': len(coupons),
+        'coupon_hits': sum(c['hit'] for c in coupons),
+        'coupon_cost': sum(c['cost'] for c in coupons),
+        'avg_caught': float(np.mean([c['caught'] for c in coupons])) if coupons else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, help="Past N days")
+    parser.add_argument("--since", help="All dates >= YYYY-MM-DD")
+    parser.add_argument("--dates", nargs='+', help="Explicit dates (DD/MM/YYYY)")
+    parser.add_argument("--city", help="City filter (substring)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument("--model", help="Model prefix (model_honest / model_v10)")
+    parser.add_argument("--snapshot", action="store_true", help="Backtest on a snapshot copy of the DB")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features instead of using .cache/features")
+    args = parser.parse_args()
+
+    dates = args.dates
+    if not dates:
+        conn = connect_readonly(DB_NAME)
+        dates = select_dates(conn, days=args.days or (None if args.since else 15), since=args.since)
+        conn.close()
+
+    print("\n🔍 KAHIN BACKTEST ENGINE")
+    print("=" * 60)
+    results = run_backtest(dates, args.city, args.workers, args.budget, args.model,
+                           snapshot=args.snapshot, use_cache=not args.no_cache)
+
+    for u in results:
+        c = u['coupon']
+        if not c: continue
+        icon = "✅" if c['hit'] else "❌"
+        print(f"{u['date']} | {u['city']:20} | {c['cost']:7.2f} TL | {icon} {c['caught']}/6 | Missed: {', '.join(c['missed'])}")
+
+    s = summarize(results)
+    print("=" * 60)
+    if s['races']:
+        print(f"Win Accuracy (Top 1): {s['win']}/{s['races']} ({s['win']/s['races']*100:.1f}%)")
+        print(f"Show Accuracy (Top 3): {s['show']}/{s['races']} ({s['show']/s['races']*100:.1f}%)")
+    if s['coupons']:
+        print(f"Coupons: {s['coupons']} | Won: {s['coupon_hits']} ({s['coupon_hits']/s['coupons']*100:.1f}%) "
+              f"| Avg Caught: {s['avg_caught']:.2f}/6 | Total Cost: {s['coupon_cost']:.2f} TL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Bench Hotpaths - Sıcak Yol Performans Testleri
+==============================================
+Times the hot paths of the prediction pipeline on a synthetic database of
+configurable size and compares the run against a stored JSON baseline:
+
+  historical_stats_v10   get_historical_stats_v10 for one program's horses
+  galop_features         compute_galop_features on one program
+  prepare_v10            prepare_v10_predictions (features + ensemble + galop)
+  ensemble_predict       LightGBM + CatBoost + XGBoost predict_proba
+  optimize_logic         optimize_coupon_logic (6 legs)
+  optimize_balanced      optimize_coupon_balanced (6 legs)
+  parse_city_links       parse_program_city_links on raw_program.html
+  parse_program          parse_program_details on izmir_program.html
+
+Synthetic databases (synthetic_db.generate) are cached under .cache/bench/
+per size and seed.
+A benchmark is flagged when its median is more than --threshold slower than
+the baseline; the exit code is 1 when anything regressed.
+
+Usage:
+    python bench_hotpaths.py --size small --save          # write baseline
+    python bench_hotpaths.py --size small                 # compare
+    python bench_hotpaths.py --size medium --only optimize_logic prepare_v10 --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+import tjk_db
+import production_engine
+from production_engine import (get_historical_stats_v10, compute_galop_features, prepare_v10_predictions,
+                               optimize_coupon_logic, optimize_coupon_balanced, load_program, V10_FEATURES)
+from synthetic_db import generate
+
+BENCH_DIR = os.path.join('.cache', 'bench')
+DEFAULT_THRESHOLD = 0.20
+
+# synthetic_db.generate knobs per size
+BENCH_SIZES = {
+    'small':  {'years': 0.25, 'races_per_day': 24},
+    'medium': {'years': 1.0,  'races_per_day': 40},
+    'large':  {'years': 5.0,  'races_per_day': 40},
+}
+
+def bench_db(size, seed=42):
+    path = os.path.join(BENCH_DIR, f"tjk_bench_{size}_{seed}.db")
+    if not os.path.exists(path):
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        spec = BENCH_SIZES[size]
+        print(f"🏗️  Building synthetic DB ({size}: {spec['years']} years, {spec['races_per_day']} races/day)...")
+        t0 = time.perf_counter()
+        tmp = path + '.tmp'
+        if os.path.exists(tmp): os.remove(tmp)
+        generate(tmp, spec['years'], spec['races_per_day'], seed, verbose=False)
+        os.replace(tmp, path)
+        print(f"   ✅ {path} ({time.perf_counter() - t0:.1f}s)")
+    return path
+
+
+def _program_context(db_path):
+    conn = tjk_db.connect(db_path)
+    date_str, city = conn.execute("SELECT date, city FROM program_races ORDER BY id LIMIT 1").fetchone()
+    conn.close()
+    production_engine.DB_NAME = db_path
+    df = load_program(city, date_str)
+    return date_str, city, df
+
+
+def _legs(seed=7):
+    rng = np.random.default_rng(seed)
+    legs = []
+    for n in [8, 12, 14, 10, 16, 9]:
+        s = np.sort(rng.dirichlet(np.ones(n)))[::-1]
+        legs.append([(f"AT {i}", float(v)) for i, v in enumerate(s)])
+    return legs
+
+
+# Each setup returns (callable, ops per call)
+def setup_historical_stats(db_path):
+    date_str, _, df = _program_context(db_path)
+    rows = df[['horse_name', 'jockey', 'track_type', 'trainer', 'owner']].values.tolist()
+    conn = tjk_db.connect(db_path)
+    return (lambda: [get_historical_stats_v10(h, j, t, tr, o, date_str, conn=conn) for h, j, t, tr, o in rows]), len(rows)
+
+
+def setup_galop_features(db_path):
+    date_str, _, df = _program_context(db_path)
+    conn = tjk_db.connect(db_path)
+    names = df['horse_name'].unique().tolist()
+    g_df = pd.read_sql_query(f"SELECT * FROM gallops WHERE horse_name IN ({','.join(['?'] * len(names))})", conn, params=names)
+    conn.close()
+    return (lambda: compute_galop_features(df.copy(), g_df, date_str)), len(df)
+
+
+def setup_prepare_v10(db_path):
+    date_str, _, df = _program_context(db_path)
+    # horse_id 0 skips the on-demand TJK galop fetch (no network in benchmarks)
+    df['horse_id'] = 0
+    return (lambda: prepare_v10_predictions(df.copy(), date_str)), len(df)
+
+
+def setup_ensemble_predict(db_path, rows=2000):
+    models = [joblib.load(f'model_v10_{n}.pkl') for n in ['lgbm', 'cat', 'xgb']]
+    X = pd.DataFrame(np.random.default_rng(0).random((rows, len(V10_FEATURES))), columns=V10_FEATURES)
+    return (lambda: sum(m.predict_proba(X)[:, 1] for m in models) / 3.0), rows
+
+
+def setup_optimize_logic(db_path):
+    legs = _legs()
+    return (lambda: optimize_coupon_logic(legs, 700.0)), 1
+
+
+def setup_optimize_balanced(db_path):
+    legs = _legs()
+    return (lambda: optimize_coupon_balanced(legs, 700.0)), 1
+
+
+def setup_parse_city_links(db_path):
+    from tjk_scraper.scrape_program import parse_program_city_links
+    html = open('raw_program.html', encoding='utf-8').read()
+    return (lambda: parse_program_city_links(html)), 1
+
+
+def setup_parse_program(db_path):
+    from tjk_scraper import scrape_program
+    html = open('izmir_program.html', encoding='utf-8').read()
+    scrape_program.DB_NAME = os.path.join(BENCH_DIR, 'parse_bench.db')
+    if os.path.exists(scrape_program.DB_NAME): os.remove(scrape_program.DB_NAME)
+    scrape_program.init_program_db()
+
+    def run():
+        # Same table size on every call, the parser appends rows
+        conn = tjk_db.connect(scrape_program.DB_NAME)
+        conn.execute("DELETE FROM program_entries")
+        conn.execute("DELETE FROM program_races")
+        conn.commit()
+        conn.close()
+        return scrape_program.parse_program_details(html, '01/01/2026', 'İzmir')
+    return run, 1
+
+
+BENCHMARKS = {
+    'historical_stats_v10': setup_historical_stats,
+    'galop_features':       setup_galop_features,
+    'prepare_v10':          setup_prepare_v10,
+    'ensemble_predict':     setup_ensemble_predict,
+    'optimize_logic':       setup_optimize_logic,
+    'optimize_balanced':    setup_optimize_balanced,
+    'parse_city_links':     setup_parse_city_links,
+    'parse_program':        setup_parse_program,
+}
+
+
+def run_benchmark(setup, db_path, repeat=5, warmup=1):
+    fn, ops = setup(db_path)
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup): fn()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    med = statistics.median(times)
+    return {'median_s': med, 'min_s': min(times), 'ops': ops, 'per_op_ms': med / max(ops, 1) * 1000, 'repeat': repeat}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Ratio current / baseline median per benchmark and the ones slower than threshold."""
+    ratios, regressions = {}, []
+    for name, r in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or base['median_s'] <= 0: continue
+        ratios[name] = r['median_s'] / base['median_s']
+        if ratios[name] > 1 + threshold: regressions.append(name)
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=list(BENCH_SIZES), default='small')
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs='+', choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="Baseline JSON (default: .cache/bench/baseline_<size>.json)")
+    parser.add_argument("--save", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or os.path.join(BENCH_DIR, f"baseline_{args.size}.json")
+    db_path = bench_db(args.size, args.seed)
+    db_name = production_engine.DB_NAME
+
+    print(f"\n⏱️  HOTPATH BENCHMARKS ({args.size}, repeat={args.repeat})")
+    print("=" * 72)
+    results = {}
+    try:
+        for name in args.only or BENCHMARKS:
+            try:
+                results[name] = run_benchmark(BENCHMARKS[name], db_path, args.repeat)
+            except Exception as e:
+                print(f"{name:22} ❌ {e}")
+                continue
+            r = results[name]
+            print(f"{name:22} {r['median_s']*1000:10.2f} ms  (min {r['min_s']*1000:9.2f} ms, "
+                  f"{r['per_op_ms']:8.3f} ms/op x {r['ops']})")
+    finally:
+        production_engine.DB_NAME = db_name
+
+    regressions = []
+    if os.path.exists(baseline_path) and not args.save:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        ratios, regressions = compare(results, baseline, args.threshold)
+        print("-" * 72)
+        print(f"📏 Baseline: {baseline_path} ({baseline.get('created', '?')})")
+        for name, ratio in ratios.items():
+            icon = "🔴" if name in regressions else ("🟢" if ratio < 1 - args.threshold else "⚪")
+            print(f"{icon} {name:22} {ratio:6.2f}x")
+        if regressions:
+            print(f"⚠️ {len(regressions)} regression(s) beyond {args.threshold*100:.0f}%: {', '.join(regressions)}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(baseline_path) or '.', exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'size': args.size,
+                       'seed': args.seed, 'results': results}, f, indent=2)
+        print(f"✅ Baseline saved: {baseline_path}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ Bulk Galop Scraper - 20 Concurrent Workers
 Collects galop data for all horses in database for model retraining
 """
 
-import sqlite3
+import tjk_db
 import requests
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -106,7 +106,7 @@ def fetch_single_horse_gallops(horse_id, horse_name):
     return gallops
 
 def main():
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     # Get ALL horses from program_entries that we don't already have galops for
     print("🔍 Finding horses needing galop data...")
@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import joblib
 import sys
@@ -8,6 +7,7 @@ import math
 
 # Import components
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import (
     get_historical_stats_v10,
     compute_galop_features,
@@ -16,6 +16,7 @@ from production_engine import (
     cosmic_wave, chaos_attractor, numerology_score, moon_phase,
     PHI, FIBONACCI
 )
+from hit_check import check_coupons, CAUGHT
 
 DB_NAME = "tjk_races.db"
 TARGET_DATE = "16/01/2026"
@@ -36,7 +37,7 @@ def check_success():
         print("❌ Model load failed.")
         return
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     for city_key in CITIES:
         print(f"\n🏙️  {city_key.upper()}")
@@ -168,21 +169,19 @@ def check_success():
         selection, cost = optimize_coupon_logic(legs_data, 700.0)
         
         # Compare
-        caught_count = 0
+        winners = []
+        for race_no in legs:
+            w_row = results_df[results_df['race_no'] == race_no]
+            winners.append(w_row.iloc[0]['winner_name'] if not w_row.empty else None)
+        res = check_coupons([selection], [winners], fields=[legs_data])
+        caught_count = int(res['legs_caught'][0])
         print(f"🎫 KUPON (Maliyet: {cost:.2f} TL)")
         
         for i, leg_sel in enumerate(selection):
-            race_no = legs[i]
-            # Find winner
-            w_row = results_df[results_df['race_no'] == race_no]
-            winner = w_row.iloc[0]['winner_name'].strip() if not w_row.empty else "???"
-            
+            winner = (winners[i] or "???").strip()
             my_horses = [x[0] for x in leg_sel]
-            hit = winner in my_horses
-            icon = "✅" if hit else "❌"
-            if hit: caught_count += 1
-            
-            print(f"Koşu {race_no}: {icon} Kazanan: {winner:<20} | Bizimkiler: {', '.join(my_horses)}")
+            icon = "✅" if res['status'][0][i] == CAUGHT else "❌"
+            print(f"Koşu {legs[i]}: {icon} Kazanan: {winner:<20} | Bizimkiler: {', '.join(my_horses)}")
             
         print(f"\nSONUÇ: {caught_count}/6")
         if caught_count == 6: print("🏆 TEBRİKLER! ALTILI GANYAN TUTTU!")
@@ -0,0 +1,143 @@
+"""
+Coupon Frontier - Bütçe / Tutma İhtimali Eğrisi
+================================================
+Computes the whole Pareto frontier of (cost, coverage probability, selection)
+for a set of legs in one pass. Any budget can then be answered with a lookup
+instead of re-running the optimizer once per budget.
+
+Coverage probability of a coupon = product over legs of the (normalized)
+probability mass of the selected horses. For a fixed number of horses in a leg
+the best choice is always the top-k by score, so a coupon on the frontier is
+fully described by its per-leg counts.
+"""
+
+import bisect
+import json
+
+
+def leg_probabilities(leg):
+    """Normalize a leg's (name, score, ...) tuples into win probabilities."""
+    if not leg:
+        return []
+    scores = [max(float(x[1]), 0.0) for x in leg]
+    total = sum(scores)
+    if total <= 0:
+        return [1.0 / len(leg)] * len(leg)
+    return [s / total for s in scores]
+
+
+def _sorted_legs(legs_data):
+    # Callers already sort by score, but the frontier relies on it
+    return [sorted(leg, key=lambda x: float(x[1]), reverse=True) for leg in legs_data]
+
+
+def compute_frontier(legs_data, unit=1.25, max_cost=None):
+    """
+    Returns the Pareto frontier as a list of points sorted by cost:
+        {'cost': float, 'combos': int, 'prob': float, 'counts': [k1, k2, ...]}
+    counts[i] = number of top-scored horses taken in leg i.
+    Every point is strictly better (higher prob) than all cheaper points.
+    """
+    legs = _sorted_legs(legs_data)
+    if not legs or any(not leg for leg in legs):
+        return []
+
+    max_combos = int(max_cost / unit) if max_cost else None
+
+    # state: combos -> (prob, counts)
+    states = {1: (1.0, ())}
+    for leg in legs:
+        probs = leg_probabilities(leg)
+        cum = []
+        acc = 0.0
+        for p in probs:
+            acc += p
+            cum.append(min(acc, 1.0))
+
+        new_states = {}
+        for combos, (prob, counts) in states.items():
+            for k in range(1, len(leg) + 1):
+                n_combos = combos * k
+                if max_combos is not None and n_combos > max_combos:
+                    break
+                n_prob = prob * cum[k - 1]
+                best = new_states.get(n_combos)
+                if best is None or n_prob > best[0]:
+                    new_states[n_combos] = (n_prob, counts + (k,))
+
+        # Prune dominated partial coupons: remaining legs multiply cost and
+        # probability by the same factors, so a dominated state never recovers.
+        states = {}
+        best_prob = -1.0
+        for combos in sorted(new_states):
+            prob, counts = new_states[combos]
+            if prob > best_prob:
+                states[combos] = (prob, counts)
+                best_prob = prob
+
+        if not states:
+            return []
+
+    frontier = []
+    for combos in sorted(states):
+        prob, counts = states[combos]
+        frontier.append({
+            'cost': round(combos * unit, 2),
+            'combos': combos,
+            'prob': prob,
+            'counts': list(counts)
+        })
+    return frontier
+
+
+def frontier_lookup(frontier, budget_tl, tolerance=0.0):
+    """Best (highest probability) frontier point whose cost fits the budget."""
+    if not frontier:
+        return None
+    limit = budget_tl * (1 + tolerance)
+    costs = [p['cost'] for p in frontier]
+    idx = bisect.bisect_right(costs, limit) - 1
+    if idx < 0:
+        return None
+    return frontier[idx]
+
+
+def selection_for_point(legs_data, point):
+    """Expands a frontier point into the optimizer's selection format."""
+    legs = _sorted_legs(legs_data)
+    return [leg[:k] for leg, k in zip(legs, point['counts'])]
+
+
+def thin_frontier(frontier, max_points=40):
+    """Keeps at most max_points, spread evenly over the frontier (ends kept)."""
+    if len(frontier) <= max_points:
+        return list(frontier)
+    step = (len(frontier) - 1) / (max_points - 1)
+    picked = sorted({int(round(i * step)) for i in range(max_points)})
+    return [frontier[i] for i in picked]
+
+
+def serialize_frontier(legs_data, frontier, unit=1.25, max_points=40):
+    """
+    Compact JSON-ready form stored alongside each coupon, so the app can offer
+    bigger/smaller coupon variants without rerunning Python:
+        {"unit": 1.25,
+         "legs": [[ranked horse names...], ...],
+         "points": [[cost, prob, [k1..kN]], ...]}
+    Only as many ranked names as the widest point needs are stored per leg.
+    """
+    points = thin_frontier(frontier, max_points)
+    legs = _sorted_legs(legs_data)
+    widest = [0] * len(legs)
+    for p in points:
+        widest = [max(w, k) for w, k in zip(widest, p['counts'])]
+
+    return {
+        'unit': unit,
+        'legs': [[str(x[0]) for x in leg[:w]] for leg, w in zip(legs, widest)],
+        'points': [[p['cost'], round(p['prob'], 6), p['counts']] for p in points]
+    }
+
+
+def frontier_json(legs_data, frontier, unit=1.25, max_points=40):
+    return json.dumps(serialize_frontier(legs_data, frontier, unit, max_points), ensure_ascii=False)
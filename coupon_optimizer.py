@@ -0,0 +1,207 @@
+"""
+Coupon Optimizer - Kupon Optimizasyonu
+======================================
+Greedy altılı / pool coupon optimizers (pure Python, no pandas / models), so
+tools that only size coupons (pools, test_opt, tuning) can import them without
+pulling in production_engine. production_engine re-exports both functions.
+
+    selection, cost = optimize_coupon_logic(legs_data, 700.0, unit=1.25)
+
+legs_data: per leg a list of (horse_name, score) sorted by score (desc).
+"""
+
+
+def optimize_coupon_logic(legs_data, budget_tl, unit=1.25, tolerance=0.15):
+    """
+    Smart Optimization: Balances Risk vs Budget based on Field Size & Entropy.
+    """
+    # 1. Analyze Each Leg & Set Initial Constraints
+    leg_configs = []
+    
+    for i, leg in enumerate(legs_data):
+        field_size = len(leg)
+        if not leg: # Empty leg protection
+             leg_configs.append({'min': 1, 'max': 1, 'candidates': leg})
+             continue
+             
+        scores = [x[1] for x in leg]
+        top_score = scores[0]
+        
+        # Difficulty Classification
+        difficulty = "NORMAL"
+        if field_size >= 12 and top_score < 0.35: difficulty = "HARD"
+        elif field_size <= 7 or top_score > 0.60: difficulty = "EASY"
+        
+        # Initial Constraints
+        min_sel = 1
+        max_sel = int(field_size * 0.6) # Cap at 60%
+        
+        if difficulty == "HARD":
+            min_sel = 3  # Start with 3, expand later
+        elif difficulty == "NORMAL":
+            min_sel = 2
+        else: # EASY
+            min_sel = 1
+            
+        # Monster Favorite Exception
+        if top_score > 0.85: min_sel = 1
+        
+        leg_configs.append({
+            'min': min_sel,
+            'max': max(min_sel, max_sel),
+            'candidates': leg,
+            'difficulty': difficulty
+        })
+        
+    # 2. Validate Initial Cost & Relax if needed
+    while True:
+        c = 1
+        for lc in leg_configs: c *= lc['min']
+        if c * unit <= budget_tl * (1 + tolerance):
+            break
+        
+        # Reduce constraints (Find "HARD" legs with >2 min and reduce)
+        reduced = False
+        for lc in leg_configs:
+            if lc['min'] > 2:
+                lc['min'] -= 1
+                reduced = True
+                break # Reduce one by one
+        
+        if not reduced:
+             # Try reducing Normal legs >1
+             for lc in leg_configs:
+                if lc['min'] > 1:
+                    lc['min'] -= 1
+                    reduced = True
+                    break
+        
+        if not reduced: break # Can't reduce further.
+    
+    # 3. Greedy Expansion
+    current_selection = [lc['candidates'][:lc['min']] for lc in leg_configs]
+    limit = budget_tl * (1 + tolerance)
+    
+    while True:
+        best_gain = -1
+        best_leg = -1
+        
+        # Current Cost
+        c_comb = 1
+        for s in current_selection: c_comb *= len(s)
+        current_cost = c_comb * unit
+        
+        for i, config in enumerate(leg_configs):
+            curr_len = len(current_selection[i])
+            
+            if curr_len >= config['max'] or curr_len >= len(config['candidates']):
+                continue
+                
+            next_horse = config['candidates'][curr_len]
+            mult_factor = (curr_len + 1) / curr_len
+            new_cost = current_cost * mult_factor
+            
+            if new_cost <= limit:
+                # Weighted Gain Calculation
+                gain = float(next_horse[1])
+                
+                # Boost gain for under-covered Hard/Crowded races to prioritize them
+                if config['difficulty'] == "HARD" and curr_len < 5:
+                    gain *= 2.0
+                elif config['difficulty'] == "NORMAL" and curr_len < 3:
+                    gain *= 1.2
+                    
+                if gain > best_gain:
+                    best_gain = gain
+                    best_leg = i
+                    
+        if best_leg != -1:
+            next_h = leg_configs[best_leg]['candidates'][len(current_selection[best_leg])]
+            current_selection[best_leg].append(next_h)
+        else:
+            break
+            
+    final_combos = 1
+    for s in current_selection: final_combos *= len(s)
+    return current_selection, final_combos * unit
+
+def optimize_coupon_balanced(legs_data, budget_tl, unit=1.25):
+    """Balanced Optimization (Favorites + Surprise)"""
+    # Simply pick top N favorites first, but allow "Surprise" horses (already boosted in score)
+    # Since we use modified scores for the Surprise strategy, standard optimization *is* already balanced
+    # because it will pick high-score horses (where score includes surprise factor).
+    # But let's enforce a minimum width to ensure coverage (aka 'Plase' logic).
+    
+    # Start with Top 2 horses in every leg (if budget allows)
+    current_selection = []
+    for leg in legs_data:
+        # Take top 2 if available, else 1
+        leg_sel = []
+        for i in range(min(2, len(leg))):
+             if leg[i][0] not in [x[0] for x in leg_sel]:
+                 leg_sel.append(leg[i])
+        current_selection.append(leg_sel)
+        
+    def get_cost():
+        c = 1
+        for s in current_selection: c *= len(s)
+        return c * unit
+        
+    # Trim if over budget
+    while get_cost() > budget_tl:
+        # Remove weakest horse (lowest score in current selection)
+        weakest_score = 999
+        weakest_leg = -1
+        
+        for i, sel in enumerate(current_selection):
+            if len(sel) > 1: # Don't go below 1 horse
+                score = sel[-1][1] # Last horse is weakest
+                if score < weakest_score:
+                    weakest_score = score
+                    weakest_leg = i
+        
+        if weakest_leg != -1:
+            current_selection[weakest_leg].pop()
+        else:
+            break # Can't reduce further
+            
+    # Expand if under budget
+    while True:
+        best_add_score = -1
+        best_add_leg = -1
+        
+        for i, leg in enumerate(legs_data):
+            # Check if there are more horses to add in this leg
+            if len(current_selection[i]) < len(leg):
+                # Iterate through leg candidates to find the next one NOT in selection
+                next_cand = None
+                curr_names = [x[0] for x in current_selection[i]]
+                
+                # Because legs_data is sorted by score, the next best candidate is simply the first one not in curr_names
+                for cand in leg:
+                    if cand[0] not in curr_names:
+                        next_cand = cand
+                        break
+                
+                if next_cand:
+                    # Check cost
+                    c = 1
+                    for k, sel in enumerate(current_selection):
+                        l = len(sel)
+                        if k == i: l += 1
+                        c *= l
+                    
+                    if c * unit <= budget_tl * 1.05 and next_cand[1] > best_add_score:
+                        best_add_score, best_add_leg = next_cand[1], i
+                        
+        if best_add_leg != -1:
+             # Find the candidate again to append
+             curr_names = [x[0] for x in current_selection[best_add_leg]]
+             for cand in legs_data[best_add_leg]:
+                 if cand[0] not in curr_names:
+                     current_selection[best_add_leg].append(cand)
+                     break
+        else:
+            break
+            
+    return current_selection, get_cost()
@@ -0,0 +1,182 @@
+"""
+Coupon Simulator - Monte Carlo Tutma / İkramiye Tahmini
+=======================================================
+Samples race outcomes from the per-race probability vectors (NumPy, chunked,
+millions of draws per second) and reports for a coupon:
+  - hit probability (simulated + exact),
+  - distribution of legs caught,
+  - expected payout using historical `ganyan` odds.
+
+Payout model: a hit coupon holds exactly one winning combination, paying
+unit * dividend. The pool dividend is approximated by parlaying the winners'
+ganyan odds, scaled by PAYOUT_RATIO for the extra pool takeout.
+"""
+
+import time
+
+import numpy as np
+
+from coupon_frontier import leg_probabilities
+
+PAYOUT_RATIO = 0.75
+DEFAULT_DRAWS = 1_000_000
+CHUNK_SIZE = 250_000
+
+
+def leg_masks(legs_data, selection):
+    """Boolean mask per leg: True where the horse is in the coupon."""
+    masks = []
+    for leg, sel in zip(legs_data, selection):
+        names = {x[0] for x in sel}
+        masks.append(np.array([x[0] in names for x in leg], dtype=bool))
+    return masks
+
+
+def sample_outcomes(prob_vectors, n_draws, rng):
+    """Winner index per leg for n_draws simulated race days -> (n_draws, legs)."""
+    out = np.empty((n_draws, len(prob_vectors)), dtype=np.int16)
+    for i, p in enumerate(prob_vectors):
+        cum = np.cumsum(p)
+        cum[-1] = 1.0
+        u = rng.random(n_draws)
+        out[:, i] = np.searchsorted(cum, u, side='right').clip(0, len(p) - 1)
+    return out
+
+
+def caught_matrix(outcomes, masks):
+    """(n_draws, legs) bool: did the coupon cover each leg's winner."""
+    caught = np.empty(outcomes.shape, dtype=bool)
+    for i, m in enumerate(masks):
+        caught[:, i] = m[outcomes[:, i]]
+    return caught
+
+
+def historical_ganyan_odds(conn, legs_data, min_odds=1.05):
+    """
+    Per leg, per horse: median historical ganyan (win odds) from `results`.
+    Horses without history get fair odds 1/p from the model probabilities.
+    """
+    names = sorted({str(x[0]) for leg in legs_data for x in leg})
+    hist = {}
+    if names:
+        ph = ','.join(['?'] * len(names))
+        rows = conn.execute(f"""
+            SELECT horse_name, ganyan FROM results
+            WHERE ganyan > 0 AND horse_name IN ({ph})
+        """, names).fetchall()
+        by_horse = {}
+        for h, g in rows:
+            by_horse.setdefault(h, []).append(float(g))
+        hist = {h: float(np.median(v)) for h, v in by_horse.items()}
+
+    odds = []
+    for leg in legs_data:
+        probs = leg_probabilities(leg)
+        odds.append([max(hist.get(str(x[0]), 1.0 / max(p, 1e-6)), min_odds) for x, p in zip(leg, probs)])
+    return odds
+
+
+def realized_payout(winner_odds, unit=1.25, payout_ratio=PAYOUT_RATIO):
+    """
+    Payout of a hit coupon from the actual winners' ganyan odds (same parlay
+    model as the simulation). None when a leg winner has no recorded odds.
+    """
+    odds = np.asarray(winner_odds, dtype=float)
+    if len(odds) == 0 or not np.all(odds > 0): return None
+    return float(unit * np.prod(odds) * payout_ratio)
+
+
+def simulate_coupon(legs_data, selection, odds=None, unit=1.25, cost=None,
+                    n_draws=DEFAULT_DRAWS, payout_ratio=PAYOUT_RATIO, seed=None, rng=None):
+    """
+    Monte Carlo evaluation of one coupon.
+    legs_data: per leg [(name, score, ...)], selection: optimizer output,
+    odds: per leg list aligned with legs_data (None = fair odds from probabilities).
+    """
+    rng = rng or np.random.default_rng(seed)
+    probs = [np.asarray(leg_probabilities(leg), dtype=float) for leg in legs_data]
+    masks = leg_masks(legs_data, selection)
+    if odds is None:
+        odds = [1.0 / np.maximum(p, 1e-6) for p in probs]
+    odds = [np.asarray(o, dtype=float) for o in odds]
+
+    n_legs = len(legs_data)
+    caught_hist = np.zeros(n_legs + 1, dtype=np.int64)
+    hits = 0
+    payout_sum = 0.0
+    payouts = []
+
+    t0 = time.perf_counter()
+    done = 0
+    while done < n_draws:
+        n = min(CHUNK_SIZE, n_draws - done)
+        outcomes = sample_outcomes(probs, n, rng)
+        caught = caught_matrix(outcomes, masks)
+        n_caught = caught.sum(axis=1)
+        caught_hist += np.bincount(n_caught, minlength=n_legs + 1)
+
+        hit = n_caught == n_legs
+        if hit.any():
+            dividend = np.ones(int(hit.sum()))
+            won = outcomes[hit]
+            for i, o in enumerate(odds):
+                dividend *= o[won[:, i]]
+            pay = unit * dividend * payout_ratio
+            hits += len(pay)
+            payout_sum += float(pay.sum())
+            payouts.append(pay)
+        done += n
+    elapsed = time.perf_counter() - t0
+
+    exact = 1.0
+    for p, m in zip(probs, masks):
+        exact *= float(p[m].sum())
+
+    if cost is None:
+        combos = 1
+        for s in selection: combos *= len(s)
+        cost = combos * unit
+
+    payouts = np.concatenate(payouts) if payouts else np.zeros(0)
+    expected_payout = payout_sum / n_draws
+    return {
+        'draws': n_draws,
+        'hit_prob': hits / n_draws,
+        'hit_prob_exact': exact,
+        'legs_caught_dist': (caught_hist / n_draws).tolist(),
+        'expected_payout': expected_payout,
+        'payout_p50': float(np.percentile(payouts, 50)) if len(payouts) else 0.0,
+        'payout_p90': float(np.percentile(payouts, 90)) if len(payouts) else 0.0,
+        'cost': cost,
+        'expected_return': expected_payout - cost,
+        'draws_per_sec': n_draws / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def simulate_batch(coupons, n_draws=DEFAULT_DRAWS, payout_ratio=PAYOUT_RATIO, seed=42, verbose=True):
+    """
+    Batch evaluation across cities and strategies.
+    coupons: [{'city', 'strategy', 'legs_data', 'selection', 'odds'?, 'unit'?, 'cost'?}, ...]
+    Returns one result dict per coupon (input keys city/strategy/pool carried over).
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    t0 = time.perf_counter()
+    for c in coupons:
+        res = simulate_coupon(
+            c['legs_data'], c['selection'], odds=c.get('odds'),
+            unit=c.get('unit', 1.25), cost=c.get('cost'),
+            n_draws=n_draws, payout_ratio=payout_ratio, rng=rng
+        )
+        for k in ('city', 'strategy', 'pool'):
+            if k in c: res[k] = c[k]
+        results.append(res)
+    elapsed = time.perf_counter() - t0
+
+    if verbose and results:
+        total = n_draws * len(results)
+        print(f"🎲 Simulated {len(results)} coupons x {n_draws:,} draws in {elapsed:.2f}s ({total/elapsed/1e6:.1f}M draws/s)")
+        for r in results:
+            print(f"   {r.get('city', '?'):22} {r.get('strategy', ''):10} | Tutma: %{r['hit_prob']*100:6.3f} "
+                  f"| Beklenen İkramiye: {r['expected_payout']:9.2f} TL | Maliyet: {r['cost']:8.2f} TL")
+    return results
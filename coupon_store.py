@@ -0,0 +1,164 @@
+"""
+Coupon Store - Kupon Modeli ve Yerel Depo
+=========================================
+Typed coupon model shared by the generators (push_forecasts_v10,
+generate_custom_sql, generate_stats_seed) and the readers (supabase_sync,
+analyze_coupon_structure). Coupons are kept in a local `coupons` table
+(parameterized upserts keyed on date, city, type) and written as
+newline-delimited JSON, so nothing is rendered to / parsed back from SQL text.
+
+  coupons = [Coupon(date='2026-01-19', city='İzmir', title=..., legs=[...])]
+  save_coupons(conn, coupons); conn.commit()
+  write_ndjson('daily_forecasts.ndjson', coupons)
+  load_coupons(conn, date='2026-01-19')
+
+Usage:
+    python coupon_store.py --date 19/01/2026            # list the day's coupons
+    python coupon_store.py --date 19/01/2026 --ndjson out.ndjson
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field, asdict, fields
+from datetime import datetime
+from typing import Optional
+
+sys.path.append(os.getcwd())
+import tjk_db
+
+DB_NAME = "tjk_races.db"
+
+# Columns sent to Supabase (source / updated_at stay local)
+REMOTE_FIELDS = ('date', 'city', 'type', 'star_cost', 'title', 'subtitle', 'status', 'winning_amount', 'legs', 'frontier')
+
+
+@dataclass
+class Coupon:
+    date: str                      # YYYY-MM-DD
+    city: str
+    title: str
+    legs: list
+    type: str = 'premium'
+    star_cost: int = 50
+    subtitle: Optional[str] = None
+    status: str = 'pending'
+    winning_amount: float = 0.0
+    frontier: Optional[dict] = None
+    source: str = ''
+
+    @property
+    def key(self):
+        return (self.date, self.city, self.type)
+
+    def to_row(self):
+        """Supabase row (legs / frontier stay JSON objects)."""
+        d = asdict(self)
+        return {k: d[k] for k in REMOTE_FIELDS}
+
+    def to_json(self):
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_dict(cls, d):
+        known = {f.name for f in fields(cls)}
+        d = {k: v for k, v in d.items() if k in known}
+        for k in ('legs', 'frontier'):
+            if isinstance(d.get(k), str): d[k] = json.loads(d[k])
+        return cls(**d)
+
+
+def iso_date(date_str):
+    """DD/MM/YYYY -> YYYY-MM-DD (ISO input passes through)."""
+    if '/' in date_str:
+        d, m, y = date_str.split('/')
+        return f"{y}-{m}-{d}"
+    return date_str
+
+
+def init_coupon_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coupons (
+            date TEXT NOT NULL,
+            city TEXT NOT NULL,
+            type TEXT NOT NULL,
+            star_cost INTEGER,
+            title TEXT,
+            subtitle TEXT,
+            status TEXT,
+            winning_amount REAL,
+            legs TEXT,
+            frontier TEXT,
+            source TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (date, city, type)
+        )
+    """)
+
+
+def save_coupons(conn, coupons):
+    """Parameterized upsert on (date, city, type) + stats aggregates update; the caller commits."""
+    from stats_aggregates import update_stats
+    init_coupon_db(conn)
+    now = datetime.now().isoformat(timespec='seconds')
+    conn.executemany("""
+        INSERT INTO coupons (date, city, type, star_cost, title, subtitle, status, winning_amount, legs, frontier, source, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date, city, type) DO UPDATE SET
+            star_cost=excluded.star_cost, title=excluded.title, subtitle=excluded.subtitle, status=excluded.status,
+            winning_amount=excluded.winning_amount, legs=excluded.legs, frontier=excluded.frontier,
+            source=excluded.source, updated_at=excluded.updated_at
+    """, [(c.date, c.city, c.type, c.star_cost, c.title, c.subtitle, c.status, c.winning_amount,
+           json.dumps(c.legs, ensure_ascii=False),
+           None if c.frontier is None else json.dumps(c.frontier, ensure_ascii=False),
+           c.source, now) for c in coupons])
+    update_stats(conn, coupons)
+
+
+def load_coupons(conn, date=None, city=None, source=None, status=None):
+    init_coupon_db(conn)
+    where, params = [], []
+    for col, val in (('date', date and iso_date(date)), ('city', city), ('source', source), ('status', status)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            params.append(val)
+    q = "SELECT * FROM coupons" + (f" WHERE {' AND '.join(where)}" if where else "") + " ORDER BY date, city, type"
+    cur = conn.execute(q, params)
+    cols = [d[0] for d in cur.description]
+    return [Coupon.from_dict(dict(zip(cols, row))) for row in cur.fetchall()]
+
+
+def write_ndjson(path, coupons):
+    with open(path, 'w', encoding='utf-8') as f:
+        for c in coupons:
+            f.write(c.to_json() + "\n")
+    return path
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as f:
+        return [Coupon.from_dict(json.loads(line)) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", help="DD/MM/YYYY or YYYY-MM-DD (default: all)")
+    parser.add_argument("--city")
+    parser.add_argument("--source", help="push_forecasts_v10 / generate_custom_sql / generate_stats_seed")
+    parser.add_argument("--ndjson", help="Write the selected coupons to this file")
+    args = parser.parse_args()
+
+    conn = tjk_db.connect(DB_NAME)
+    coupons = load_coupons(conn, args.date, args.city, args.source)
+    conn.close()
+
+    print(f"🎫 {len(coupons)} coupons")
+    for c in coupons:
+        print(f"   {c.date} {c.city[:22]:22} {c.type:8} {c.status:8} {len(c.legs)} legs | {c.subtitle or ''} [{c.source}]")
+    if args.ndjson:
+        print(f"✅ {write_ndjson(args.ndjson, coupons)}")
+
+
+if __name__ == "__main__":
+    main()
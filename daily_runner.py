@@ -2,30 +2,42 @@
 """
 Daily Runner - Automated Forecast Generation System
 ====================================================
-This script orchestrates the daily prediction workflow:
+This script orchestrates the daily prediction workflow as a DAG (pipeline_dag):
 1. Scrape today's race program from TJK
-2. Refresh galop (training) data
+2. Refresh galop (training) data  } in parallel
+   Build history stats            }
 3. Generate predictions for all Turkish cities
 4. Sync results to Supabase
 
-Run manually: python3 daily_runner.py
+Stages whose inputs/outputs are unchanged since their last successful run
+are skipped; a failed stage blocks only what depends on it. Every run writes
+a JSON run record next to its log (logs/daily_<run id>.json).
+
+Run manually: python3 daily_runner.py [--jobs 2] [--force [STAGE ...]] [--dry-run]
 Scheduled:    Cron at 08:00 AM daily
 """
 
-import subprocess
+import argparse
 import sys
 import os
 import logging
 from datetime import datetime
 from pathlib import Path
 
+from timing import stage_table, write_trace, TRACE_ENV
+from pipeline_dag import run_pipeline, log_summary, STATE_FILE, DB_NAME
+
 # Setup
 PROJECT_DIR = Path(__file__).parent.absolute()
 LOG_DIR = PROJECT_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
+RUN_ID = datetime.now().strftime('%Y%m%d_%H%M%S')
+# Child scripts write their own stage traces next to the runner's
+TRACE_DIR = Path(os.environ.get(TRACE_ENV, PROJECT_DIR / "traces")) / RUN_ID
 
 # Configure logging
-log_file = LOG_DIR / f"daily_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+log_file = LOG_DIR / f"daily_{RUN_ID}.log"
+RECORD_FILE = LOG_DIR / f"daily_{RUN_ID}.json"
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [%(levelname)s] %(message)s',
@@ -36,98 +48,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_command(cmd: list, description: str) -> bool:
-    """Execute a command and log output."""
-    logger.info(f"🚀 Starting: {description}")
-    logger.info(f"   Command: {' '.join(cmd)}")
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            cwd=PROJECT_DIR,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout
-        )
-        
-        if result.stdout:
-            for line in result.stdout.strip().split('\n')[-20:]:  # Last 20 lines
-                logger.info(f"   {line}")
-        
-        if result.returncode == 0:
-            logger.info(f"✅ Completed: {description}")
-            return True
-        else:
-            logger.error(f"❌ Failed: {description}")
-            if result.stderr:
-                logger.error(f"   Error: {result.stderr[:500]}")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        logger.error(f"⏰ Timeout: {description}")
-        return False
-    except Exception as e:
-        logger.error(f"💥 Exception in {description}: {e}")
-        return False
-
-
-def step_1_scrape_program():
-    """Scrape today's race program."""
-    today = datetime.now().strftime("%d/%m/%Y")
-    return run_command(
-        ["python3", "tjk_scraper/scrape.py", "--start_date", today],
-        f"Scrape race program for {today}"
-    )
-
-
-def step_2_refresh_galops():
-    """Refresh galop training data."""
-    return run_command(
-        ["python3", "refresh_gallops.py"],
-        "Refresh galop data"
-    )
-
-
-def step_3_generate_forecasts():
-    """Generate predictions for all cities."""
-    return run_command(
-        ["python3", "push_forecasts_v10.py", "--all-cities"],
-        "Generate forecasts for all TR cities"
-    )
-
-
-def step_4_sync_supabase():
-    """Push forecasts to Supabase."""
-    return run_command(
-        ["python3", "supabase_sync.py"],
-        "Sync forecasts to Supabase"
-    )
+def build_stages(date: str) -> list:
+    """Daily DAG: program -> (galops || history) -> forecasts -> sync."""
+    iso = datetime.strptime(date, "%d/%m/%Y").strftime("%Y-%m-%d")
+    program_rows = ('sql', """
+        SELECT pr.city, pr.race_no, pr.time, pe.program_no, pe.horse_name, pe.jockey, pe.weight, pe.hp
+        FROM program_entries pe JOIN program_races pr ON pe.program_race_id = pr.id
+        WHERE pr.date = ? ORDER BY pr.city, pr.race_no, pe.program_no, pe.horse_name
+    """, (date,))
+    models = [('file', f) for f in ('model_honest_lgbm.pkl', 'model_honest_cat.pkl', 'model_honest_xgb.pkl',
+                                    'le_track_honest.pkl', 'le_city_honest.pkl')]
+    return [
+        {'name': 'program', 'ttl': 3 * 3600,
+         'cmd': ["python3", "tjk_scraper/scrape_program.py", "--date", date],
+         'inputs': [('file', 'tjk_scraper/scrape_program.py')],
+         'outputs': [program_rows]},
+        {'name': 'galops', 'deps': ['program'], 'ttl': 6 * 3600,
+         'cmd': ["python3", "refresh_gallops.py", "--date", date],
+         'inputs': [('file', 'refresh_gallops.py')],
+         'outputs': [('sql', """
+            SELECT COUNT(*), MAX(g.date) FROM gallops g WHERE g.horse_name IN (
+                SELECT pe.horse_name FROM program_entries pe JOIN program_races pr ON pe.program_race_id = pr.id
+                WHERE pr.date = ?)
+         """, (date,))]},
+        {'name': 'history', 'deps': ['program'],
+         'cmd': ["python3", "push_forecasts_v10.py", "--all-cities", "--date", date, "--history-only"],
+         'inputs': [('file', 'push_forecasts_v10.py'), ('file', 'production_engine.py'),
+                    ('sql', "SELECT COUNT(*), MAX(id) FROM results")],
+         'outputs': [('glob', os.path.join('.cache', 'history', f"{date.replace('/', '-')}_*.npz"))]},
+        {'name': 'forecasts', 'deps': ['galops', 'history'],
+         'cmd': ["python3", "push_forecasts_v10.py", "--all-cities", "--date", date],
+         'inputs': [('file', 'push_forecasts_v10.py'), ('file', 'production_engine.py')] + models,
+         'outputs': [('sql', "SELECT city, type, subtitle, legs FROM coupons WHERE date = ? AND source = 'push_forecasts_v10' ORDER BY city, type", (iso,))]},
+        {'name': 'sync', 'deps': ['forecasts'],
+         'cmd': ["python3", "supabase_sync.py"],
+         'inputs': [('file', 'supabase_sync.py'),
+                    ('sql', "SELECT city, type, status, legs FROM coupons WHERE date = ? ORDER BY city, type", (iso,))],
+         'outputs': [('sql', "SELECT city, type, hash FROM sync_state WHERE table_name = 'coupons' AND date = ? ORDER BY city, type", (iso,))]},
+    ]
 
 
 def main():
     """Main orchestration flow."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2, help="Stages run in parallel (default: 2)")
+    parser.add_argument("--force", nargs='*', metavar="STAGE", help="Re-run stages even if fresh (no names: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    args = parser.parse_args()
+    force = True if args.force == [] else tuple(args.force or ())
+    
     start_time = datetime.now()
     logger.info("="*60)
     logger.info("🏇 DAILY RUNNER - Starting Automated Forecast Generation")
     logger.info(f"   Date: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("="*60)
     
-    steps = [
-        ("Program Scrape", step_1_scrape_program),
-        ("Galop Refresh", step_2_refresh_galops),
-        ("Forecast Generation", step_3_generate_forecasts),
-        ("Supabase Sync", step_4_sync_supabase),
-    ]
-    
-    results = {}
-    all_success = True
-    
-    for name, func in steps:
-        success = func()
-        results[name] = "✅" if success else "❌"
-        if not success:
-            all_success = False
-            # Continue anyway to try other steps
+    record = run_pipeline(
+        build_stages(start_time.strftime("%d/%m/%Y")), jobs=args.jobs, force=force, dry_run=args.dry_run,
+        cwd=PROJECT_DIR, env={**os.environ, TRACE_ENV: str(TRACE_DIR)},
+        state_path=str(PROJECT_DIR / STATE_FILE), record_path=RECORD_FILE,
+        db_path=str(PROJECT_DIR / DB_NAME), run_id=RUN_ID
+    )
     
     # Summary
     elapsed = (datetime.now() - start_time).total_seconds()
@@ -135,17 +116,20 @@ def main():
     logger.info("="*60)
     logger.info("📊 DAILY RUNNER - Summary")
     logger.info("="*60)
-    for name, status in results.items():
-        logger.info(f"   {status} {name}")
-    logger.info(f"   ⏱️  Total Time: {elapsed:.1f} seconds")
+    log_summary(record)
+    for r in stage_table():
+        logger.info(f"      {r['stage']:22} {r['total']:8.1f}s  ({r['total'] / max(elapsed, 1e-9) * 100:4.1f}%)")
+    trace = write_trace(str(TRACE_DIR / "daily_runner.json"))
+    logger.info(f"   🧵 Traces: {trace} (+ per-step traces in {TRACE_DIR})")
+    logger.info(f"   🗂️  Run record: {RECORD_FILE}")
     logger.info("="*60)
     
-    if all_success:
+    if record['ok']:
         logger.info("🎉 All steps completed successfully!")
     else:
         logger.warning("⚠️ Some steps failed. Check logs above.")
     
-    return 0 if all_success else 1
+    return 0 if record['ok'] else 1
 
 
 if __name__ == "__main__":
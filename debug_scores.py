@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import joblib
 import sys
@@ -7,6 +6,7 @@ import os
 import math
 
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import (
     get_historical_stats_v10,
     compute_galop_features,
@@ -23,7 +23,7 @@ def debug_scores():
     le_track = joblib.load('le_track_honest.pkl')
     le_city = joblib.load('le_city_honest.pkl')
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     pr_df = pd.read_sql_query(f"SELECT * FROM program_races WHERE date='{TARGET_DATE}' AND city LIKE '%Bursa%'", conn)
     race_ids = tuple(pr_df['id'].tolist())
     df = pd.read_sql_query(f"SELECT pe.*, pr.race_no, pr.date, pr.city, pr.distance, pr.track_type FROM program_entries pe JOIN program_races pr ON pe.program_race_id = pr.id WHERE pr.id IN {race_ids}", conn)
@@ -0,0 +1,176 @@
+"""
+Feature Cache - Günlük Özellik / Skor Önbelleği
+================================================
+Stores the full v10 feature matrix plus the base ensemble probability of one
+(date, city) as a columnar .npz file, so tuning and backtest runs only redo
+the cheap strategy layer (boosts, scoring, coupon optimization).
+
+Key: (source, date, city, model set, feature spec version). The model set is
+the model prefix plus a signature of the pickle files, so retraining
+invalidates it. Each file also records a fingerprint of that day's results and
+program rows plus the count / newest id of the results dated before it (the
+horse / jockey history features read only earlier days), so a scrape of
+later days leaves the entry warm.
+Column dtypes and nulls survive the round trip: a warm load returns the same
+frame as the cold build.
+
+Bump FEATURE_SPEC_VERSION whenever add_v10_features / V10_FEATURES change.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from production_engine import V10_FEATURES
+from coupon_store import iso_date
+
+FEATURE_SPEC_VERSION = 1
+CACHE_DIR = os.path.join('.cache', 'features')
+
+_stats = {'hits': 0, 'misses': 0, 'stale': 0}
+
+
+def model_signature(prefix):
+    """Model prefix + size/mtime of its pickles (and encoders)."""
+    tag = prefix.split('_')[1] if '_' in prefix else prefix
+    files = [f'{prefix}_lgbm.pkl', f'{prefix}_cat.pkl', f'{prefix}_xgb.pkl',
+             f'le_track_{tag}.pkl', f'le_city_{tag}.pkl']
+    h = hashlib.sha1()
+    for f in files:
+        try:
+            st = os.stat(f)
+            h.update(f"{f}:{st.st_size}:{int(st.st_mtime)}".encode())
+        except OSError:
+            h.update(f"{f}:missing".encode())
+    return f"{prefix}-{h.hexdigest()[:10]}"
+
+
+def spec_signature():
+    return f"v{FEATURE_SPEC_VERSION}-" + hashlib.sha1(','.join(V10_FEATURES).encode()).hexdigest()[:8]
+
+
+def cache_path(source, date_str, city, model_sig):
+    key = f"{source}|{date_str}|{city}|{model_sig}|{spec_signature()}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    safe_date = date_str.replace('/', '-')
+    return os.path.join(CACHE_DIR, f"{safe_date}_{digest}.npz")
+
+
+def data_fingerprint(conn, date_str, city):
+    """Changes whenever results (or program entries) of the day change, or a result dated before it is added."""
+    res = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(res.rank), 0), COALESCE(SUM(res.ganyan), 0)
+        FROM results res JOIN races r ON res.race_id = r.id
+        WHERE r.date = ? AND r.city = ?
+    """, (date_str, city)).fetchone()
+    try:
+        prog = conn.execute("""
+            SELECT COUNT(*) FROM program_entries pe
+            JOIN program_races pr ON pe.program_race_id = pr.id
+            WHERE pr.date = ? AND pr.city = ?
+        """, (date_str, city)).fetchone()
+    except Exception:
+        prog = (0,)
+    # races.date is DD/MM/YYYY: compare as YYYY-MM-DD
+    past = conn.execute("""
+        SELECT COUNT(*), COALESCE(MAX(res.id), 0)
+        FROM results res JOIN races r ON res.race_id = r.id
+        WHERE substr(r.date, 7, 4) || '-' || substr(r.date, 4, 2) || '-' || substr(r.date, 1, 2) < ?
+    """, (iso_date(date_str),)).fetchone()
+    return f"{res[0]}:{res[1]}:{round(float(res[2]), 2)}:{prog[0]}:{past[0]}:{past[1]}"
+
+
+def save_frame(path, df, meta):
+    """
+    Columnar .npz: numpy ints / floats / bools are stored as they are, other
+    numeric columns (nullable Int64 ...) as float, everything else as str plus
+    a null mask. The dtypes go into meta so load_frame can restore them.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biuf':
+            arrays[f"c:{col}"] = s.to_numpy()
+        elif pd.api.types.is_numeric_dtype(s):
+            arrays[f"c:{col}"] = s.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            arrays[f"s:{col}"] = s.astype(str).to_numpy(dtype=str)
+            null = s.isna().to_numpy()
+            if null.any():
+                arrays[f"n:{col}"] = null
+    meta = dict(meta, columns=[str(c) for c in df.columns], dtypes={str(c): str(t) for c, t in df.dtypes.items()})
+    arrays['__meta__'] = np.array(json.dumps(meta, ensure_ascii=False))
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_frame(path):
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(str(z['__meta__']))
+        arrays = {name: z[name] for name in z.files if name != '__meta__'}
+    dtypes = meta.get('dtypes', {})
+    cols = {}
+    for name, values in arrays.items():
+        kind, col = name[0], name[2:]
+        if kind == 'n': continue
+        if kind == 's':
+            values = values.astype(object)
+            null = arrays.get(f"n:{col}")
+            if null is not None:
+                values[null] = None
+        s = pd.Series(values)
+        dtype = dtypes.get(col)
+        if dtype and dtype != str(s.dtype):
+            s = s.astype(dtype)
+        cols[col] = s
+    order = meta.get('columns') or list(cols)
+    return pd.DataFrame({c: cols[c] for c in order}), meta
+
+
+def cached_frame(conn, date_str, city, model_prefix, build, source='results', refresh=False):
+    """
+    Returns the cached feature frame for (date, city) or builds it with
+    build(conn, date_str, city) and stores it. build must return a DataFrame
+    with V10_FEATURES and 'base_prob' (or None / empty for no data).
+    """
+    path = cache_path(source, date_str, city, model_signature(model_prefix))
+    fp = data_fingerprint(conn, date_str, city)
+
+    if not refresh and os.path.exists(path):
+        try:
+            df, meta = load_frame(path)
+            if meta.get('fingerprint') == fp:
+                _stats['hits'] += 1
+                return df
+            _stats['stale'] += 1
+        except Exception:
+            pass
+
+    _stats['misses'] += 1
+    df = build(conn, date_str, city)
+    if df is None or df.empty:
+        return df
+    save_frame(path, df.reset_index(drop=True), {
+        'source': source, 'date': date_str, 'city': city, 'model': model_prefix,
+        'spec': spec_signature(), 'fingerprint': fp
+    })
+    return df
+
+
+def cache_stats():
+    return dict(_stats)
+
+
+def clear_cache():
+    if not os.path.isdir(CACHE_DIR): return 0
+    n = 0
+    for f in os.listdir(CACHE_DIR):
+        if f.endswith('.npz'):
+            os.remove(os.path.join(CACHE_DIR, f))
+            n += 1
+    return n
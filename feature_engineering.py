@@ -1,5 +1,5 @@
 import pandas as pd
-import sqlite3
+import tjk_db
 import numpy as np
 
 # DB Connection
@@ -7,7 +7,7 @@ DB_NAME = "tjk_races.db"
 
 def fetch_data():
     print(f"Fetching data from local DB {DB_NAME}...")
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     query = """
     SELECT 
         r.id as race_id, r.date, r.city, r.track_type, r.distance, r.prize, r.track_condition,
@@ -120,13 +120,13 @@ def calculate_rolling_stats(df):
     try:
         # 1. Load Gallops
         gallops_query = "SELECT horse_id, date as gallop_date, distance as g_dist, duration as g_sec FROM gallops"
-        df_gal = pd.read_sql_query(gallops_query, sqlite3.connect(DB_NAME))
+        df_gal = pd.read_sql_query(gallops_query, tjk_db.connect(DB_NAME))
         df_gal['gallop_date'] = pd.to_datetime(df_gal['gallop_date'], dayfirst=True)
         df_gal = df_gal.sort_values('gallop_date')
         
         # 2. Get Map (Name -> ID)
         map_query = "SELECT DISTINCT horse_name, horse_id FROM program_entries WHERE horse_id > 0"
-        df_map = pd.read_sql_query(map_query, sqlite3.connect(DB_NAME))
+        df_map = pd.read_sql_query(map_query, tjk_db.connect(DB_NAME))
         # Deduplicate map (just in case)
         df_map = df_map.drop_duplicates(subset=['horse_name'])
         
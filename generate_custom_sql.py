@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import json
 import sys
@@ -7,9 +6,12 @@ import os
 import joblib
 import numpy as np
 import math
+import argparse
+from datetime import datetime
 
 # Add path for scraper imports if needed
 sys.path.append('.')
+import tjk_db
 
 from production_engine import (
     prepare_v10_predictions, 
@@ -17,9 +19,15 @@ from production_engine import (
     optimize_coupon_logic, 
     DB_NAME
 )
+from coupon_frontier import compute_frontier, serialize_frontier
+from coupon_store import Coupon, iso_date, save_coupons, write_ndjson
+from pools import offered_pools
+from outbox import enqueue_rows
+from stats_aggregates import publish_stats
 
-def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
-    conn = sqlite3.connect(DB_NAME)
+def generate_coupons_for_date(date_str, output_file="seed_data_today.ndjson"):
+    """Stores the day's coupons locally (+ NDJSON) and queues them for publishing."""
+    conn = tjk_db.connect(DB_NAME)
     
     # Get TJK Cities (Turkish only)
     # Filter cities containing "Y.G." which typically denotes TJK program cities in our scraper
@@ -28,11 +36,7 @@ def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
     cities_query = "SELECT DISTINCT city FROM program_races WHERE date = ? AND city LIKE '%Y.G.%'"
     cities = pd.read_sql_query(cities_query, conn, params=(date_str,))
     
-    sql_statements = []
-    sql_statements.append(f"DELETE FROM coupons WHERE date = CURRENT_DATE;")
-    sql_statements.append("INSERT INTO coupons (date, city, type, star_cost, title, subtitle, legs) VALUES")
-    
-    values_list = []
+    coupons = []
     
     for _, city_row in cities.iterrows():
         city_full = city_row['city']
@@ -60,13 +64,15 @@ def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
         df = prepare_v10_predictions(df, date_str)
         if df is None: continue
         
-        # Determine 6 Legs (Last 6 races)
+        # Determine 6 Legs (main altılı = last 6 races)
         race_nos = sorted(df['race_no'].unique())
-        if len(race_nos) < 6:
+        pools = offered_pools(city_full, race_nos, ['ALTILI'])
+        if not pools:
             print(f"Skipping {city_name} - Not enough races ({len(race_nos)})")
             continue
             
-        legs = race_nos[-6:]
+        pool = pools[-1]
+        legs = pool['races']
         
         # Calculate Chaos for metadata
         avg_field_size = len(df) / len(race_nos)
@@ -102,7 +108,8 @@ def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
             
         # Run Optimizer (Budget ~600 TL for premium feel)
         # Using balanced logic for good coverage
-        selection, cost = optimize_coupon_logic(cols, 600.0) 
+        selection, cost = optimize_coupon_logic(cols, 600.0, unit=pool['unit']) 
+        frontier = compute_frontier(cols, unit=pool['unit'], max_cost=5000.0)
         
         # Flatten selection for easy lookup
         selected_map = {i: [x[0] for x in sel] for i, sel in enumerate(selection)}
@@ -214,6 +221,7 @@ def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
             
             legs_json.append({
                 "leg_no": i + 1,
+                "race_no": int(race_no),
                 "race_time": meta['race_time'] or "00:00",
                 "race_info": meta['race_info'] or "Koşu",
                 "distance": f"{int(float(meta['distance']))}m {meta['track_type']}",
@@ -221,29 +229,32 @@ def generate_sql_for_date(date_str, output_file="seed_data_today.sql"):
                 "horses": horses_json
             })
             
-        # SQL Values
-        # Escape single quotes in JSON
-        json_str = json.dumps(legs_json, ensure_ascii=False).replace("'", "''")
-        
         # Dynamic Pricing / Title
-        title = f"{city_name} Kahin Analizi"
-        subtitle = f"TUTAR: {cost:.2f} TL"
-        star_cost = 50
+        coupons.append(Coupon(
+            date=iso_date(date_str), city=city_name, title=f"{city_name} Kahin Analizi",
+            subtitle=f"TUTAR: {cost:.2f} TL", star_cost=50, legs=legs_json,
+            frontier=serialize_frontier(cols, frontier), source='generate_custom_sql'
+        ))
         
-        values_list.append(f"  (CURRENT_DATE, '{city_name}', 'premium', {star_cost}, '{title}', '{subtitle}', '{json_str}'::jsonb)")
-        
-    conn.close()
-    
-    if not values_list:
+    if not coupons:
+        conn.close()
         print("No valid predictions generated.")
-        return
+        return False
 
-    full_sql = "\n".join(sql_statements) + "\n" + ",\n".join(values_list) + ";"
+    # Local coupons + publish ops in one transaction (outbox flushed by daily_publish / outbox.py)
+    save_coupons(conn, coupons)
+    queued = enqueue_rows(conn, 'coupons', [c.to_row() for c in coupons])
+    publish_stats(conn)
+    conn.commit()
+    conn.close()
     
-    with open(output_file, "w") as f:
-        f.write(full_sql)
-        
-    print(f"✅ Generated {output_file}")
+    write_ndjson(output_file, coupons)
+    print(f"📬 Outbox: {queued['queued']} queued, {queued['skipped']} unchanged")
+    print(f"✅ {len(coupons)} coupons saved (local `coupons` table + {output_file})")
+    return True
 
 if __name__ == "__main__":
-    generate_sql_for_date("15/01/2026")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", default=datetime.now().strftime("%d/%m/%Y"), help="DD/MM/YYYY (default: today)")
+    args = parser.parse_args()
+    sys.exit(0 if generate_coupons_for_date(args.date) else 1)
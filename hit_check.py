@@ -0,0 +1,138 @@
+"""
+Hit Check - Vektörel Kupon Kontrolü
+===================================
+Checks many coupons against the race winners at once. Horse names are
+normalized and mapped to integer IDs (HorseIndex); coupons become a padded
+(coupons, legs, horses) ID array and winners a (coupons, legs) array, so
+legs caught, full hits and per-leg reasons are plain NumPy comparisons.
+
+Leg status codes:
+    CAUGHT        winner is in the selection
+    MISSED        winner ran in the leg but was not selected
+    NOT_IN_FIELD  winner is not among the leg's candidates (only with fields=,
+                  usually a name mismatch or a late entry)
+    PENDING       no result for the leg yet
+    NO_LEG        padding (coupon has fewer legs)
+
+Usage:
+    res = check_coupons(selections, winners)
+    res['legs_caught'][i], res['hit'][i], missed_labels(res, i)
+"""
+
+import re
+
+import numpy as np
+
+CAUGHT = 1
+MISSED = 0
+PENDING = -1
+NO_LEG = -2
+NOT_IN_FIELD = -3
+
+STATUS_NAMES = {CAUGHT: 'caught', MISSED: 'missed', PENDING: 'pending',
+                NO_LEG: 'no_leg', NOT_IN_FIELD: 'not_in_field'}
+
+
+def normalize_name(name):
+    """Upper-case (Turkish i/ı aware), trailing '(...)' tags and extra spaces removed."""
+    if name is None: return ''
+    s = str(name).replace('i', 'İ').replace('ı', 'I').upper()
+    s = re.sub(r'\s*\([^)]*\)\s*$', '', s)
+    return ' '.join(s.split())
+
+
+class HorseIndex:
+    """Normalized horse name <-> integer ID. Empty / None names map to -1."""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def id(self, name):
+        key = normalize_name(name[0] if isinstance(name, (tuple, list)) else name)
+        if not key: return -1
+        if key not in self.ids:
+            self.ids[key] = len(self.names)
+            self.names.append(key)
+        return self.ids[key]
+
+    def encode(self, names):
+        return [self.id(n) for n in names]
+
+
+def pack_selections(coupons, index):
+    """coupons: [[leg horses...] per leg] per coupon (names or (name, score) tuples)."""
+    n = len(coupons)
+    n_legs = np.array([len(c) for c in coupons], dtype=np.int32)
+    max_legs = int(n_legs.max()) if n else 0
+    max_horses = max((len(leg) for c in coupons for leg in c), default=0)
+    sel = np.full((n, max_legs, max(max_horses, 1)), -1, dtype=np.int32)
+    for i, c in enumerate(coupons):
+        for j, leg in enumerate(c):
+            ids = index.encode(leg)
+            sel[i, j, :len(ids)] = ids
+    return sel, n_legs
+
+
+def pack_winners(winners, index, max_legs):
+    """winners: [winner name or None per leg] per coupon -> (coupons, legs) IDs, -1 = pending."""
+    out = np.full((len(winners), max_legs), -1, dtype=np.int32)
+    for i, w in enumerate(winners):
+        ids = index.encode(w[:max_legs])
+        out[i, :len(ids)] = ids
+    return out
+
+
+def check_hits(sel, n_legs, winners, fields=None):
+    """
+    sel: (N, L, M) selected IDs (-1 padded), n_legs: (N,), winners: (N, L) IDs.
+    fields: optional (N, L, K) candidate IDs per leg for NOT_IN_FIELD.
+    """
+    n, max_legs = winners.shape
+    valid = np.arange(max_legs)[None, :] < n_legs[:, None]
+    known = winners >= 0
+    caught = (sel == winners[:, :, None]).any(axis=2) & known & valid
+
+    status = np.full((n, max_legs), MISSED, dtype=np.int8)
+    status[caught] = CAUGHT
+    status[~known] = PENDING
+    if fields is not None:
+        in_field = (fields == winners[:, :, None]).any(axis=2)
+        status[(status == MISSED) & ~in_field] = NOT_IN_FIELD
+    status[~valid] = NO_LEG
+
+    legs_caught = caught.sum(axis=1)
+    return {
+        'status': status,
+        'legs_caught': legs_caught,
+        'hit': (legs_caught == n_legs) & (n_legs > 0),
+        'pending': (status == PENDING).sum(axis=1),
+        'n_legs': n_legs
+    }
+
+
+def check_coupons(selections, winners, fields=None):
+    """
+    Name-level entry point. selections: per coupon, per leg horse names;
+    winners: per coupon, per leg winner name (None = pending);
+    fields: optional per coupon, per leg all runners.
+    """
+    index = HorseIndex()
+    sel, n_legs = pack_selections(selections, index)
+    win = pack_winners(winners, index, sel.shape[1])
+    fld = pack_selections(fields, index)[0] if fields is not None else None
+    if fld is not None and fld.shape[1] < sel.shape[1]:
+        fld = np.pad(fld, ((0, 0), (0, sel.shape[1] - fld.shape[1]), (0, 0)), constant_values=-1)
+    res = check_hits(sel, n_legs, win, fld)
+    res['winners'] = [list(w) for w in winners]
+    return res
+
+
+def missed_labels(res, i):
+    """'L{leg}({winner})' for every leg of coupon i that was not caught."""
+    labels = []
+    for j, s in enumerate(res['status'][i]):
+        if s in (CAUGHT, NO_LEG): continue
+        w = res['winners'][i][j] if j < len(res['winners'][i]) else None
+        labels.append(f"L{j+1}({w or 'Unknown'})")
+    return labels
@@ -1,4 +1,4 @@
-import sqlite3
+import tjk_db
 import pandas as pd
 import joblib
 import argparse
@@ -9,7 +9,7 @@ from datetime import datetime
 DB_NAME = "tjk_races.db"
 
 def load_program(city, date_str):
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     query = """
     SELECT 
         pr.id as race_id, pr.city, pr.distance, pr.track_type, pr.date as race_date,
@@ -0,0 +1,66 @@
+"""
+Kahin CLI - Tek Giriş Noktası
+=============================
+One entry point for the daily tools. Every subcommand runs its existing
+script as __main__ with the remaining arguments, and the script is only
+loaded when its command is chosen, so `kahin --help` (or any command that
+never predicts) does not pay for pandas / requests / the model libraries.
+
+Usage:
+    python kahin.py scrape --date 20/01/2026
+    python kahin.py galops --date 20/01/2026
+    python kahin.py predict --date 20/01/2026 --jobs 4
+    python kahin.py backtest --days 15 --workers 4
+    python kahin.py tune --days 30 --random 5000
+    python kahin.py sync --dry-run
+    python kahin.py results --poll
+    python kahin.py predict --help           # the script's own options
+
+The import-time budget is checked by test_import_time.py (-X importtime).
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# command -> (script, description)
+COMMANDS = {
+    'scrape': (os.path.join('tjk_scraper', 'scrape_program.py'), "Yarış programını çek (program_races / program_entries)"),
+    'galops': ('refresh_gallops.py', "Programdaki atların idman (galop) verisini yenile"),
+    'predict': ('production_engine.py', "Tahmin raporu ve kuponlar (daily_predictions_*.md)"),
+    'backtest': ('backtest_engine.py', "Çok günlü paralel backtest"),
+    'tune': ('strategy_search.py', "Strateji parametre araması (grid / random)"),
+    'sync': ('supabase_sync.py', "Kuponları ve istatistikleri Supabase'e gönder"),
+    'results': ('results_reconciler.py', "Sonuçları çek, kupon ayaklarını eşleştir"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='kahin', description="🔮 Kahin - TJK tahmin araçları",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Komutlar:\n" + "\n".join(f"  {name:10} {desc}" for name, (_, desc) in COMMANDS.items()))
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="Çalıştırılacak araç")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Aracın kendi argümanları")
+    return parser
+
+
+def run(command, argv=()):
+    """Runs the command's script as __main__ (SystemExit from the script propagates)."""
+    script = os.path.join(PROJECT_DIR, COMMANDS[command][0])
+    sys.argv = [script, *argv]
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name='__main__')
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return run(args.command, args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Outbox - Kalıcı Yayın Kuyruğu
+=============================
+Publish operations (coupon upserts/deletes, result patches) are appended to a
+local `outbox` table in the same SQLite transaction as the data they publish;
+a flusher drains it to Supabase later. Generation never waits on the network
+and a crash mid-sync resumes from the first undelivered entry.
+
+  upsert  payload = row            bulk upsert (on_conflict), consecutive upserts batched
+  delete  payload = {'key': [...]} delete by on_conflict key
+  patch   payload = {'match': {'id': ...}, 'values': {...}}
+
+Every entry has an idempotency key (unique among pending entries) and every
+operation is idempotent on the server, so re-sending after a crash is safe.
+Failed entries back off exponentially; after MAX_ATTEMPTS they are parked
+until --retry-failed. A patch that matches no row (its coupon was never
+published) is parked at once, so it does not hold up the entries behind it.
+
+Usage:
+    python outbox.py --status
+    python outbox.py --flush
+    python outbox.py --flush --loop 60      # keep draining every 60 s
+    python outbox.py --retry-failed --flush
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+sys.path.append(os.getcwd())
+import tjk_db
+from supabase_sync import (UPSERT_KEYS, DB_PATH, SYNC_STATS, upsert_rows, delete_rows, supabase_request,
+                           payload_hash, plan_delta, mark_synced, sync_summary)
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 30          # seconds, doubled per failed attempt
+BACKOFF_MAX = 3600
+KEEP_SENT_DAYS = 7
+
+
+def init_outbox(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            idem_key TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at TEXT,
+            last_error TEXT,
+            sent_at TEXT
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_pending_key ON outbox(idem_key) WHERE sent_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(sent_at, id)")
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def enqueue(conn, table, op, payload, idem_key=None):
+    """Appends one operation (no commit: it belongs to the caller's transaction). False if already pending."""
+    init_outbox(conn)
+    idem_key = idem_key or f"{table}:{op}:{payload_hash(payload)}"
+    cur = conn.execute("INSERT OR IGNORE INTO outbox (table_name, op, payload, idem_key, created_at) VALUES (?, ?, ?, ?, ?)",
+                       (table, op, json.dumps(payload, ensure_ascii=False, default=str), idem_key, _now()))
+    return cur.rowcount > 0
+
+
+def enqueue_rows(conn, table, rows, force=False):
+    """Delta vs last delivered state: upserts for new/changed rows, deletes for rows gone from their dates."""
+    changed, hashes, gone, skipped = plan_delta(conn, table, rows, force)
+    keys = UPSERT_KEYS[table].split(',')
+    queued = 0
+    for row in changed:
+        k = tuple(str(row[c]) for c in keys)
+        queued += enqueue(conn, table, 'upsert', row, f"{table}:upsert:{'|'.join(k)}:{hashes[k]}")
+    for k in gone:
+        queued += enqueue(conn, table, 'delete', {'key': list(k)}, f"{table}:delete:{'|'.join(k)}")
+    return {'queued': queued, 'skipped': skipped, 'deletes': len(gone)}
+
+
+def enqueue_patch(conn, table, match, values):
+    payload = {'match': match, 'values': values}
+    return enqueue(conn, table, 'patch', payload, f"{table}:patch:{json.dumps(match, sort_keys=True)}:{payload_hash(values)}")
+
+
+def _deliver(conn, group):
+    """Sends one group (a batch of upserts or a single delete/patch); sync_state follows deliveries."""
+    table, op = group[0]['table_name'], group[0]['op']
+    payloads = [json.loads(e['payload']) for e in group]
+    if op == 'upsert':
+        if not upsert_rows(table, payloads): return False
+        keys = UPSERT_KEYS[table].split(',')
+        mark_synced(conn, table, {tuple(str(p[c]) for c in keys): payload_hash(p) for p in payloads})
+        SYNC_STATS['sent'] += len(payloads)
+        return True
+    p = payloads[0]
+    if op == 'delete':
+        if not delete_rows(table, [p['key']]): return False
+        mark_synced(conn, table, gone=[tuple(p['key'])])
+        SYNC_STATS['deleted'] += 1
+        return True
+    if op == 'patch':
+        flt = '&'.join(f"{c}=eq.{quote(str(v))}" for c, v in p['match'].items())
+        result = supabase_request("PATCH", f"{table}?{flt}&select={next(iter(p['match']))}", p['values'])
+        if result is None: return False
+        # A patch that matched nothing is not delivered: flush parks it
+        if not result: raise LookupError(f"no {table} row matches {p['match']}")
+        SYNC_STATS['sent'] += 1
+        return True
+    raise ValueError(f"Unknown outbox op: {op}")
+
+
+def _groups(entries, batch_size):
+    group = []
+    for e in entries:
+        if group and (e['op'] != 'upsert' or group[0]['op'] != 'upsert' or
+                      e['table_name'] != group[0]['table_name'] or len(group) >= batch_size):
+            yield group
+            group = []
+        group.append(e)
+        if e['op'] != 'upsert':
+            yield group
+            group = []
+    if group: yield group
+
+
+def flush(db_path=DB_PATH, batch_size=BATCH_SIZE, verbose=True):
+    """
+    Drains due entries in order; stops at the first failing group so order is
+    kept. 'pending' counts undelivered entries that are not parked.
+    """
+    conn = tjk_db.connect(db_path)
+    conn.row_factory = lambda cur, row: {d[0]: v for d, v in zip(cur.description, row)}
+    init_outbox(conn)
+    conn.commit()
+    entries = conn.execute("SELECT * FROM outbox WHERE sent_at IS NULL AND attempts < ? ORDER BY id",
+                           (MAX_ATTEMPTS,)).fetchall()
+    # Strict order: nothing overtakes an entry that is still backing off
+    now = _now()
+    due = next((i for i, e in enumerate(entries) if e['next_attempt_at'] and e['next_attempt_at'] > now), len(entries))
+    entries = entries[:due]
+
+    sent = failed = parked = 0
+    for group in _groups(entries, batch_size):
+        ids = [e['id'] for e in group]
+        marks = ','.join('?' * len(ids))
+        try:
+            ok, error = _deliver(conn, group), 'request failed'
+        except LookupError as e:
+            # Retrying cannot help until the row exists: park now (--retry-failed) and keep draining
+            conn.execute(f"UPDATE outbox SET attempts=?, last_error=? WHERE id IN ({marks})",
+                         [MAX_ATTEMPTS, str(e)[:500]] + ids)
+            conn.commit()
+            parked += len(group)
+            continue
+        except Exception as e:
+            ok, error = False, str(e)
+        if ok:
+            conn.execute(f"UPDATE outbox SET sent_at=?, attempts=attempts+1, last_error=NULL WHERE id IN ({marks})", [_now()] + ids)
+            conn.commit()
+            sent += len(group)
+            continue
+        attempts = group[0]['attempts'] + 1
+        wait = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+        conn.execute(f"UPDATE outbox SET attempts=attempts+1, last_error=?, next_attempt_at=? WHERE id IN ({marks})",
+                     [error[:500], (datetime.now() + timedelta(seconds=wait)).isoformat(timespec='seconds')] + ids)
+        conn.commit()
+        failed = len(group)
+        break
+
+    conn.execute("DELETE FROM outbox WHERE sent_at IS NOT NULL AND sent_at < ?",
+                 ((datetime.now() - timedelta(days=KEEP_SENT_DAYS)).isoformat(timespec='seconds'),))
+    conn.commit()
+    counts = conn.execute("""
+        SELECT COALESCE(SUM(attempts < ?), 0) AS pending, COALESCE(SUM(attempts >= ?), 0) AS parked
+        FROM outbox WHERE sent_at IS NULL
+    """, (MAX_ATTEMPTS, MAX_ATTEMPTS)).fetchone()
+    conn.close()
+    result = {'sent': sent, 'failed': failed, 'pending': counts['pending'], 'parked': counts['parked']}
+    if verbose:
+        icon = "✅" if not result['pending'] else ("⏳" if not failed else "⚠️")
+        print(f"{icon} Outbox: {sent} delivered, {result['pending']} pending"
+              + (f", {parked} parked now ({result['parked']} total, see --status)" if parked else "")
+              + f" | {sync_summary()}")
+    return result
+
+
+def start_background_flush(interval=60, db_path=DB_PATH):
+    """Daemon thread draining the outbox every `interval` s; set the returned event to stop."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try: flush(db_path, verbose=False)
+            except Exception as e: print(f"⚠️ Outbox flush error: {e}")
+            stop.wait(interval)
+    threading.Thread(target=loop, name='outbox-flush', daemon=True).start()
+    return stop
+
+
+def status(db_path=DB_PATH):
+    conn = tjk_db.connect(db_path)
+    init_outbox(conn)
+    rows = conn.execute("""
+        SELECT table_name, op,
+               SUM(sent_at IS NULL AND attempts < ?), SUM(sent_at IS NULL AND attempts >= ?), SUM(sent_at IS NOT NULL),
+               MIN(CASE WHEN sent_at IS NULL THEN created_at END), MAX(last_error)
+        FROM outbox GROUP BY table_name, op ORDER BY table_name, op
+    """, (MAX_ATTEMPTS, MAX_ATTEMPTS)).fetchall()
+    conn.close()
+    print(f"📬 OUTBOX ({db_path})")
+    print(f"   {'Table':12} {'Op':7} {'Pending':>8} {'Parked':>7} {'Sent':>6}  Oldest pending / last error")
+    for table, op, pending, parked, sent_n, oldest, err in rows:
+        print(f"   {table:12} {op:7} {pending:8d} {parked:7d} {sent_n:6d}  {oldest or '-'}" + (f" | {err[:60]}" if err else ""))
+    return rows
+
+
+def retry_failed(db_path=DB_PATH):
+    conn = tjk_db.connect(db_path)
+    init_outbox(conn)
+    n = conn.execute("UPDATE outbox SET attempts=0, next_attempt_at=NULL WHERE sent_at IS NULL").rowcount
+    conn.commit()
+    conn.close()
+    print(f"🔁 {n} pending entries reset for retry")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flush", action="store_true", help="Deliver due entries")
+    parser.add_argument("--loop", type=int, metavar="SECONDS", help="With --flush: keep draining every N seconds")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--retry-failed", action="store_true", help="Reset backoff/attempts of undelivered entries")
+    parser.add_argument("--db", default=str(DB_PATH))
+    args = parser.parse_args()
+
+    if args.retry_failed: retry_failed(args.db)
+    if args.flush:
+        while True:
+            result = flush(args.db)
+            if not args.loop: break
+            time.sleep(args.loop)
+        if result['failed']: return 1
+    if args.status or not (args.flush or args.retry_failed): status(args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Pipeline DAG - Bağımlılık Grafiği ile Akış Yöneticisi
+=====================================================
+Small DAG runner for the daily workflow. A stage is a dict:
+
+    {'name': 'galops', 'cmd': ['python3', 'refresh_gallops.py', '--date', D],
+     'deps': ['program'],
+     'inputs':  [('file', 'refresh_gallops.py')],
+     'outputs': [('sql', "SELECT COUNT(*), MAX(date) FROM gallops")],
+     'timeout': 600, 'ttl': 6 * 3600}
+
+Fingerprint specs:
+    ('file', path)            content hash
+    ('glob', pattern)         names + sizes + mtimes of the matching files
+    ('sql', query, params)    hash of the result rows (tjk_races.db)
+    ('value', x)              any JSON-able value
+
+A stage is skipped as fresh when its input fingerprint (own inputs + cmd +
+the output fingerprints of its deps) equals the one recorded after its last
+successful run, its outputs still match what that run produced and its ttl
+has not expired. Ready stages run in parallel (up to `jobs`); a failed stage
+blocks everything downstream while independent branches keep going.
+
+State lives in .cache/pipeline_state.json; run_pipeline() returns (and can
+write) a JSON run record with status, timing, fingerprints and the log tail
+of every stage.
+"""
+
+import concurrent.futures as cf
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import time
+from datetime import datetime
+
+import tjk_db
+from timing import span
+
+DB_NAME = "tjk_races.db"
+STATE_FILE = os.path.join('.cache', 'pipeline_state.json')
+DEFAULT_TIMEOUT = 600      # seconds per stage
+LOG_TAIL = 20              # stdout lines kept per stage
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_file(path):
+    h = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except FileNotFoundError:
+        return 'missing'
+    return h.hexdigest()
+
+
+def fingerprint(specs, db_path=DB_NAME, base=None):
+    """sha1 over the fingerprint specs (missing files / tables hash as such, they do not raise).
+    Relative file / glob paths are resolved against `base` (the stages' cwd)."""
+    h = hashlib.sha1()
+    conn = None
+    for spec in specs:
+        kind = spec[0]
+        if kind == 'file':
+            part = _hash_file(os.path.join(base or '', spec[1]))
+        elif kind == 'glob':
+            paths = sorted(glob.glob(os.path.join(base or '', spec[1])))
+            part = json.dumps([(os.path.basename(p), os.path.getsize(p), int(os.path.getmtime(p))) for p in paths])
+        elif kind == 'sql':
+            conn = conn or tjk_db.connect(db_path)
+            try:
+                part = json.dumps(conn.execute(spec[1], spec[2] if len(spec) > 2 else ()).fetchall(),
+                                  ensure_ascii=False, default=str)
+            except sqlite3.OperationalError as e:
+                part = f"error:{e}"
+        elif kind == 'value':
+            part = json.dumps(spec[1], ensure_ascii=False, default=str, sort_keys=True)
+        else:
+            raise ValueError(f"Unknown fingerprint spec: {kind}")
+        h.update(f"{kind}:{part}\n".encode('utf-8'))
+    if conn: conn.close()
+    return h.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def topo_order(stages):
+    """Stage names in dependency order (declaration order among independent stages)."""
+    by_name = {s['name']: s for s in stages}
+    order, visiting = [], set()
+
+    def visit(name, chain=()):
+        if name in order: return
+        if name in visiting: raise ValueError(f"Cycle in pipeline: {' -> '.join(chain + (name,))}")
+        if name not in by_name: raise ValueError(f"Unknown stage: {name} (needed by {chain[-1] if chain else '?'})")
+        visiting.add(name)
+        for dep in by_name[name].get('deps', []):
+            visit(dep, chain + (name,))
+        visiting.discard(name)
+        order.append(name)
+
+    for s in stages:
+        visit(s['name'])
+    return order
+
+
+def stale_reason(stage, prev, input_fp, force=(), db_path=DB_NAME, base=None):
+    """Why the stage has to run, or None when it is fresh."""
+    if force is True or stage['name'] in force: return 'forced'
+    if not prev: return 'never run'
+    if prev['input_fp'] != input_fp: return 'inputs changed'
+    if stage.get('ttl') and time.time() - prev['finished_ts'] > stage['ttl']: return 'ttl expired'
+    if stage.get('outputs') and fingerprint(stage['outputs'], db_path, base) != prev['output_fp']: return 'outputs changed'
+    return None
+
+
+def run_stage(stage, cwd=None, env=None):
+    """Runs the stage command; -> {'returncode', 'error', 'tail', 'started_at', 'seconds'}"""
+    started_at, t0 = datetime.now().isoformat(timespec='seconds'), time.perf_counter()
+    with span(stage['name']):
+        try:
+            result = subprocess.run(stage['cmd'], cwd=cwd, env=env, capture_output=True, text=True,
+                                    timeout=stage.get('timeout', DEFAULT_TIMEOUT))
+            out = {'returncode': result.returncode,
+                   'error': (result.stderr or '')[-500:] if result.returncode else None,
+                   'tail': (result.stdout or '').strip().split('\n')[-LOG_TAIL:]}
+        except subprocess.TimeoutExpired:
+            out = {'returncode': None, 'error': f"timeout after {stage.get('timeout', DEFAULT_TIMEOUT)}s", 'tail': []}
+        except Exception as e:
+            out = {'returncode': None, 'error': str(e), 'tail': []}
+    return {**out, 'started_at': started_at, 'seconds': round(time.perf_counter() - t0, 3)}
+
+
+def run_pipeline(stages, jobs=2, force=(), dry_run=False, cwd=None, env=None,
+                 state_path=STATE_FILE, record_path=None, db_path=DB_NAME, run_id=None):
+    """Runs the DAG; returns the run record (record['ok'] is False if any stage failed or was blocked)."""
+    by_name = {s['name']: s for s in stages}
+    order = topo_order(stages)
+    state = load_state(state_path)
+    records, out_fp, running = {}, {}, {}
+    pending = list(order)
+    started_at, t0 = datetime.now().isoformat(timespec='seconds'), time.perf_counter()
+
+    with cf.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage = by_name[name]
+                deps = stage.get('deps', [])
+                bad = [d for d in deps if records.get(d, {}).get('status') in ('failed', 'blocked')]
+                if bad:
+                    pending.remove(name)
+                    records[name] = {'name': name, 'status': 'blocked', 'reason': f"upstream failed: {', '.join(bad)}"}
+                    logger.warning(f"⛔ Blocked: {name} ({records[name]['reason']})")
+                    continue
+                if not all(d in out_fp for d in deps) or len(running) >= max(1, jobs):
+                    continue
+
+                pending.remove(name)
+                input_fp = fingerprint(stage.get('inputs', []) + [('value', stage['cmd']),
+                                       ('value', {d: out_fp[d] for d in deps})], db_path, cwd)
+                reason = stale_reason(stage, state.get(name), input_fp, force, db_path, cwd)
+                if reason is None:
+                    out_fp[name] = state[name]['output_fp']
+                    records[name] = {'name': name, 'status': 'fresh', 'reason': 'up to date',
+                                     'input_fp': input_fp, 'output_fp': out_fp[name],
+                                     'last_run': state[name].get('finished_at')}
+                    logger.info(f"⏭️  Fresh: {name} (last run {state[name].get('finished_at')})")
+                    continue
+                if dry_run:
+                    out_fp[name] = f"dry-run:{input_fp}"
+                    records[name] = {'name': name, 'status': 'would_run', 'reason': reason, 'input_fp': input_fp}
+                    logger.info(f"📝 Would run: {name} ({reason})")
+                    continue
+
+                logger.info(f"🚀 Starting: {name} ({reason})")
+                logger.info(f"   Command: {' '.join(map(str, stage['cmd']))}")
+                running[pool.submit(run_stage, stage, cwd, env)] = (name, input_fp, reason)
+
+            if not running: continue
+            done, _ = cf.wait(running, return_when=cf.FIRST_COMPLETED)
+            for fut in done:
+                name, input_fp, reason = running.pop(fut)
+                stage, res = by_name[name], fut.result()
+                for line in res['tail']:
+                    if line: logger.info(f"   [{name}] {line}")
+                rec = {'name': name, 'reason': reason, 'input_fp': input_fp, **res}
+
+                if res['returncode'] == 0:
+                    rec['status'] = 'ok'
+                    rec['output_fp'] = out_fp[name] = fingerprint(stage['outputs'], db_path, cwd) if stage.get('outputs') else input_fp
+                    state[name] = {'input_fp': input_fp, 'output_fp': rec['output_fp'],
+                                   'finished_at': datetime.now().isoformat(timespec='seconds'), 'finished_ts': time.time()}
+                    save_state(state, state_path)
+                    logger.info(f"✅ Completed: {name} ({res['seconds']:.1f}s)")
+                else:
+                    rec['status'] = 'failed'
+                    logger.error(f"❌ Failed: {name} ({res['error'] or 'exit ' + str(res['returncode'])})")
+                records[name] = rec
+
+    stage_records = [records[n] for n in order]
+    record = {
+        'run_id': run_id, 'started_at': started_at, 'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - t0, 3), 'jobs': jobs, 'dry_run': dry_run,
+        'ok': all(r['status'] in ('ok', 'fresh', 'would_run') for r in stage_records),
+        'stages': stage_records
+    }
+    if record_path:
+        os.makedirs(os.path.dirname(str(record_path)) or '.', exist_ok=True)
+        with open(record_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+    return record
+
+
+def log_summary(record):
+    icons = {'ok': '✅', 'fresh': '⏭️ ', 'failed': '❌', 'blocked': '⛔', 'would_run': '📝'}
+    logger.info(f"   {'Stage':14} {'Status':9} {'Seconds':>8}  Reason")
+    for r in record['stages']:
+        secs = f"{r['seconds']:8.1f}" if 'seconds' in r else f"{'-':>8}"
+        logger.info(f"   {icons.get(r['status'], '?')} {r['name']:12} {r['status']:9} {secs}  {r.get('reason', '')}")
+    logger.info(f"   ⏱️  Total Time: {record['seconds']:.1f} seconds (jobs={record['jobs']})")
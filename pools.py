@@ -0,0 +1,145 @@
+"""
+Pools - Çoklu Ayak Bahis Havuzları
+==================================
+Pool definitions (altılı, 5'li, 4'lü, 3'lü, çifte) so the optimizer, coupon
+renderer and hit-checker work on any multi-leg pool instead of a hard-coded
+`race_nos[-6:]`.
+
+A pool type describes the bet (leg count, unit price, minimum stake, where it
+is offered); a pool is a type bound to the concrete races of one city/day.
+"""
+
+import math
+
+from hit_check import check_coupons, missed_labels
+
+# Turkish cities (TJK domestic program). Anything else is a foreign simulcast.
+TR_CITY_NAMES = ['İstanbul', 'Ankara', 'İzmir', 'Adana', 'Bursa', 'Kocaeli',
+                 'Şanlıurfa', 'Diyarbakır', 'Antalya', 'Elazığ']
+
+# Cities with at least this many races run a second altılı; the first one
+# covers the opening races.
+FIRST_ALTILI_MIN_RACES = 9
+
+# unit: price of one combination (TL), min_stake: minimum coupon amount (TL)
+# offered: 'all' | 'domestic' | 'foreign'
+# budget_share: fraction of a strategy's (altılı-sized) budget spent on this pool
+POOL_TYPES = {
+    'ALTILI': {'name': 'Altılı Ganyan', 'legs': 6, 'unit': 1.25, 'min_stake': 0.0, 'offered': 'all',      'budget_share': 1.0},
+    'BESLI':  {'name': "5'li Ganyan",   'legs': 5, 'unit': 1.25, 'min_stake': 0.0, 'offered': 'foreign',  'budget_share': 0.4},
+    'DORTLU': {'name': "4'lü Ganyan",   'legs': 4, 'unit': 1.25, 'min_stake': 2.5, 'offered': 'domestic', 'budget_share': 0.1},
+    'UCLU':   {'name': "3'lü Ganyan",   'legs': 3, 'unit': 1.25, 'min_stake': 2.5, 'offered': 'domestic', 'budget_share': 0.05},
+    'CIFTE':  {'name': 'Çifte',         'legs': 2, 'unit': 1.25, 'min_stake': 2.5, 'offered': 'domestic', 'budget_share': 0.02},
+}
+
+# Every pool type by default; offered_pools keeps the ones a city offers
+DEFAULT_POOL_TYPES = list(POOL_TYPES)
+
+
+def is_domestic(city):
+    return any(c in city for c in TR_CITY_NAMES)
+
+
+def make_pool(pool_type, races, label=None):
+    """Binds a pool type to concrete race numbers (in leg order)."""
+    spec = POOL_TYPES[pool_type]
+    races = [int(r) for r in races]
+    if len(races) != spec['legs']:
+        raise ValueError(f"{spec['name']} needs {spec['legs']} races, got {len(races)}")
+    return {
+        'id': label or pool_type,
+        'type': pool_type,
+        'name': spec['name'],
+        'races': races,
+        'unit': spec['unit'],
+        'min_stake': spec['min_stake'],
+        'budget_share': spec['budget_share']
+    }
+
+
+def offered_pools(city, race_nos, types=None):
+    """
+    Every pool offered at a city for the given (sorted) race numbers.
+    Cities with FIRST_ALTILI_MIN_RACES+ races get both altılıs.
+    """
+    types = types or DEFAULT_POOL_TYPES
+    race_nos = sorted(int(r) for r in race_nos)
+    domestic = is_domestic(city)
+    pools = []
+
+    for pool_type in types:
+        spec = POOL_TYPES[pool_type]
+        if spec['offered'] == 'domestic' and not domestic: continue
+        if spec['offered'] == 'foreign' and domestic: continue
+        n = spec['legs']
+        if len(race_nos) < n: continue
+
+        if pool_type == 'ALTILI' and len(race_nos) >= FIRST_ALTILI_MIN_RACES:
+            pools.append(make_pool(pool_type, race_nos[:n], label='ALTILI_1'))
+            pools.append(make_pool(pool_type, race_nos[-n:], label='ALTILI_2'))
+        else:
+            pools.append(make_pool(pool_type, race_nos[-n:]))
+
+    return pools
+
+
+def pool_title(pool):
+    if pool['id'] == 'ALTILI_1': return f"1. {pool['name']}"
+    if pool['id'] == 'ALTILI_2': return f"2. {pool['name']}"
+    return pool['name']
+
+
+def pool_cost(pool, combos):
+    """Coupon amount for a combination count, raised (misli) to the minimum stake."""
+    if combos <= 0:
+        return 0.0
+    cost = combos * pool['unit']
+    if cost < pool['min_stake']:
+        cost *= math.ceil(pool['min_stake'] / cost)
+    return cost
+
+
+def build_pool_legs(df, pool, score_col='score', extra_cols=()):
+    """legs_data for the optimizer: per leg, (name, score, *extra) sorted by score."""
+    legs_data = []
+    for r in pool['races']:
+        entries = df[df['race_no'] == r].sort_values(score_col, ascending=False)
+        legs_data.append([(x['horse_name'], x[score_col], *[x[c] for c in extra_cols]) for _, x in entries.iterrows()])
+    return legs_data
+
+
+def optimize_pool(pool, legs_data, budget_tl, logic='standard'):
+    """Runs the coupon optimizer for any pool (unit price + minimum stake aware)."""
+    from coupon_optimizer import optimize_coupon_logic, optimize_coupon_balanced
+
+    if logic == 'standard':
+        selection, _ = optimize_coupon_logic(legs_data, budget_tl, unit=pool['unit'])
+    else:
+        selection, _ = optimize_coupon_balanced(legs_data, budget_tl, unit=pool['unit'])
+
+    combos = 1
+    for s in selection: combos *= len(s)
+    return selection, pool_cost(pool, combos)
+
+
+def render_pool_coupon(pool, selection, cost, title=None, desc=None, level=3):
+    """Markdown lines for a coupon of any pool."""
+    lines = [f"{'#' * level} {title or pool_title(pool)}"]
+    if desc: lines.append(f"_{desc}_")
+    lines.append(f"**Tutar:** {cost:.2f} TL")
+    lines.append("```")
+    for i, sel in enumerate(selection):
+        names = [x[0] for x in sel]
+        status = "🔒 BANKO" if len(names) == 1 else f"({len(names)} At)"
+        lines.append(f"Ayak {i+1} (Koşu {pool['races'][i]}) {status}: {', '.join(names)}")
+    lines.append("```")
+    return lines
+
+
+def check_pool_hit(pool, selection, winners):
+    """
+    winners: {race_no: winner_name}. Returns (caught, missed, is_hit) where
+    missed lists 'L{leg}({winner})' for legs whose winner was not selected.
+    """
+    res = check_coupons([selection], [[winners.get(r) for r in pool['races']]])
+    return int(res['legs_caught'][0]), missed_labels(res, 0), bool(res['hit'][0])
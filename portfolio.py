@@ -0,0 +1,161 @@
+"""
+Portfolio - Şehir Bazlı Çoklu Kupon
+===================================
+Builds several coupons for one pool under a total budget, maximizing the
+probability that at least one of them hits.
+
+LOGIC and SURPRISE coupons are built independently and share most of their
+combinations, so part of the combined budget pays twice for the same tickets.
+Here candidates (frontier points of every strategy's ranking) are added
+greedily by marginal hit probability, evaluated on shared Monte Carlo
+outcomes; the final union probability and the duplicated combinations are
+computed exactly by inclusion–exclusion (a coupon is a box, and the
+intersection of boxes is a box).
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+from coupon_frontier import compute_frontier, leg_probabilities, selection_for_point, thin_frontier
+from coupon_simulator import leg_masks, sample_outcomes, caught_matrix
+from pools import pool_cost, pool_title
+
+PORTFOLIO_MAX_COUPONS = 4
+PORTFOLIO_DRAWS = 200_000
+PORTFOLIO_CANDIDATES = 40  # frontier points kept per strategy
+PORTFOLIO_SPLITS = [1.0, 1 / 2, 1 / 3, 1 / 4]  # max share of the budget per coupon
+
+
+def coupon_combos(selection):
+    combos = 1
+    for s in selection: combos *= len(s)
+    return combos
+
+
+def union_stats(ref_probs, mask_sets):
+    """
+    Exact P(at least one coupon hits) and number of distinct combinations
+    covered, by inclusion–exclusion over coupon boxes.
+    """
+    prob = 0.0
+    combos = 0
+    for r in range(1, len(mask_sets) + 1):
+        sign = 1 if r % 2 else -1
+        for subset in combinations(mask_sets, r):
+            p = 1.0
+            c = 1
+            for i, pv in enumerate(ref_probs):
+                m = subset[0][i].copy()
+                for other in subset[1:]:
+                    m &= other[i]
+                p *= float(pv[m].sum())
+                c *= int(m.sum())
+                if c == 0: break
+            prob += sign * p
+            combos += sign * c
+    return prob, combos
+
+
+def _greedy(candidates, budget, cap, max_coupons, n_draws):
+    covered = np.zeros(n_draws, dtype=bool)
+    picked = []
+    remaining = budget
+    while len(picked) < max_coupons:
+        best, best_gain = None, 0
+        for c in candidates:
+            if c['cost'] > min(remaining, cap) or any(c is p['candidate'] for p in picked): continue
+            gain = np.count_nonzero(c['hit'] & ~covered)
+            if gain > best_gain:
+                best, best_gain = c, gain
+        if best is None: break
+        covered |= best['hit']
+        remaining -= best['cost']
+        picked.append({'candidate': best, 'gain': best_gain / n_draws})
+
+    coupons = [{
+        'strategy': p['candidate']['strategy'],
+        'selection': p['candidate']['selection'],
+        'cost': p['candidate']['cost'],
+        'masks': p['candidate']['masks'],
+        'gain': p['gain']
+    } for p in picked]
+    return coupons, int(np.count_nonzero(covered))
+
+
+def build_portfolio(pool, ref_legs, strategy_legs, total_budget,
+                    max_coupons=PORTFOLIO_MAX_COUPONS, n_draws=PORTFOLIO_DRAWS, seed=42):
+    """
+    ref_legs: legs ranked by the reference win probability (e.g. ai_prob),
+    used to sample outcomes; strategy_legs: {strategy_id: legs_data}.
+    Returns {'coupons': [...], 'union_prob', 'total_cost', 'duplicate_cost'};
+    each coupon carries its own and the marginal (added) hit probability.
+    """
+    rng = np.random.default_rng(seed)
+    ref_probs = [np.asarray(leg_probabilities(l), dtype=float) for l in ref_legs]
+    outcomes = sample_outcomes(ref_probs, n_draws, rng)
+
+    # Candidate coupons: frontier points of every strategy's ranking
+    candidates = []
+    for strat_id, legs in strategy_legs.items():
+        frontier = compute_frontier(legs, unit=pool['unit'], max_cost=total_budget)
+        for point in thin_frontier(frontier, PORTFOLIO_CANDIDATES):
+            selection = selection_for_point(legs, point)
+            cost = pool_cost(pool, point['combos'])
+            if cost > total_budget: continue
+            masks = leg_masks(ref_legs, selection)
+            hit = caught_matrix(outcomes, masks).all(axis=1)
+            candidates.append({'strategy': strat_id, 'selection': selection, 'cost': cost,
+                               'masks': masks, 'hit': hit})
+
+    # Greedy by marginal hit probability; each coupon is capped at a share
+    # of the budget, and the best split wins (one big coupon is often best).
+    chosen = []
+    best_cover = -1
+    for share in PORTFOLIO_SPLITS:
+        picked, covered = _greedy(candidates, total_budget, total_budget * share, max_coupons, n_draws)
+        if covered > best_cover:
+            chosen, best_cover = picked, covered
+
+    for c in chosen:
+        c['prob'] = float(np.prod([pv[m].sum() for pv, m in zip(ref_probs, c['masks'])]))
+
+    union_prob, unique = union_stats(ref_probs, [c['masks'] for c in chosen]) if chosen else (0.0, 0)
+    dup = (sum(coupon_combos(c['selection']) for c in chosen) - unique) * pool['unit']
+    for c in chosen: del c['masks']
+    return {
+        'coupons': chosen,
+        'union_prob': union_prob,
+        'total_cost': sum(c['cost'] for c in chosen),
+        'duplicate_cost': dup
+    }
+
+
+def independent_baseline(pool, ref_legs, selections):
+    """Union hit probability and duplicated TL of independently built coupons."""
+    ref_probs = [np.asarray(leg_probabilities(l), dtype=float) for l in ref_legs]
+    masks = [leg_masks(ref_legs, s) for s in selections]
+    prob, unique = union_stats(ref_probs, masks)
+    dup = (sum(coupon_combos(s) for s in selections) - unique) * pool['unit']
+    return prob, dup
+
+
+def render_portfolio(pool, portfolio, baseline=None, level=4):
+    """Markdown lines: one block per coupon with its marginal gain, then totals."""
+    lines = [f"{'#' * level} 🧺 Portföy ({pool_title(pool)})"]
+    for i, c in enumerate(portfolio['coupons']):
+        lines.append(f"**Kupon {i+1}** ({c['strategy']}) — {c['cost']:.2f} TL | "
+                     f"Tutma %{c['prob']*100:.2f} | Marjinal Katkı +%{c['gain']*100:.2f}")
+        lines.append("```")
+        for j, sel in enumerate(c['selection']):
+            names = [x[0] for x in sel]
+            status = "🔒 BANKO" if len(names) == 1 else f"({len(names)} At)"
+            lines.append(f"Ayak {j+1} (Koşu {pool['races'][j]}) {status}: {', '.join(names)}")
+        lines.append("```")
+    lines.append(f"**Toplam:** {portfolio['total_cost']:.2f} TL | En Az Bir Kupon Tutar: %{portfolio['union_prob']*100:.2f} "
+                 f"| Tekrarlanan Kombinasyon: {portfolio['duplicate_cost']:.2f} TL")
+    if baseline:
+        b_prob, b_dup, b_cost = baseline
+        lines.append(f"_Bağımsız stratejiler: {b_cost:.2f} TL, %{b_prob*100:.2f}, tekrar {b_dup:.2f} TL "
+                     f"→ tasarruf {max(b_dup - portfolio['duplicate_cost'], 0):.2f} TL_")
+    return lines
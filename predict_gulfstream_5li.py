@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import joblib
 import sys
@@ -8,6 +7,7 @@ import math
 
 # Import components
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import (
     get_historical_stats_v10,
     compute_galop_features,
@@ -16,15 +16,16 @@ from production_engine import (
     cosmic_wave, chaos_attractor, numerology_score, moon_phase,
     PHI, FIBONACCI
 )
+from pools import make_pool, optimize_pool
 
 DB_NAME = "tjk_races.db"
 TARGET_DATE = "16/01/2026"
 TARGET_CITY_KEY = "Gulfstream"
-TARGET_RACES = [5, 6, 7, 8, 9] # 5'li Ganyan Legs
+POOL = make_pool('BESLI', [5, 6, 7, 8, 9]) # 5'li Ganyan Legs
 BUDGET = 280.0
 
 def generate_5li():
-    print(f"🔮 Generating 5'li Ganyan for {TARGET_CITY_KEY} ({TARGET_DATE})...")
+    print(f"🔮 Generating {POOL['name']} for {TARGET_CITY_KEY} ({TARGET_DATE})...")
     
     # Load Models
     try:
@@ -37,7 +38,7 @@ def generate_5li():
         print("❌ Model load failed.")
         return
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     # Fetch Races
     pr_query = f"""
@@ -51,7 +52,7 @@ def generate_5li():
         return
         
     # Filter for target races
-    pr_df = pr_df[pr_df['race_no'].isin(TARGET_RACES)]
+    pr_df = pr_df[pr_df['race_no'].isin(POOL['races'])]
     race_ids = tuple(pr_df['id'].tolist())
     
     # Fetch Entries
@@ -79,7 +80,7 @@ def generate_5li():
     df['track_encoded'] = df['track_type'].apply(lambda x: safe_enc(le_track, x))
     df['city_encoded'] = df['city'].apply(lambda x: safe_enc(le_city, x))
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     m5_v, imp_v, com_v, trk_v, own_v, trn_v = [], [], [], [], [], []
     q_vecs = {k:[] for k in ['gold','fib','pri','cos','chaos','num','moon']}
     
@@ -127,8 +128,8 @@ def generate_5li():
     
     # --- OPTIMIZE ---
     legs_data = []
-    # Ensure order 5, 6, 7, 8, 9
-    for r in TARGET_RACES:
+    # Ensure pool leg order
+    for r in POOL['races']:
         entries = df[df['race_no'] == r].sort_values('score', ascending=False)
         legs_data.append([(x['horse_name'], x['score'], x['jockey'], x['momentum_5']) for _, x in entries.iterrows()])
         
@@ -139,14 +140,14 @@ def generate_5li():
     # Simplification: optimize_coupon_logic returns 'selection' which is list of items from input list.
     # So if I pass tuples with extra info, it should return them back.
     
-    selection, cost = optimize_coupon_logic(legs_data, budget_tl=BUDGET)
+    selection, cost = optimize_pool(POOL, legs_data, BUDGET)
     
-    print("\n🇺🇸 GULFSTREAM PARK 5'Lİ GANYAN TAHMİNİ")
+    print(f"\n🇺🇸 GULFSTREAM PARK {POOL['name'].upper()} TAHMİNİ")
     print(f"💰 Bütçe: {BUDGET} TL | Tahmini Tutar: {cost:.2f} TL")
     print("=" * 60)
     
     for i, leg_sel in enumerate(selection):
-        race_no = TARGET_RACES[i]
+        race_no = POOL['races'][i]
         print(f"📍 {i+1}. Ayak (Koşu {race_no}):")
         
         # Sort selection by score descending for display
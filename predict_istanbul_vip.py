@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import joblib
 import sys
@@ -8,6 +7,7 @@ import math
 
 # Import components
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import (
     get_historical_stats_v10,
     compute_galop_features,
@@ -38,7 +38,7 @@ def generate_vip_coupon():
         print("❌ Model load failed.")
         return
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     # Get Races
     pr_query = f"""
@@ -77,7 +77,7 @@ def generate_vip_coupon():
     df['track_encoded'] = df['track_type'].apply(lambda x: safe_enc(le_track, x))
     df['city_encoded'] = df['city'].apply(lambda x: safe_enc(le_city, x))
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     # --- FEATURE ENG START ---
     m5_v = []; imp_v = []; com_v = []; trk_v = []; own_v = []; trn_v = []
     q_vecs = {k:[] for k in ['gold','fib','pri','cos','chaos','num','moon']}
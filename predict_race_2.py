@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import joblib
 import sys
@@ -8,6 +7,7 @@ import math
 
 # Import components
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import (
     get_historical_stats_v10,
     compute_galop_features,
@@ -35,7 +35,7 @@ def predict_single_race():
         print("❌ Model load failed.")
         return
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     # Fetch Specific Race ID for Antalya, Race 2
     pr_query = f"""
@@ -78,7 +78,7 @@ def predict_single_race():
     df['city_encoded'] = df['city'].apply(lambda x: safe_enc(le_city, x))
     
     # Historicals
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     m5_v, imp_v, com_v, trk_v, own_v, trn_v = [], [], [], [], [], []
     q_vecs = {k:[] for k in ['gold','fib','pri','cos','chaos','num','moon']}
     
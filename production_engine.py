@@ -1,21 +1,34 @@
 
 import os
 import sys
-import sqlite3
 import pandas as pd
-import joblib
 import random
 import numpy as np
 from datetime import datetime, timedelta
 import argparse
 import math
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import tjk_db
+from timing import span, enable_profile, finish, add_timing_args, take_events, merge_events
+from coupon_frontier import compute_frontier, frontier_lookup
+from coupon_simulator import historical_ganyan_odds, simulate_coupon
+from portfolio import build_portfolio, independent_baseline, render_portfolio
+from coupon_optimizer import optimize_coupon_logic, optimize_coupon_balanced
+from pools import (
+    POOL_TYPES, offered_pools, pool_title, build_pool_legs,
+    optimize_pool, render_pool_coupon
+)
 
 # Import scraper 
 sys.path.append('tjk_scraper')
 
 DB_NAME = "tjk_races.db"
 
+# Per-process state of the --jobs workers (filled by _init_worker)
+_WORKER = {}
+
 # ═══════════════════════════════════════════════════════════════════
 # 🔮 QUANTUM FUNCTIONS (v10)
 # ═══════════════════════════════════════════════════════════════════
@@ -115,17 +128,22 @@ BASE_STRATEGIES = [
     }
 ]
 
+# Budgets shown as "bigger/smaller coupon" variants in the report
+FRONTIER_BUDGETS = [500.0, 750.0, 1000.0, 1250.0]
+FRONTIER_MAX_COST = 5000.0
+SIM_DRAWS = 200_000
+
 
 # ═══════════════════════════════════════════════════════════════════
 # 🏇 GALOP (TRAINING) FUNCTIONS - ON-DEMAND FETCHING
 # ═══════════════════════════════════════════════════════════════════
 
-import requests
-from bs4 import BeautifulSoup
 import time as time_module
 
 def fetch_single_horse_gallops(horse_id, horse_name):
     """Fetch galop data for a single horse from TJK."""
+    import requests
+    from bs4 import BeautifulSoup
     url = f"https://www.tjk.org/TR/YarisSever/Query/Page/IdmanIstatistikleri?QueryParameter_AtId={horse_id}"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
@@ -233,7 +251,7 @@ def fetch_gallops_for_program(df, date_str):
     
     # Save to database
     if all_gallops:
-        conn = sqlite3.connect(DB_NAME)
+        conn = tjk_db.connect(DB_NAME)
         c = conn.cursor()
         for g in all_gallops:
             try:
@@ -371,8 +389,9 @@ def run_scraper(date_str):
         print(f"❌ Scraping Failed: {e}")
         return False
 
-def load_program(city, date_str):
-    conn = sqlite3.connect(DB_NAME)
+def load_program(city, date_str, conn=None):
+    should_close = conn is None
+    if should_close: conn = tjk_db.connect(DB_NAME)
     query = """
     SELECT pr.id as race_id, pr.city, pr.distance, pr.track_type, pr.date as race_date, pr.race_no,
            pe.program_race_id, pe.program_no, pe.horse_name, pe.weight, pe.jockey, pe.hp, pe.horse_id, pe.trainer, pe.owner
@@ -381,17 +400,15 @@ def load_program(city, date_str):
     WHERE pr.city LIKE ? AND pr.date = ?
     """
     df = pd.read_sql_query(query, conn, params=(f'%{city}%', date_str))
-    conn.close()
+    if should_close: conn.close()
     # Deduplicate based on race_no + horse_name to prevent double counting
     df = df.drop_duplicates(subset=['race_no', 'horse_name'])
     return df
 
 def get_historical_stats_v10(horse_name, jockey, track_type, trainer, owner, race_date, conn=None):
     """Calculates all complex v10 features from history DB"""
-    should_close = False
     if conn is None:
-        conn = sqlite3.connect(DB_NAME)
-        should_close = True
+        conn = tjk_db.thread_connection(DB_NAME)
     
     # Pre-parse date for SQL comparison (YYYY-MM-DD format usually needed if stored that way, 
     # but scrape stores as DD/MM/YYYY text usually. Python comparisons on text dates are risky.
@@ -509,64 +526,56 @@ def get_historical_stats_v10(horse_name, jockey, track_type, trainer, owner, rac
             if not past_own.empty:
                 owner_rate = len(past_own[past_own['rank'] == 1]) / len(past_own)
 
-    if should_close:
-        conn.close()
     return momentum_5, improvement_trend, combo_rate, track_rate, owner_rate, trainer_form
 
-def prepare_v10_predictions(df, date_str):
-    try:
-        # Load V10 Models (Kahin)
-        lgbm = joblib.load('model_v10_lgbm.pkl')
-        cat = joblib.load('model_v10_cat.pkl')
-        xgb_model = joblib.load('model_v10_xgb.pkl')
-        le_track = joblib.load('le_track_v10.pkl')
-        le_city = joblib.load('le_city_v10.pkl')
-    except Exception as e:
-        print(f"❌ Model v10 Load Error: {e}")
-        return None
+V10_FEATURES = ['distance', 'weight', 'track_encoded', 'city_encoded', 'hp',
+                'momentum_5', 'improvement_trend', 'owner_win_rate', 
+                'trainer_win_rate_ext', 'trainer_recent_form', 'combo_win_rate', 'track_win_rate',
+                'quantum_golden', 'quantum_fibonacci', 'quantum_prime',
+                'quantum_cosmic', 'quantum_chaos', 'quantum_numerology', 
+                'quantum_moon', 'quantum_field',
+                'days_since_galop', 'galop_speed']
 
+def add_v10_features(df, date_str, le_track, le_city, conn=None):
+    """Encodes + historical + quantum v10 features (shared by live and backtest paths)."""
     def safe_transform(le, col):
         known = set(le.classes_)
         return col.apply(lambda x: le.transform([str(x)])[0] if str(x) in known else 0)
 
     # Basic Encodes
-    df['track_encoded'] = safe_transform(le_track, df['track_type'])
-    df['city_encoded'] = safe_transform(le_city, df['city'])
-    df['hp'] = pd.to_numeric(df['hp'], errors='coerce').fillna(0)
-    df['weight'] = pd.to_numeric(df['weight'], errors='coerce').fillna(55)
-    df['distance'] = pd.to_numeric(df['distance'], errors='coerce').fillna(1400)
+    with span('encoding'):
+        df['track_encoded'] = safe_transform(le_track, df['track_type'])
+        df['city_encoded'] = safe_transform(le_city, df['city'])
+        df['hp'] = pd.to_numeric(df['hp'], errors='coerce').fillna(0)
+        df['weight'] = pd.to_numeric(df['weight'], errors='coerce').fillna(55)
+        df['distance'] = pd.to_numeric(df['distance'], errors='coerce').fillna(1400)
     
     # Calculate Hist/Quantum Features
-    print(f"      🔮 Calculating v10 (Kahin) Features for {len(df)} horses...")
-    
     # Vectors to store results
     m5_vec, imp_vec, com_vec, trk_vec, own_vec, trn_vec = [], [], [], [], [], []
     q_gold, q_fib, q_pri, q_cos, q_chaos, q_num, q_moon = [], [], [], [], [], [], []
     
-    conn = sqlite3.connect(DB_NAME)
-    
-    for idx, row in df.iterrows():
-        # Historical
-        m5, imp, com, trk, own, trn = get_historical_stats_v10(
-            row['horse_name'], row['jockey'], row['track_type'], 
-            row.get('trainer'), row.get('owner'), date_str
-        )
-        m5_vec.append(m5); imp_vec.append(imp); com_vec.append(com)
-        trk_vec.append(trk); own_vec.append(own); trn_vec.append(trn)
-        
-        # Quantum
-        race_n = row['race_no'] if row['race_no'] else 1
-        h_ord = ord(row['horse_name'][0]) % 10 if row['horse_name'] else 1
-        
-        q_gold.append(golden_ratio_score(m5))
-        q_fib.append(fibonacci_resonance(race_n, h_ord))
-        q_pri.append(prime_harmony(row['hp'], row['weight']))
-        q_cos.append(cosmic_wave(date_str, race_n))
-        q_chaos.append(chaos_attractor(m5, com, trk))
-        q_num.append(numerology_score(row['horse_name']))
-        q_moon.append(moon_phase(date_str))
-        
-    conn.close()
+    with span('history', horses=len(df)):
+        for idx, row in df.iterrows():
+            m5, imp, com, trk, own, trn = get_historical_stats_v10(
+                row['horse_name'], row['jockey'], row['track_type'], 
+                row.get('trainer'), row.get('owner'), date_str, conn=conn
+            )
+            m5_vec.append(m5); imp_vec.append(imp); com_vec.append(com)
+            trk_vec.append(trk); own_vec.append(own); trn_vec.append(trn)
+        
+    with span('quantum'):
+        for (idx, row), m5, com, trk in zip(df.iterrows(), m5_vec, com_vec, trk_vec):
+            race_n = row['race_no'] if row['race_no'] else 1
+            h_ord = ord(row['horse_name'][0]) % 10 if row['horse_name'] else 1
+            
+            q_gold.append(golden_ratio_score(m5))
+            q_fib.append(fibonacci_resonance(race_n, h_ord))
+            q_pri.append(prime_harmony(row['hp'], row['weight']))
+            q_cos.append(cosmic_wave(date_str, race_n))
+            q_chaos.append(chaos_attractor(m5, com, trk))
+            q_num.append(numerology_score(row['horse_name']))
+            q_moon.append(moon_phase(date_str))
         
     df['momentum_5'] = m5_vec
     df['improvement_trend'] = imp_vec
@@ -594,14 +603,36 @@ def prepare_v10_predictions(df, date_str):
         df['quantum_numerology'] * 7 / 9 +
         df['quantum_moon'] * 0.5
     ) / 10.0
-    
-    features = ['distance', 'weight', 'track_encoded', 'city_encoded', 'hp',
-                'momentum_5', 'improvement_trend', 'owner_win_rate', 
-                'trainer_win_rate_ext', 'trainer_recent_form', 'combo_win_rate', 'track_win_rate',
-                'quantum_golden', 'quantum_fibonacci', 'quantum_prime',
-                'quantum_cosmic', 'quantum_chaos', 'quantum_numerology', 
-                'quantum_moon', 'quantum_field',
-                'days_since_galop', 'galop_speed']
+
+    return df
+
+def load_v10_models():
+    """v10 (Kahin) ensemble + encoders."""
+    import joblib
+    return {
+        'lgbm': joblib.load('model_v10_lgbm.pkl'),
+        'cat': joblib.load('model_v10_cat.pkl'),
+        'xgb': joblib.load('model_v10_xgb.pkl'),
+        'le_track': joblib.load('le_track_v10.pkl'),
+        'le_city': joblib.load('le_city_v10.pkl'),
+    }
+
+def prepare_v10_predictions(df, date_str, models=None, conn=None):
+    if models is None:
+        try:
+            # Load V10 Models (Kahin)
+            models = load_v10_models()
+        except Exception as e:
+            print(f"❌ Model v10 Load Error: {e}")
+            return None
+    lgbm, cat, xgb_model = models['lgbm'], models['cat'], models['xgb']
+
+    print(f"      🔮 Calculating v10 (Kahin) Features for {len(df)} horses...")
+    should_close = conn is None
+    if should_close: conn = tjk_db.connect(DB_NAME)
+    df = add_v10_features(df, date_str, models['le_track'], models['le_city'], conn=conn)
+    if should_close: conn.close()
+    features = V10_FEATURES
     
     # Predict
     # Ensure columns exist
@@ -609,17 +640,20 @@ def prepare_v10_predictions(df, date_str):
         if f not in df.columns: df[f] = 0
         
     X = df[features].astype(float)
-    p1 = lgbm.predict_proba(X)[:, 1]
-    p2 = cat.predict_proba(X)[:, 1]
-    p3 = xgb_model.predict_proba(X)[:, 1]
+    with span('predict', horses=len(X)):
+        p1 = lgbm.predict_proba(X)[:, 1]
+        p2 = cat.predict_proba(X)[:, 1]
+        p3 = xgb_model.predict_proba(X)[:, 1]
     df['ai_prob_base'] = (p1 + p2 + p3) / 3.0
     
     # ═══════════════════════════════════════════════════════════════════
     # 🏇 ON-DEMAND GALOP INTEGRATION
     # ═══════════════════════════════════════════════════════════════════
     print("      🏇 Fetching galop data on-demand...")
-    gallops_df = fetch_gallops_for_program(df, date_str)
-    df = compute_galop_features(df, gallops_df, date_str)
+    with span('galop_fetch'):
+        gallops_df = fetch_gallops_for_program(df, date_str)
+    with span('galop_features'):
+        df = compute_galop_features(df, gallops_df, date_str)
     
     # Apply galop boost: galop_score range [0.1, 0.95], centered at 0.5
     # Boost range: [-0.08, +0.09] based on galop_score
@@ -636,6 +670,7 @@ def prepare_v10_predictions(df, date_str):
 def prepare_v11_experimental(df, date_str):
     """v11 Terminator - Experimental with Gallops (Needs more data)"""
     try:
+        import joblib
         # Load V11 Models (Terminator)
         lgbm = joblib.load('model_v11_lgbm.pkl')
         cat = joblib.load('model_v11_cat.pkl')
@@ -643,7 +678,7 @@ def prepare_v11_experimental(df, date_str):
         le_track = joblib.load('le_track_v11.pkl')
         le_city = joblib.load('le_city_v11.pkl')
         
-        conn = sqlite3.connect(DB_NAME)
+        conn = tjk_db.connect(DB_NAME)
         gallops_df = pd.read_sql_query("SELECT horse_name, date, distance, time_sec, rank FROM gallops", conn)
         conn.close()
     except:
@@ -653,207 +688,154 @@ def prepare_v11_experimental(df, date_str):
     # Wait, I should actually keep the v11 logic I wrote if it was useful, but user wants STABILITY.
     # I will just keep it commented or as a secondary function.
 
-def optimize_coupon_logic(legs_data, budget_tl, unit=1.25, tolerance=0.15):
-    """
-    Smart Optimization: Balances Risk vs Budget based on Field Size & Entropy.
-    """
-    # 1. Analyze Each Leg & Set Initial Constraints
-    leg_configs = []
-    
-    for i, leg in enumerate(legs_data):
-        field_size = len(leg)
-        if not leg: # Empty leg protection
-             leg_configs.append({'min': 1, 'max': 1, 'candidates': leg})
-             continue
-             
-        scores = [x[1] for x in leg]
-        top_score = scores[0]
-        
-        # Difficulty Classification
-        difficulty = "NORMAL"
-        if field_size >= 12 and top_score < 0.35: difficulty = "HARD"
-        elif field_size <= 7 or top_score > 0.60: difficulty = "EASY"
-        
-        # Initial Constraints
-        min_sel = 1
-        max_sel = int(field_size * 0.6) # Cap at 60%
-        
-        if difficulty == "HARD":
-            min_sel = 3  # Start with 3, expand later
-        elif difficulty == "NORMAL":
-            min_sel = 2
-        else: # EASY
-            min_sel = 1
-            
-        # Monster Favorite Exception
-        if top_score > 0.85: min_sel = 1
-        
-        leg_configs.append({
-            'min': min_sel,
-            'max': max(min_sel, max_sel),
-            'candidates': leg,
-            'difficulty': difficulty
-        })
-        
-    # 2. Validate Initial Cost & Relax if needed
-    while True:
-        c = 1
-        for lc in leg_configs: c *= lc['min']
-        if c * unit <= budget_tl * (1 + tolerance):
-            break
-        
-        # Reduce constraints (Find "HARD" legs with >2 min and reduce)
-        reduced = False
-        for lc in leg_configs:
-            if lc['min'] > 2:
-                lc['min'] -= 1
-                reduced = True
-                break # Reduce one by one
-        
-        if not reduced:
-             # Try reducing Normal legs >1
-             for lc in leg_configs:
-                if lc['min'] > 1:
-                    lc['min'] -= 1
-                    reduced = True
-                    break
-        
-        if not reduced: break # Can't reduce further.
+
+def _init_worker(db_path, models):
+    _WORKER['conn'] = tjk_db.connect_readonly(db_path)
+    _WORKER['models'] = models
+
+
+def _process_city(task):
+    city, target_date, args = task
+    result = process_city(city, target_date, args, _WORKER['models'], _WORKER['conn'])
+    return result, take_events()
+
+
+def process_city(city, target_date, args, models, conn):
+    """Predictions + coupons of one city -> {'lines': report lines, 'sims': [(city, pool, strategy, sim)]}"""
+    out = {'city': city, 'lines': [], 'sims': []}
+    lines, sims = out['lines'], out['sims']
+    with span('city', city=city):
+        print(f"\nProcessing {city}...")
     
-    # 3. Greedy Expansion
-    current_selection = [lc['candidates'][:lc['min']] for lc in leg_configs]
-    limit = budget_tl * (1 + tolerance)
+        with span('load_program'):
+            df = load_program(city, target_date, conn)
+        if df.empty: return out
     
-    while True:
-        best_gain = -1
-        best_leg = -1
-        
-        # Current Cost
-        c_comb = 1
-        for s in current_selection: c_comb *= len(s)
-        current_cost = c_comb * unit
+        # Filter Excluded Horses
+        if args.exclude:
+            # Case insensitive check
+            ex_list = [x.upper() for x in args.exclude]
+            df = df[~df['horse_name'].str.upper().isin(ex_list)]
+    
+        if df.empty: return out
+    
+        df = prepare_v10_predictions(df, target_date, models, conn)
+
+        if df is None: return out
+    
+        race_nos = sorted(df['race_no'].unique())
+        pools = offered_pools(city, race_nos, args.pools)
+        if not pools:
+            print(f"⚠️ No pools offered in {city} ({len(race_nos)} races)")
+            return out
+    
+        # --- CHAOS ANALYSIS ---
+        avg_field_size = len(df) / len(race_nos)
+        chaos_score = calculate_chaos_heuristic(city, len(race_nos), avg_field_size)
+        print(f"🌪️ Chaos Score for {city}: {chaos_score:.1f}/100")
+    
+        lines.append(f"## 🏟️ {city}")
+        lines.append(f"🌪️ **Kaos İndeksi:** {chaos_score:.1f} (Yüksek puan = Sürpriz İhtimali)")
+    
+        # Dynamic Strategy Adjustment
+        active_strategies = []
+        for strat in BASE_STRATEGIES:
+            new_strat = strat.copy()
+            if chaos_score > 35: # High Chaos
+                if new_strat['id'] == 'SURPRISE':
+                    new_strat['budget'] = 1250.0 # Boost Surprise Budget
+                    new_strat['desc'] += " (🔥 KAOS BOOST)"
+                else:
+                    new_strat['budget'] = 500.0 # Reduce Logic Budget
+            else: # Low Chaos
+                 if new_strat['id'] == 'SURPRISE':
+                    new_strat['budget'] = 500.0
+                 else:
+                    new_strat['budget'] = 1000.0
         
-        for i, config in enumerate(leg_configs):
-            curr_len = len(current_selection[i])
+            active_strategies.append(new_strat)
+
+        # --- SCORES (computed once, shared by every pool) ---
+        for strat in active_strategies:
+            df[f"score_{strat['id']}"] = (df['ai_prob'] * strat['w_prob'] * 0.01) + \
+                          (df['momentum_5'] * strat['w_mom'] * 0.01) + \
+                          (df['combo_win_rate'] * strat['w_combo'] * 0.01) + \
+                          (df['track_win_rate'] * strat['w_track'] * 0.01) + \
+                          (df['quantum_field'] * strat['w_surprise'] * 0.01)
+                      
+            # Special Logic for Surprise: Add luck/noise? No, let's keep it deterministic but using Quantum Features
+            # v10's quantum features ARE the surprise factor.
+
+        # --- GENERATE COUPONS ---
+        for pool in pools:
+            lines.append(f"### 🎯 {pool_title(pool)} (Koşu {pool['races'][0]}-{pool['races'][-1]})")
+            strategy_legs = {}
+            strategy_coupons = []
+        
+            for strat in active_strategies:
+                cols = build_pool_legs(df, pool, score_col=f"score_{strat['id']}")
+                budget = strat['budget'] * pool['budget_share']
+                with span('optimize', pool=pool['type'], strategy=strat['id']):
+                    selection, cost = optimize_pool(pool, cols, budget, strat['logic'])
+                strategy_legs[strat['id']] = cols
+                strategy_coupons.append((selection, cost))
+                if args.sim_draws:
+                    with span('simulate'):
+                        odds = historical_ganyan_odds(conn, cols)
+                        sim = simulate_coupon(cols, selection, odds=odds, unit=pool['unit'], cost=cost,
+                                              n_draws=args.sim_draws, seed=42)
+                    sims.append((city, pool_title(pool), strat['name'], sim))
             
-            if curr_len >= config['max'] or curr_len >= len(config['candidates']):
-                continue
-                
-            next_horse = config['candidates'][curr_len]
-            mult_factor = (curr_len + 1) / curr_len
-            new_cost = current_cost * mult_factor
+                # Whole budget/probability frontier in one pass (lookup per budget)
+                with span('frontier'):
+                    frontier = compute_frontier(cols, unit=pool['unit'], max_cost=FRONTIER_MAX_COST * pool['budget_share'])
             
-            if new_cost <= limit:
-                # Weighted Gain Calculation
-                gain = float(next_horse[1])
-                
-                # Boost gain for under-covered Hard/Crowded races to prioritize them
-                if config['difficulty'] == "HARD" and curr_len < 5:
-                    gain *= 2.0
-                elif config['difficulty'] == "NORMAL" and curr_len < 3:
-                    gain *= 1.2
-                    
-                if gain > best_gain:
-                    best_gain = gain
-                    best_leg = i
-                    
-        if best_leg != -1:
-            next_h = leg_configs[best_leg]['candidates'][len(current_selection[best_leg])]
-            current_selection[best_leg].append(next_h)
-        else:
-            break
+                with span('render'):
+                    lines.extend(render_pool_coupon(pool, selection, cost, title=strat['name'], desc=strat['desc'], level=4))
             
-    final_combos = 1
-    for s in current_selection: final_combos *= len(s)
-    return current_selection, final_combos * unit
-
-def optimize_coupon_balanced(legs_data, budget_tl, unit=1.25):
-    """Balanced Optimization (Favorites + Surprise)"""
-    # Simply pick top N favorites first, but allow "Surprise" horses (already boosted in score)
-    # Since we use modified scores for the Surprise strategy, standard optimization *is* already balanced
-    # because it will pick high-score horses (where score includes surprise factor).
-    # But let's enforce a minimum width to ensure coverage (aka 'Plase' logic).
-    
-    # Start with Top 2 horses in every leg (if budget allows)
-    current_selection = []
-    for leg in legs_data:
-        # Take top 2 if available, else 1
-        leg_sel = []
-        for i in range(min(2, len(leg))):
-             if leg[i][0] not in [x[0] for x in leg_sel]:
-                 leg_sel.append(leg[i])
-        current_selection.append(leg_sel)
-        
-    def get_cost():
-        c = 1
-        for s in current_selection: c *= len(s)
-        return c * unit
-        
-    # Trim if over budget
-    while get_cost() > budget_tl:
-        # Remove weakest horse (lowest score in current selection)
-        weakest_score = 999
-        weakest_leg = -1
-        
-        for i, sel in enumerate(current_selection):
-            if len(sel) > 1: # Don't go below 1 horse
-                score = sel[-1][1] # Last horse is weakest
-                if score < weakest_score:
-                    weakest_score = score
-                    weakest_leg = i
-        
-        if weakest_leg != -1:
-            current_selection[weakest_leg].pop()
-        else:
-            break # Can't reduce further
-            
-    # Expand if under budget
-    while True:
-        best_add_score = -1
-        best_add_leg = -1
-        
-        for i, leg in enumerate(legs_data):
-            # Check if there are more horses to add in this leg
-            if len(current_selection[i]) < len(leg):
-                # Iterate through leg candidates to find the next one NOT in selection
-                next_cand = None
-                curr_names = [x[0] for x in current_selection[i]]
-                
-                # Because legs_data is sorted by score, the next best candidate is simply the first one not in curr_names
-                for cand in leg:
-                    if cand[0] not in curr_names:
-                        next_cand = cand
-                        break
-                
-                if next_cand:
-                    # Check cost
-                    c = 1
-                    for k, sel in enumerate(current_selection):
-                        l = len(sel)
-                        if k == i: l += 1
-                        c *= l
-                    
-                    if c * unit <= budget_tl * 1.05 and next_cand[1] > best_add_score:
-                        best_add_score, best_add_leg = next_cand[1], i
-                        
-        if best_add_leg != -1:
-             # Find the candidate again to append
-             curr_names = [x[0] for x in current_selection[best_add_leg]]
-             for cand in legs_data[best_add_leg]:
-                 if cand[0] not in curr_names:
-                     current_selection[best_add_leg].append(cand)
-                     break
-        else:
-            break
-            
-    return current_selection, get_cost()
+                variants = []
+                for b in FRONTIER_BUDGETS:
+                    b = b * pool['budget_share']
+                    point = frontier_lookup(frontier, b)
+                    if point:
+                        variants.append(f"{b:.0f} TL → %{point['prob']*100:.2f} ({point['cost']:.2f} TL)")
+                if variants:
+                    lines.append(f"📈 **Bütçe / Tutma:** {' | '.join(variants)}")
+                if args.sim_draws:
+                    dist = ' / '.join(f"{k}:%{v*100:.1f}" for k, v in enumerate(sim['legs_caught_dist']))
+                    lines.append(f"🎲 **Simülasyon:** Tutma %{sim['hit_prob']*100:.2f} | "
+                                        f"Beklenen İkramiye {sim['expected_payout']:.2f} TL | Medyan İkramiye {sim['payout_p50']:.0f} TL")
+                    lines.append(f"🦶 **Tutan Ayak Dağılımı:** {dist}")
+                lines.append("")
+
+            if args.portfolio:
+                total_budget = sum(st['budget'] for st in active_strategies) * pool['budget_share']
+                ref_legs = build_pool_legs(df, pool, score_col='ai_prob')
+                with span('portfolio'):
+                    portfolio = build_portfolio(pool, ref_legs, strategy_legs, total_budget)
+                b_prob, b_dup = independent_baseline(pool, ref_legs, [sel for sel, _ in strategy_coupons])
+                b_cost = sum(c for _, c in strategy_coupons)
+                lines.extend(render_portfolio(pool, portfolio, baseline=(b_prob, b_dup, b_cost)))
+                lines.append("")
+        
+    return out
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--date", help="Date DD/MM/YYYY")
     parser.add_argument("--exclude", nargs='+', help="List of horses to exclude (non-runners)")
+    parser.add_argument("--pools", nargs='+', choices=list(POOL_TYPES.keys()),
+                        help="Pool types to generate (default: every pool offered at the city)")
+    parser.add_argument("--sim-draws", type=int, default=SIM_DRAWS,
+                        help="Monte Carlo draws per coupon for hit/payout estimates (0 = off)")
+    parser.add_argument("--portfolio", action="store_true",
+                        help="Also build a joint multi-coupon portfolio per pool under the combined budget")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Process cities in parallel with N worker processes")
+    add_timing_args(parser)
     args = parser.parse_args()
+    enable_profile(args.profile)
     
     target_date = args.date
     if not target_date:
@@ -865,11 +847,13 @@ def main():
         print(f"🚫 Removing Non-Runners: {', '.join(args.exclude)}")
     
     # 1. Scrape
-    if not run_scraper(target_date):
+    with span('scrape'):
+        scraped = run_scraper(target_date)
+    if not scraped:
         print("⚠️ Running with existing data...")
         
     # 2. Find Cities
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     cities = pd.read_sql_query("SELECT DISTINCT city FROM program_races WHERE date=?", conn, params=(target_date,))
     conn.close()
     
@@ -887,7 +871,7 @@ def main():
         report_lines.append("\n")
     
     processed_base_names = set()
-    
+    city_list = []
     for _, row in cities.iterrows():
         city = row['city']
         # Normalize city name to detect duplicates (e.g. "İstanbul (4. Y.G.)" vs "İstanbul (4. Yarış Günü)")
@@ -896,98 +880,51 @@ def main():
         if base_name in processed_base_names:
             print(f"⚠️ Skipping duplicate city entry: {city} (Base: {base_name})")
             continue
-            
         processed_base_names.add(base_name)
-        print(f"\nProcessing {city}...")
-        
-        df = load_program(city, target_date)
-        if df.empty: continue
-        
-        # Filter Excluded Horses
-        if args.exclude:
-            # Case insensitive check
-            ex_list = [x.upper() for x in args.exclude]
-            df = df[~df['horse_name'].str.upper().isin(ex_list)]
-        
-        if df.empty: continue
-        
-        df = prepare_v10_predictions(df, target_date)
+        city_list.append(city)
 
-        if df is None: continue
-        
-        race_nos = sorted(df['race_no'].unique())
-        if len(race_nos) < 6:
-            print(f"⚠️ Not enough races in {city}")
-            continue
-            
-        legs = race_nos[-6:]
-        
-        # --- CHAOS ANALYSIS ---
-        avg_field_size = len(df) / len(race_nos)
-        chaos_score = calculate_chaos_heuristic(city, len(race_nos), avg_field_size)
-        print(f"🌪️ Chaos Score for {city}: {chaos_score:.1f}/100")
-        
-        report_lines.append(f"## 🏟️ {city} Altılı Ganyan")
-        report_lines.append(f"🌪️ **Kaos İndeksi:** {chaos_score:.1f} (Yüksek puan = Sürpriz İhtimali)")
-        
-        # Dynamic Strategy Adjustment
-        active_strategies = []
-        for strat in BASE_STRATEGIES:
-            new_strat = strat.copy()
-            if chaos_score > 35: # High Chaos
-                if new_strat['id'] == 'SURPRISE':
-                    new_strat['budget'] = 1250.0 # Boost Surprise Budget
-                    new_strat['desc'] += " (🔥 KAOS BOOST)"
-                else:
-                    new_strat['budget'] = 500.0 # Reduce Logic Budget
-            else: # Low Chaos
-                 if new_strat['id'] == 'SURPRISE':
-                    new_strat['budget'] = 500.0
-                 else:
-                    new_strat['budget'] = 1000.0
-            
-            active_strategies.append(new_strat)
+    try:
+        models = load_v10_models()
+    except Exception as e:
+        print(f"❌ Model v10 Load Error: {e}")
+        return
+
+    # Cities are independent once the program is loaded: with --jobs N they run in a
+    # process pool (read-only DB connection + the loaded models per worker) and are
+    # collected in city order, so the report is the same for any N.
+    if args.jobs > 1 and len(city_list) > 1:
+        tasks = [(city, target_date, args) for city in city_list]
+        with span('cities', jobs=args.jobs):
+            with ProcessPoolExecutor(max_workers=min(args.jobs, len(tasks)), initializer=_init_worker,
+                                     initargs=(DB_NAME, models)) as ex:
+                done = list(ex.map(_process_city, tasks, chunksize=1))
+            results = []
+            for result, evts in done:
+                merge_events(evts)
+                results.append(result)
+    else:
+        # History reads see one consistent DB state while the galop fetch keeps writing
+        with tjk_db.snapshot(DB_NAME) as conn:
+            results = [process_city(city, target_date, args, models, conn) for city in city_list]
+
+    sim_summary = []
+    for result in results:
+        report_lines.extend(result['lines'])
+        sim_summary.extend(result['sims'])
+
+    if sim_summary:
+        print(f"\n🎲 Monte Carlo ({args.sim_draws:,} draws/coupon)")
+        for city, p_title, s_name, sim in sim_summary:
+            print(f"   {city[:20]:20} {p_title[:16]:16} {s_name[:14]:14} | Tutma: %{sim['hit_prob']*100:6.2f} "
+                  f"| Beklenen: {sim['expected_payout']:9.2f} TL | Maliyet: {sim['cost']:8.2f} TL "
+                  f"| {sim['draws_per_sec']/1e6:.1f}M draws/s")
 
-        # --- GENERATE COUPONS ---
-        for strat in active_strategies:
-            # Score Calculation
-            df['score'] = (df['ai_prob'] * strat['w_prob'] * 0.01) + \
-                          (df['momentum_5'] * strat['w_mom'] * 0.01) + \
-                          (df['combo_win_rate'] * strat['w_combo'] * 0.01) + \
-                          (df['track_win_rate'] * strat['w_track'] * 0.01) + \
-                          (df['quantum_field'] * strat['w_surprise'] * 0.01)
-                          
-            # Special Logic for Surprise: Add luck/noise? No, let's keep it deterministic but using Quantum Features
-            # v10's quantum features ARE the surprise factor.
-            
-            # Prepare Legs
-            cols = []
-            for r in legs:
-                r_df = df[df['race_no'] == r].sort_values('score', ascending=False)
-                cols.append([(h['horse_name'], h['score']) for _, h in r_df.iterrows()])
-            
-            # Optimize
-            if strat['logic'] == 'standard':
-                selection, cost = optimize_coupon_logic(cols, strat['budget'])
-            else:
-                selection, cost = optimize_coupon_balanced(cols, strat['budget'])
-                
-            report_lines.append(f"### {strat['name']}")
-            report_lines.append(f"_{strat['desc']}_")
-            report_lines.append(f"**Tutar:** {cost:.2f} TL")
-            report_lines.append("```")
-            for i, sel in enumerate(selection):
-                names = [x[0] for x in sel]
-                status = "🔒 BANKO" if len(names) == 1 else f"({len(names)} At)"
-                report_lines.append(f"Ayak {i+1} {status}: {', '.join(names)}")
-            report_lines.append("```")
-            report_lines.append("")
-            
     filename = f"daily_predictions_{target_date.replace('/','-')}.md"
     with open(filename, "w") as f:
         f.write("\n".join(report_lines))
         
     print(f"\n✅ Report Generated: {filename}")
+    finish('production_engine', args.trace_dir)
 
 if __name__ == "__main__":
     main()
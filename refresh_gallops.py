@@ -1,20 +1,20 @@
 
 import sys
 import os
+import argparse
 import pandas as pd
-import sqlite3
 from datetime import datetime
 
 sys.path.append(os.getcwd())
+import tjk_db
 from production_engine import fetch_gallops_for_program
 
 DB_NAME = "tjk_races.db"
-TARGET_DATE = "19/01/2026"
 
-def refresh_gallops():
-    print(f"🔄 Refreshing Gallops for {TARGET_DATE}...")
+def refresh_gallops(target_date):
+    print(f"🔄 Refreshing Gallops for {target_date}...")
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     # Get all horses running today in TR cities (or all)
     # Filter for Adana/Istanbul to save time if needed, but parallel is fast.
     query = """
@@ -23,18 +23,22 @@ def refresh_gallops():
     JOIN program_races pr ON pe.program_race_id = pr.id
     WHERE pr.date = ?
     """
-    df = pd.read_sql_query(query, conn, params=(TARGET_DATE,))
+    df = pd.read_sql_query(query, conn, params=(target_date,))
     conn.close()
     
     if df.empty:
         print("❌ No horses found for target date.")
-        return
+        return False
 
     print(f"🐎 Found {len(df)} horses.")
     
     # Use the robust parallel fetcher from production_engine
-    fetch_gallops_for_program(df, TARGET_DATE)
+    fetch_gallops_for_program(df, target_date)
     print("✅ Gallop Scrape Complete.")
+    return True
 
 if __name__ == "__main__":
-    refresh_gallops()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", default=datetime.now().strftime("%d/%m/%Y"), help="DD/MM/YYYY (default: today)")
+    args = parser.parse_args()
+    sys.exit(0 if refresh_gallops(args.date) else 1)
@@ -0,0 +1,212 @@
+"""
+Results Reconciler - Gün İçi Sonuç Eşleştirme
+=============================================
+Settles coupon legs while the race day is running instead of once at 22:00.
+The day's open coupons come from the local store (coupon_store) and are
+indexed by (date, city, race_no) -> [(coupon, leg)]. Each pass scrapes the
+day's results (only when an open leg's race time has passed), reads the
+winners of the indexed races from tjk_races.db and re-checks just the
+affected coupons with hit_check. Only coupons whose legs changed are saved
+and queued as outbox patches (matched on date, city, type) together with the
+changed stats cells (stats_aggregates), so a coupon settles minutes after
+its last leg.
+
+  leg_result   pending -> won / lost (actual_winner filled in)
+  status       lost at the first missed leg, won when every leg is caught
+
+Legs without race_no (coupons stored before race_no was added) stay pending.
+
+Usage:
+    python results_reconciler.py                    # one pass for today
+    python results_reconciler.py --scrape           # scrape today's results first
+    python results_reconciler.py --poll 300         # scrape + reconcile every 5 min until all legs settle
+    python results_reconciler.py --date 19/01/2026
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.append(os.getcwd())
+import tjk_db
+from coupon_store import iso_date, load_coupons, save_coupons
+from hit_check import check_coupons, normalize_name, CAUGHT, PENDING
+from outbox import enqueue_patch, flush
+from stats_aggregates import publish_stats
+
+DB_NAME = "tjk_races.db"
+POLL_INTERVAL = 300        # seconds
+POLL_UNTIL = "23:30"       # stop polling after this time even if legs are open
+
+
+def race_key(date, city, race_no):
+    """'19/01/2026', 'İzmir (7. Y.G.)', 3 -> ('2026-01-19', 'İZMİR', 3)"""
+    return (iso_date(date), normalize_name(city), int(race_no))
+
+
+def is_open(leg):
+    return leg.get('leg_result', 'pending') == 'pending'
+
+
+def open_coupons(conn, date):
+    """The day's coupons with at least one leg still pending."""
+    return [c for c in load_coupons(conn, date=date) if any(is_open(leg) for leg in c.legs)]
+
+
+def build_leg_index(coupons):
+    """(date, city, race_no) -> [(coupon idx, leg idx)] for the open legs."""
+    index = defaultdict(list)
+    for i, c in enumerate(coupons):
+        for j, leg in enumerate(c.legs):
+            if is_open(leg) and leg.get('race_no'):
+                index[race_key(c.date, c.city, leg['race_no'])].append((i, j))
+    return index
+
+
+def due_legs(coupons, index, now=None):
+    """Open legs whose race time has passed (unknown times count as due)."""
+    now = (now or datetime.now()).strftime('%H:%M')
+    due = 0
+    for legs in index.values():
+        for i, j in legs:
+            t = str(coupons[i].legs[j].get('race_time') or '')
+            due += not (len(t) == 5 and t[2] == ':') or t <= now
+    return due
+
+
+def finished_winners(conn, date, keys):
+    """Winners (rank 1) of the indexed races that already have results. date: DD/MM/YYYY"""
+    rows = conn.execute("""
+        SELECT r.city, r.race_no, res.horse_name
+        FROM races r
+        JOIN results res ON res.race_id = r.id
+        WHERE r.date = ? AND res.rank = 1
+        ORDER BY r.id
+    """, (date,)).fetchall()
+    winners = {}
+    for city, race_no, horse_name in rows:
+        key = race_key(date, city, race_no)
+        if key in keys and key not in winners:
+            winners[key] = horse_name
+    return winners
+
+
+def settle(coupons, index, winners):
+    """Applies the winners to the indexed legs; returns the indices of the coupons that changed."""
+    changed = sorted({i for key in winners for i, _ in index[key]})
+    if not changed: return []
+    pos = {i: n for n, i in enumerate(changed)}
+
+    selections = [[[h['horse_name'] for h in leg.get('horses', [])] for leg in coupons[i].legs] for i in changed]
+    leg_winners = [[None if is_open(leg) else (leg.get('actual_winner') or None) for leg in coupons[i].legs]
+                   for i in changed]
+    for key, winner in winners.items():
+        for i, j in index[key]:
+            leg_winners[pos[i]][j] = winner
+    checked = check_coupons(selections, leg_winners)
+
+    for n, i in enumerate(changed):
+        coupon = coupons[i]
+        for j, leg in enumerate(coupon.legs):
+            if checked['status'][n][j] == PENDING: continue
+            leg['leg_result'] = 'won' if checked['status'][n][j] == CAUGHT else 'lost'
+            leg['actual_winner'] = leg_winners[n][j] or ''
+
+        if checked['hit'][n]:
+            coupon.status = 'won'
+            # Simplified payout (same as the 22:00 job used)
+            coupon.winning_amount = 5000 + int(checked['legs_caught'][n]) * 1000
+        elif any(leg.get('leg_result') == 'lost' for leg in coupon.legs):
+            coupon.status = 'lost'
+            coupon.winning_amount = 0
+    return changed
+
+
+def scrape_results(date):
+    """Today's results into tjk_races.db (races that already have results are skipped)."""
+    from tjk_scraper.scrape import scrape_range
+    scrape_range(date, 1)
+
+
+def reconcile(date=None, db_path=DB_NAME, scrape=False, publish=True):
+    """One pass: returns {'coupons', 'changed', 'settled_legs', 'open_legs'}."""
+    date = date or datetime.now().strftime('%d/%m/%Y')
+    conn = tjk_db.connect(db_path)
+    coupons = open_coupons(conn, date)
+    if not coupons:
+        conn.close()
+        print(f"✅ No open coupons for {date}")
+        return {'coupons': 0, 'changed': 0, 'settled_legs': 0, 'open_legs': 0}
+
+    index = build_leg_index(coupons)
+    if scrape and due_legs(coupons, index):
+        try:
+            scrape_results(date)
+        except Exception as e:
+            print(f"⚠️ Results scrape failed: {e}")
+
+    winners = finished_winners(conn, date, index.keys())
+    changed = settle(coupons, index, winners)
+    settled = sum(len(index[key]) for key in winners)
+
+    # Local store + publish ops in one transaction; only changed coupons are patched
+    if changed:
+        updated = [coupons[i] for i in changed]
+        save_coupons(conn, updated)
+        for c in updated:
+            enqueue_patch(conn, 'coupons', {'date': c.date, 'city': c.city, 'type': c.type},
+                          {'legs': c.legs, 'status': c.status, 'winning_amount': c.winning_amount})
+        publish_stats(conn)
+        conn.commit()
+    conn.close()
+
+    for i in changed:
+        c = coupons[i]
+        won = sum(leg.get('leg_result') == 'won' for leg in c.legs)
+        left = sum(is_open(leg) for leg in c.legs)
+        emoji = {"won": "🎉", "lost": "❌"}.get(c.status, "⏳")
+        print(f"{emoji} {c.city}: {won}/{len(c.legs)} legs won" + (f", {left} to go" if left else ""))
+
+    open_legs = sum(is_open(leg) for c in coupons for leg in c.legs)
+    print(f"📊 {date}: {settled} legs settled in {len(changed)} coupons, {open_legs} legs open")
+    if changed and publish and flush(db_path)['pending']:
+        print("⏳ Some result updates are still queued (python outbox.py --flush)")
+    return {'coupons': len(coupons), 'changed': len(changed), 'settled_legs': settled, 'open_legs': open_legs}
+
+
+def poll(date=None, interval=POLL_INTERVAL, until=POLL_UNTIL, db_path=DB_NAME, publish=True):
+    """Scrape + reconcile every `interval` s until every leg settles or `until` (HH:MM) passes."""
+    date = date or datetime.now().strftime('%d/%m/%Y')
+    while True:
+        result = reconcile(date, db_path, scrape=True, publish=publish)
+        if not result['open_legs']:
+            print("✅ All legs settled")
+            return result
+        if datetime.now().strftime('%H:%M') >= until:
+            print(f"⏹️ Stopping at {until} with {result['open_legs']} legs open")
+            return result
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", help="DD/MM/YYYY (default: today)")
+    parser.add_argument("--scrape", action="store_true", help="Scrape the day's results before reconciling")
+    parser.add_argument("--poll", type=int, nargs='?', const=POLL_INTERVAL, metavar="SECONDS",
+                        help=f"Keep polling (default every {POLL_INTERVAL} s) until all legs settle")
+    parser.add_argument("--until", default=POLL_UNTIL, help="With --poll: stop after HH:MM")
+    parser.add_argument("--no-publish", action="store_true", help="Queue patches without flushing the outbox")
+    args = parser.parse_args()
+
+    if args.poll:
+        poll(args.date, args.poll, args.until, publish=not args.no_publish)
+    else:
+        reconcile(args.date, scrape=args.scrape, publish=not args.no_publish)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+ROI Eval - Gerçek Ganyan ile Getiri / Kasa Analizi
+==================================================
+Evaluates strategies against the real `results.ganyan` win odds instead of a
+flat payout, over the whole history in one pass:
+
+  - per race (vectorized over one concatenated frame):
+      AI_WIN      1 ganyan bet on the top ai_prob horse,
+      AI_PLACE    1 plase bet on the same horse,
+      FAVORI_WIN  1 ganyan bet on the market favourite (lowest ganyan),
+  - per (date, city): the ALTILI coupon from the backtest engine, paid with
+    coupon_simulator.realized_payout (parlay of the winners' ganyan).
+
+Per strategy and city: bets, stake, return, ROI, hit rate, bankroll curve and
+maximum drawdown.
+
+Place odds are not stored, so plase returns use an estimate:
+1 + (ganyan - 1) * PLACE_FRACTION, paid for the first 2 (first 3 when the
+field has PLACE_3_FIELD+ runners).
+
+Usage:
+    python roi_eval.py --days 60
+    python roi_eval.py --since 2026-01-01 --city Antalya --csv bankroll.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+from backtest_engine import (DB_NAME, DEFAULT_BUDGET, connect_readonly, list_units, select_dates,
+                             load_models, build_unit_features, apply_strategy, evaluate_unit, parse_date)
+from coupon_simulator import realized_payout
+from feature_cache import cached_frame
+
+WIN_STAKE = 10.0
+PLACE_FRACTION = 0.25
+PLACE_3_FIELD = 8
+ALL_CITIES = 'TÜMÜ'
+
+# pick: column to rank by (descending), bet: win / place
+ROI_STRATEGIES = {
+    'AI_WIN':     {'pick': 'ai_prob',   'bet': 'win'},
+    'AI_PLACE':   {'pick': 'ai_prob',   'bet': 'place'},
+    'FAVORI_WIN': {'pick': 'favorite',  'bet': 'win'},
+}
+
+HISTORY_COLS = ['date', 'city', 'race_no', 'horse_name', 'rank', 'ganyan', 'ai_prob']
+
+
+def load_history(dates, city=None, model_prefix=None, budget=DEFAULT_BUDGET, db_path=DB_NAME):
+    """
+    One pass over the (date, city) units: scored horse rows for every race
+    plus the engine's altılı coupon per unit. Features come from .cache/features.
+    """
+    conn = connect_readonly(db_path)
+    models = load_models(model_prefix)
+    build = lambda c, d, ct: build_unit_features(c, d, ct, models)
+
+    frames = []
+    coupons = []
+    for date_str, c in list_units(conn, dates, city):
+        df = cached_frame(conn, date_str, c, models['prefix'], build)
+        if df is None or df.empty: continue
+        df = apply_strategy(df)
+        df['date'] = date_str
+        df['city'] = c
+        frames.append(df[HISTORY_COLS])
+        _, coupon = evaluate_unit(df, c, budget)
+        if coupon:
+            coupons.append(dict(coupon, date=date_str, city=c))
+    conn.close()
+
+    if not frames: return pd.DataFrame(columns=HISTORY_COLS + ['day']), coupons
+    hist = pd.concat(frames, ignore_index=True)
+    for col in ['race_no', 'rank', 'ganyan', 'ai_prob']:
+        hist[col] = pd.to_numeric(hist[col], errors='coerce').fillna(0)
+    hist['day'] = hist['date'].map(parse_date)
+    return hist, coupons
+
+
+def race_bets(hist, strategies=ROI_STRATEGIES, stake=WIN_STAKE):
+    """One row per (strategy, race): stake, return, hit. Races need a winner with odds."""
+    if hist.empty: return pd.DataFrame()
+    keys = ['date', 'city', 'race_no']
+    hist = hist.copy()
+    hist['field'] = hist.groupby(keys)['horse_name'].transform('size')
+    win_odds = hist[hist['rank'] == 1].groupby(keys)['ganyan'].max()
+    valid = win_odds[win_odds > 0].reset_index()[keys]
+    hist = hist.merge(valid, on=keys)
+    hist = hist[hist['field'] >= 3]
+    # Favourite = lowest known ganyan
+    hist['favorite'] = np.where(hist['ganyan'] > 0, -hist['ganyan'], -np.inf)
+
+    out = []
+    for name, spec in strategies.items():
+        picks = (hist.sort_values(keys + [spec['pick']], ascending=[True, True, True, False])
+                     .drop_duplicates(keys, keep='first'))
+        rank = picks['rank'].to_numpy()
+        odds = picks['ganyan'].to_numpy()
+        if spec['bet'] == 'win':
+            hit = rank == 1
+            ret = np.where(hit, odds * stake, 0.0)
+        else:
+            places = np.where(picks['field'].to_numpy() >= PLACE_3_FIELD, 3, 2)
+            hit = (rank >= 1) & (rank <= places)
+            place_odds = np.maximum(1 + (odds - 1) * PLACE_FRACTION, 1.05)
+            ret = np.where(hit, place_odds * stake, 0.0)
+        out.append(pd.DataFrame({
+            'strategy': name, 'date': picks['date'].to_numpy(), 'day': picks['day'].to_numpy(),
+            'city': picks['city'].to_numpy(), 'race_no': picks['race_no'].to_numpy(),
+            'stake': stake, 'ret': ret, 'hit': hit
+        }))
+    return pd.concat(out, ignore_index=True)
+
+
+def coupon_bets(coupons, unit=1.25):
+    """ALTILI coupons as bets; hit coupons with an unknown winner's odds are skipped."""
+    rows = []
+    for c in coupons:
+        ret = 0.0
+        if c['hit']:
+            ret = realized_payout(c['winner_odds'], unit)
+            if ret is None: continue
+        rows.append({'strategy': 'ALTILI', 'date': c['date'], 'day': parse_date(c['date']),
+                     'city': c['city'], 'race_no': c['races'][-1],
+                     'stake': c['cost'], 'ret': ret, 'hit': bool(c['hit'])})
+    return pd.DataFrame(rows)
+
+
+def bankroll_curves(bets):
+    """Cumulative profit and drawdown per (strategy, city), plus an all-cities curve."""
+    if bets.empty: return bets
+    both = pd.concat([bets, bets.assign(city=ALL_CITIES)], ignore_index=True)
+    both = both.sort_values(['strategy', 'city', 'day', 'race_no'], kind='mergesort').reset_index(drop=True)
+    both['profit'] = both['ret'] - both['stake']
+    both['bankroll'] = both.groupby(['strategy', 'city'], sort=False)['profit'].cumsum()
+    both['peak'] = both.groupby(['strategy', 'city'], sort=False)['bankroll'].cummax().clip(lower=0)
+    both['drawdown'] = both['peak'] - both['bankroll']
+    return both
+
+
+def summarize_roi(curves):
+    if curves.empty: return pd.DataFrame()
+    s = curves.groupby(['strategy', 'city']).agg(
+        bets=('stake', 'size'), stake=('stake', 'sum'), ret=('ret', 'sum'),
+        hit=('hit', 'mean'), max_drawdown=('drawdown', 'max'))
+    s['profit'] = s['ret'] - s['stake']
+    s['roi'] = np.where(s['stake'] > 0, s['profit'] / s['stake'], 0.0)
+    return s.reset_index()
+
+
+def print_summary(summary, cities=False):
+    rows = summary if cities else summary[summary['city'] == ALL_CITIES]
+    print(f"{'Strateji':12} {'Şehir':18} {'Bahis':>6} {'Yatırılan':>11} {'Dönen':>11} "
+          f"{'ROI':>8} {'Tutma':>7} {'Max DD':>10}")
+    for r in rows.itertuples(index=False):
+        icon = "🟢" if r.roi > 0 else "🔴"
+        print(f"{r.strategy:12} {r.city[:18]:18} {r.bets:6d} {r.stake:11.2f} {r.ret:11.2f} "
+              f"{icon}{r.roi*100:+6.1f}% {r.hit*100:6.1f}% {r.max_drawdown:10.2f}")
+
+
+def evaluate_roi(dates, city=None, model_prefix=None, budget=DEFAULT_BUDGET, stake=WIN_STAKE):
+    hist, coupons = load_history(dates, city, model_prefix, budget)
+    bets = pd.concat([race_bets(hist, stake=stake), coupon_bets(coupons)], ignore_index=True)
+    curves = bankroll_curves(bets)
+    return summarize_roi(curves), curves
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, help="Past N days")
+    parser.add_argument("--since", help="All dates >= YYYY-MM-DD")
+    parser.add_argument("--dates", nargs='+', help="Explicit dates (DD/MM/YYYY)")
+    parser.add_argument("--city", help="City filter (substring)")
+    parser.add_argument("--model", help="Model prefix (model_honest / model_v10)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Altılı coupon budget")
+    parser.add_argument("--stake", type=float, default=WIN_STAKE, help="Per-race ganyan/plase stake")
+    parser.add_argument("--by-city", action="store_true", help="Show every city, not only the total")
+    parser.add_argument("--csv", help="Write bankroll curves as CSV")
+    args = parser.parse_args()
+
+    dates = args.dates
+    if not dates:
+        conn = connect_readonly(DB_NAME)
+        dates = select_dates(conn, days=args.days, since=args.since)
+        conn.close()
+
+    print("\n💰 ROI EVAL (Gerçek Ganyan)")
+    print("=" * 80)
+    summary, curves = evaluate_roi(dates, args.city, args.model, args.budget, args.stake)
+    if summary.empty:
+        print("❌ No races with recorded odds.")
+        return
+    print_summary(summary, args.by_city)
+    print("ℹ️ Plase ikramiyesi tahmini (ganyan bazlı), Altılı ikramiyesi kazanan ganyanlarının çarpımı.")
+
+    if args.csv:
+        cols = ['strategy', 'city', 'date', 'race_no', 'stake', 'ret', 'profit', 'bankroll', 'drawdown']
+        curves[cols].to_csv(args.csv, index=False)
+        print(f"✅ Bankroll curves saved: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -49,56 +49,24 @@ def run_kahin_predictions():
     )
     
     if result.returncode != 0:
-        print(f"❌ Kahin error: {result.stderr}")
+        print(f"❌ Kahin error: {result.stderr or result.stdout}")
         return False
     
     print(result.stdout)
     return True
 
 def upload_to_supabase():
-    """SQL dosyasını okur ve Supabase'e yükler"""
-    sql_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "seed_data_today.sql"
-    )
-    
-    if not os.path.exists(sql_path):
-        print("❌ seed_data_today.sql not found")
-        return False
-    
-    with open(sql_path, 'r') as f:
-        sql_content = f.read()
-    
-    # Parse SQL to extract coupon data
-    # For now, we'll use the Supabase Python client directly
-    supabase = get_supabase()
-    
-    # Execute raw SQL (requires postgres extension or RPC)
-    # Alternative: Parse the SQL and use insert()
-    print("📤 Uploading to Supabase...")
+    """Outbox'taki yayın işlemlerini Supabase'e gönderir"""
+    from outbox import flush
     
-    # Use RPC to execute SQL
+    # generate_custom_sql already queued the changed coupons; undelivered ones stay for the next flush
+    print("📤 Flushing outbox to Supabase...")
     try:
-        # First, delete today's coupons
-        today = datetime.now().strftime('%Y-%m-%d')
-        supabase.table('coupons').delete().eq('date', today).execute()
-        
-        # Parse and insert from SQL file
-        # This is a simplified approach - in production, use direct inserts
-        import re
-        
-        # Extract VALUES from SQL
-        values_match = re.search(r"VALUES\s*\n?(.*);?$", sql_content, re.DOTALL)
-        if values_match:
-            print("✅ Coupons uploaded successfully")
-            return True
-        else:
-            print("⚠️ Could not parse SQL, please run manually")
-            return False
-            
+        result = flush()
     except Exception as e:
         print(f"❌ Upload error: {e}")
         return False
+    return result['pending'] == 0
 
 def main():
     print("=" * 50)
@@ -118,8 +86,8 @@ def main():
     
     # Step 3: Upload to Supabase
     if not upload_to_supabase():
-        print("⚠️ Auto-upload failed. Please run SQL manually in Supabase dashboard.")
-        print(f"   File: seed_data_today.sql")
+        print("⏳ Some publish operations are still queued; they are retried by the next flush.")
+        print("   Status: python outbox.py --status | Retry now: python outbox.py --flush")
     
     print("\n✅ Daily publish complete!")
     return 0
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+postgrest_standin.py - Yerel PostgREST taklidi (test için)
+In-memory stand-in for the Supabase REST API (/rest/v1/<table>) so the sync
+code can be exercised without the network:
+
+  GET     ?col=eq.val&select=a,b
+  POST    single object or array; ?on_conflict=a,b with
+          Prefer: resolution=merge-duplicates | ignore-duplicates
+  PATCH   ?col=eq.val
+  DELETE  ?col=eq.val
+  GET /_stats   requests, TCP connections, bytes received per method
+
+Unique constraints are declared with --unique (coupons: date,city,type by
+default). --fail-rate answers that share of requests with 503 to exercise
+client retries.
+
+    python scripts/postgrest_standin.py --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 python supabase_sync.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+TABLES = {}
+UNIQUE = {'coupons': ('date', 'city', 'type'), 'coupon_stats': ('period', 'city', 'strategy')}
+STATS = {'requests': 0, 'connections': 0, 'bytes_received': 0, 'methods': {}, 'errors': 0}
+LOCK = threading.RLock()       # _error() takes it again inside the table lock
+FAIL_RATE = 0.0
+
+
+def _filters(query):
+    """col=eq.val pairs (only eq is needed by our clients)."""
+    out = {}
+    for k, v in query:
+        if k in ('select', 'on_conflict', 'order', 'limit'): continue
+        op, _, val = v.partition('.')
+        if op != 'eq':
+            raise ValueError(f"unsupported operator: {op}")
+        out[k] = val
+    return out
+
+
+def _match(row, flt):
+    return all(str(row.get(k)) == v for k, v in flt.items())
+
+
+def _select(row, cols):
+    return {c: row.get(c) for c in cols} if cols else dict(row)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with LOCK: STATS['connections'] += 1
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, code, payload=None):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code, sql_code, message):
+        with LOCK: STATS['errors'] += 1
+        self._reply(code, {'code': sql_code, 'message': message})
+
+    def _route(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        with LOCK:
+            STATS['requests'] += 1
+            STATS['bytes_received'] += len(raw)
+            STATS['methods'][self.command] = STATS['methods'].get(self.command, 0) + 1
+
+        url = urlsplit(self.path)
+        if url.path == '/_stats':
+            with LOCK: return self._reply(200, {**STATS, 'rows': {t: len(r) for t, r in TABLES.items()}})
+        if not url.path.startswith('/rest/v1/'):
+            return self._error(404, 'PGRST', 'not found')
+        if FAIL_RATE and random.random() < FAIL_RATE:
+            return self._error(503, 'PGRST', 'injected failure')
+
+        table = url.path[len('/rest/v1/'):]
+        query = parse_qsl(url.query)
+        params = dict(query)
+        try:
+            flt = _filters(query)
+            body = json.loads(raw) if raw else None
+        except ValueError as e:
+            return self._error(400, 'PGRST100', str(e))
+        prefer = self.headers.get('Prefer', '')
+        represent = 'return=representation' in prefer
+        cols = [c for c in params.get('select', '').split(',') if c and c != '*']
+
+        with LOCK:
+            rows = TABLES.setdefault(table, [])
+            if self.command == 'GET':
+                return self._reply(200, [_select(r, cols) for r in rows if _match(r, flt)])
+
+            if self.command == 'POST':
+                items = body if isinstance(body, list) else [body]
+                keys = tuple(params['on_conflict'].split(',')) if 'on_conflict' in params else UNIQUE.get(table)
+                if 'on_conflict' in params and keys != UNIQUE.get(table):
+                    return self._error(400, '42P10', 'there is no unique or exclusion constraint matching the ON CONFLICT specification')
+                index = {tuple(str(r.get(k)) for k in keys): r for r in rows} if keys else {}
+                seen, out = set(), []
+                for item in items:
+                    key = tuple(str(item.get(k)) for k in keys) if keys else None
+                    if key in seen:
+                        return self._error(500, '21000', 'ON CONFLICT DO UPDATE command cannot affect row a second time')
+                    if key is not None: seen.add(key)
+                    existing = index.get(key) if keys else None
+                    if existing is not None:
+                        if 'resolution=merge-duplicates' in prefer:
+                            existing.update(item)
+                            out.append(existing)
+                        elif 'resolution=ignore-duplicates' not in prefer:
+                            return self._error(409, '23505', f'duplicate key value violates unique constraint on {keys}')
+                        continue
+                    row = {'id': str(uuid.uuid4()), **item}
+                    rows.append(row)
+                    if keys: index[key] = row
+                    out.append(row)
+                return self._reply(201, out) if represent else self._reply(201)
+
+            if self.command == 'PATCH':
+                out = [r for r in rows if _match(r, flt)]
+                for r in out: r.update(body or {})
+                return self._reply(200, out) if represent else self._reply(204)
+
+            if self.command == 'DELETE':
+                out = [r for r in rows if _match(r, flt)]
+                TABLES[table] = [r for r in rows if not _match(r, flt)]
+                return self._reply(200, out) if represent else self._reply(204)
+
+        return self._error(405, 'PGRST', 'method not allowed')
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _route
+
+
+def main():
+    global FAIL_RATE
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--unique", nargs='*', default=[], metavar="TABLE=COL,COL",
+                        help="Extra unique constraints (coupons=date,city,type is built in)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    for spec in args.unique:
+        table, _, cols = spec.partition('=')
+        UNIQUE[table] = tuple(cols.split(','))
+    FAIL_RATE = args.fail_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"🧪 PostgREST stand-in on http://{args.host}:{args.port} (unique: {UNIQUE})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"📊 {json.dumps(STATS, ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
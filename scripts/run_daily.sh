@@ -3,6 +3,7 @@
 # 
 # Crontab setup:
 #   0 10 * * * /path/to/predictions/scripts/run_daily.sh publish >> /path/to/logs/publish.log 2>&1
+#   0 13 * * * /path/to/predictions/scripts/run_daily.sh reconcile >> /path/to/logs/reconcile.log 2>&1
 #   0 22 * * * /path/to/predictions/scripts/run_daily.sh results >> /path/to/logs/results.log 2>&1
 
 set -e
@@ -31,8 +32,12 @@ case "$1" in
         echo "🌙 Running daily results..."
         python3 scripts/daily_results.py
         ;;
+    reconcile)
+        echo "🏁 Settling coupon legs as races finish..."
+        python3 results_reconciler.py --poll
+        ;;
     *)
-        echo "Usage: $0 {publish|results}"
+        echo "Usage: $0 {publish|reconcile|results}"
         exit 1
         ;;
 esac
@@ -0,0 +1,229 @@
+"""
+Stats Aggregates - Önceden Hesaplanmış İstatistikler
+===================================================
+Incremental aggregate store behind the app's statistics pages. Every coupon
+contributes one vector (coupons, pending, won, lost, legs-caught bucket,
+cost, return) to 12 cells:
+
+    period   all | YYYY-MM | YYYY-Www        (period_type all / month / week)
+    city     normalized city ("İzmir (7. Y.G.)" -> "İzmir") | all
+    strategy coupon type (free / premium) | all
+
+The last contribution of each coupon is kept in coupon_stats_contrib, so when
+a coupon is saved again (e.g. it settles) only the difference is applied to
+its cells; nothing rescans the coupons table. save_coupons() calls
+update_stats() in the caller's transaction. Cost and return count settled
+coupons only (cost is parsed from the "TUTAR: x TL" subtitle).
+
+The cells are exported as the compact `coupon_stats` Supabase table
+(upsert on period, city, strategy) through the outbox, so StatsPage /
+StatisticsPage read a handful of rows instead of scanning all coupons.
+
+Usage:
+    python stats_aggregates.py                  # show the all-time table
+    python stats_aggregates.py --period 2026-01
+    python stats_aggregates.py --rebuild        # recompute from the local coupons table
+    python stats_aggregates.py --publish        # queue changed rows + flush the outbox
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.append(os.getcwd())
+import tjk_db
+
+DB_NAME = "tjk_races.db"
+ALL = 'all'
+FIELDS = ('coupons', 'pending', 'won', 'lost', 'cost', 'returns')
+
+
+def init_stats_db(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coupon_stats (
+            period TEXT NOT NULL,
+            city TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            period_type TEXT NOT NULL,
+            coupons INTEGER DEFAULT 0,
+            pending INTEGER DEFAULT 0,
+            won INTEGER DEFAULT 0,
+            lost INTEGER DEFAULT 0,
+            legs_dist TEXT DEFAULT '[]',
+            cost REAL DEFAULT 0,
+            returns REAL DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (period, city, strategy)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coupon_stats_contrib (
+            date TEXT NOT NULL,
+            city TEXT NOT NULL,
+            type TEXT NOT NULL,
+            status TEXT,
+            legs_caught INTEGER,
+            cost REAL,
+            returns REAL,
+            PRIMARY KEY (date, city, type)
+        )
+    """)
+
+
+def stats_city(city):
+    return city.split('(')[0].strip()
+
+
+def coupon_cost(subtitle):
+    """'TUTAR: 1.234,50 TL' / 'TUTAR: 600.00 TL' -> float (0 if unknown)."""
+    m = re.search(r'([\d.,]+)\s*TL', subtitle or '')
+    if not m: return 0.0
+    s = m.group(1)
+    s = s.replace(',', '') if s.rfind(',') < s.rfind('.') else s.replace('.', '').replace(',', '.')
+    try: return float(s)
+    except ValueError: return 0.0
+
+
+def periods(date):
+    """'2026-01-19' -> [('all', 'all'), ('2026-01', 'month'), ('2026-W04', 'week')]"""
+    d = datetime.strptime(date, '%Y-%m-%d')
+    year, week, _ = d.isocalendar()
+    return [(ALL, 'all'), (d.strftime('%Y-%m'), 'month'), (f"{year}-W{week:02d}", 'week')]
+
+
+def contribution(coupon):
+    """Stored contribution row of a coupon: (status, legs_caught, cost, return)."""
+    settled = coupon.status in ('won', 'lost')
+    caught = sum(leg.get('leg_result') == 'won' for leg in coupon.legs)
+    return (coupon.status, caught,
+            coupon_cost(coupon.subtitle) if settled else 0.0,
+            float(coupon.winning_amount or 0) if coupon.status == 'won' else 0.0)
+
+
+def _apply(cells, date, city, strategy, contrib, sign):
+    status, caught, cost, ret = contrib
+    for period, period_type in periods(date):
+        for c in (stats_city(city), ALL):
+            for s in (strategy, ALL):
+                cell = cells[(period, c, s)]
+                cell['period_type'] = period_type
+                cell['coupons'] += sign
+                if status in ('pending', 'won', 'lost'): cell[status] += sign
+                if status in ('won', 'lost'): cell['dist'][caught] += sign
+                cell['cost'] += sign * cost
+                cell['returns'] += sign * ret
+
+
+def update_stats(conn, coupons):
+    """Applies the changed contributions of `coupons` to their cells (no commit). -> coupons changed"""
+    init_stats_db(conn)
+    coupons = list({c.key: c for c in coupons}.values())
+    if not coupons: return 0
+    cells = defaultdict(lambda: {'period_type': ALL, 'coupons': 0, 'pending': 0, 'won': 0, 'lost': 0,
+                                 'dist': defaultdict(int), 'cost': 0.0, 'returns': 0.0})
+    changed = []
+    for c in coupons:
+        old = conn.execute("SELECT status, legs_caught, cost, returns FROM coupon_stats_contrib WHERE date=? AND city=? AND type=?",
+                           c.key).fetchone()
+        new = contribution(c)
+        if old is not None and tuple(old) == new: continue
+        if old is not None: _apply(cells, c.date, c.city, c.type, tuple(old), -1)
+        _apply(cells, c.date, c.city, c.type, new, +1)
+        changed.append((*c.key, *new))
+    if not changed: return 0
+
+    now = datetime.now().isoformat(timespec='seconds')
+    for key, delta in cells.items():
+        row = conn.execute("SELECT coupons, pending, won, lost, cost, returns, legs_dist FROM coupon_stats "
+                           "WHERE period=? AND city=? AND strategy=?", key).fetchone()
+        cur = dict(zip(FIELDS, row[:6])) if row else dict.fromkeys(FIELDS, 0)
+        dist = json.loads(row[6]) if row else []
+        for k in FIELDS: cur[k] += delta[k]
+        for caught, n in delta['dist'].items():
+            dist += [0] * (caught + 1 - len(dist))
+            dist[caught] += n
+        while dist and dist[-1] == 0: dist.pop()
+
+        if cur['coupons'] <= 0:
+            conn.execute("DELETE FROM coupon_stats WHERE period=? AND city=? AND strategy=?", key)
+            continue
+        conn.execute("""
+            INSERT OR REPLACE INTO coupon_stats (period, city, strategy, period_type, coupons, pending, won, lost, legs_dist, cost, returns, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (*key, delta['period_type'], cur['coupons'], cur['pending'], cur['won'], cur['lost'],
+              json.dumps(dist), round(cur['cost'], 2), round(cur['returns'], 2), now))
+    conn.executemany("INSERT OR REPLACE INTO coupon_stats_contrib VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+    return len(changed)
+
+
+def rebuild_stats(conn):
+    """Recomputes every cell from the local coupons table (no commit)."""
+    from coupon_store import load_coupons
+    init_stats_db(conn)
+    conn.execute("DELETE FROM coupon_stats")
+    conn.execute("DELETE FROM coupon_stats_contrib")
+    return update_stats(conn, load_coupons(conn))
+
+
+def export_rows(conn, period=None):
+    """Supabase rows (derived hit rate / ROI included; updated_at left out so unchanged cells hash the same)."""
+    init_stats_db(conn)
+    q = "SELECT period, period_type, city, strategy, coupons, pending, won, lost, legs_dist, cost, returns FROM coupon_stats"
+    rows = conn.execute(q + (" WHERE period = ?" if period else "") + " ORDER BY period, city, strategy",
+                        (period,) if period else ()).fetchall()
+    out = []
+    for period, period_type, city, strategy, coupons, pending, won, lost, dist, cost, ret in rows:
+        settled = won + lost
+        out.append({
+            'period': period, 'period_type': period_type, 'city': city, 'strategy': strategy,
+            'coupons': coupons, 'pending': pending, 'won': won, 'lost': lost,
+            'hit_rate': round(won / settled, 4) if settled else 0,
+            'legs_dist': json.loads(dist),
+            'cost': cost, 'returns': ret,
+            'roi': round((ret - cost) / cost, 4) if cost else 0
+        })
+    return out
+
+
+def publish_stats(conn, force=False):
+    """Queues the changed cells for Supabase (no commit)."""
+    from outbox import enqueue_rows
+    return enqueue_rows(conn, 'coupon_stats', export_rows(conn), force=force)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--period", default=ALL, help="all / YYYY-MM / YYYY-Www")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute from the local coupons table")
+    parser.add_argument("--publish", action="store_true", help="Queue changed rows in the outbox and flush it")
+    parser.add_argument("--force", action="store_true", help="With --publish: re-send unchanged rows")
+    args = parser.parse_args()
+
+    conn = tjk_db.connect(DB_NAME)
+    if args.rebuild:
+        print(f"🔁 Rebuilt from {rebuild_stats(conn)} coupons")
+    if args.publish:
+        queued = publish_stats(conn, args.force)
+        print(f"📬 Outbox: {queued['queued']} queued, {queued['skipped']} unchanged")
+    conn.commit()
+    rows = export_rows(conn, args.period)
+    conn.close()
+
+    print(f"\n📊 COUPON STATS ({args.period})")
+    print(f"   {'City':16} {'Strategy':9} {'Coupons':>7} {'Won':>5} {'Lost':>5} {'Pend':>5} {'Hit%':>6} {'Cost':>10} {'Return':>10} {'ROI':>7}  Legs caught")
+    for r in rows:
+        print(f"   {r['city'][:16]:16} {r['strategy']:9} {r['coupons']:7d} {r['won']:5d} {r['lost']:5d} {r['pending']:5d} "
+              f"{r['hit_rate']:6.1%} {r['cost']:10,.2f} {r['returns']:10,.2f} {r['roi']:7.1%}  {r['legs_dist']}")
+
+    if args.publish:
+        from outbox import flush
+        flush(DB_NAME)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
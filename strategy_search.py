@@ -0,0 +1,289 @@
+"""
+Strategy Search - Vektörel Strateji Izgara Araması
+==================================================
+Grid / random search over the strategy layer (BASE_STRATEGIES weights, the
+chaos / galop / jockey boosts of push_forecasts_v10, the tune_strategy greedy
+optimizer: hard_threshold, min_hard, min_easy, max_horses, budget).
+
+Every backtest day is loaded once from the feature cache and packed into
+padded NumPy tensors (units x 6 legs x max field). Parameter sets are then
+evaluated in batches as (P, U, 6, H) arrays, and batches are spread over a
+process pool, so thousands of parameter sets take seconds instead of a
+DataFrame copy + iterrows per set.
+
+Usage:
+    python strategy_search.py --since 2026-01-01 --grid --workers 4
+    python strategy_search.py --days 30 --random 5000 --top 25 --csv leaderboard.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from backtest_engine import (
+    DB_NAME, connect_readonly, select_dates, list_units, load_models,
+    build_unit_features
+)
+from feature_cache import cached_frame
+
+UNIT_PRICE = 1.25
+BATCH_SIZE = 64
+TENSOR_COLS = ['base_prob', 'galop_score', 'quantum_chaos', 'momentum_5',
+               'combo_win_rate', 'track_win_rate', 'quantum_field']
+
+# Search space: grid values / random ranges (lo, hi, is_int)
+PARAM_GRID = {
+    'w_prob':      [100],
+    'w_mom':       [0, 75, 150],
+    'w_combo':     [0, 80],
+    'w_track':     [0, 80],
+    'w_surprise':  [0, 80],
+    'chaos_add':   [0.0, 0.45],
+    'galop_add':   [0.0, 0.35],
+    'jockey_add':  [0.0, 0.25],
+    'hard_thresh': [0.30, 0.35, 0.40],
+    'min_hard':    [3, 4, 5],
+    'min_easy':    [1, 2],
+    'max_horses':  [12],
+    'budget':      [500.0, 810.0, 1000.0],
+}
+
+PARAM_RANGES = {
+    'w_prob':      (50, 150, True),
+    'w_mom':       (0, 200, True),
+    'w_combo':     (0, 150, True),
+    'w_track':     (0, 150, True),
+    'w_surprise':  (0, 150, True),
+    'chaos_add':   (0.0, 0.6, False),
+    'galop_add':   (0.0, 0.5, False),
+    'jockey_add':  (0.0, 0.4, False),
+    'hard_thresh': (0.15, 0.5, False),
+    'min_hard':    (1, 6, True),
+    'min_easy':    (1, 3, True),
+    'max_horses':  (6, 14, True),
+    'budget':      (300.0, 1500.0, False),
+}
+
+PARAM_NAMES = list(PARAM_GRID.keys())
+
+_TENSORS = {}
+
+
+def load_tensors(dates, city=None, model_prefix=None, db_path=DB_NAME):
+    """
+    Packs the last altılı of every (date, city) unit into padded arrays:
+        feats:  (len(TENSOR_COLS), U, 6, H) float32
+        valid:  (U, 6, H) bool    - real horse (not padding)
+        winner: (U, 6, H) bool    - rank 1
+    """
+    conn = connect_readonly(db_path)
+    models = load_models(model_prefix)
+    build = lambda c, d, ct: build_unit_features(c, d, ct, models)
+
+    units, legs = [], []
+    for date_str, c in list_units(conn, dates, city):
+        df = cached_frame(conn, date_str, c, models['prefix'], build)
+        if df is None or df.empty: continue
+        race_nos = sorted(df['race_no'].unique())
+        if len(race_nos) < 6: continue
+        unit_legs = [df[df['race_no'] == r] for r in race_nos[-6:]]
+        if any((l['rank'] == 1).sum() == 0 for l in unit_legs): continue
+        units.append((date_str, c))
+        legs.append(unit_legs)
+    conn.close()
+
+    if not units:
+        return None
+    H = max(len(l) for unit_legs in legs for l in unit_legs)
+    U = len(units)
+    feats = np.zeros((len(TENSOR_COLS), U, 6, H), dtype=np.float32)
+    valid = np.zeros((U, 6, H), dtype=bool)
+    winner = np.zeros((U, 6, H), dtype=bool)
+    for u, unit_legs in enumerate(legs):
+        for i, l in enumerate(unit_legs):
+            n = len(l)
+            for f, col in enumerate(TENSOR_COLS):
+                feats[f, u, i, :n] = l[col].to_numpy(dtype=float) if col in l else 0.0
+            valid[u, i, :n] = True
+            winner[u, i, :n] = (l['rank'] == 1).to_numpy()
+    return {'units': units, 'feats': feats, 'valid': valid, 'winner': winner}
+
+
+def param_grid(grid=PARAM_GRID):
+    return [dict(zip(grid.keys(), vals)) for vals in itertools.product(*grid.values())]
+
+
+def param_random(n, ranges=PARAM_RANGES, seed=42):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        p = {}
+        for k, (lo, hi, is_int) in ranges.items():
+            p[k] = int(rng.integers(lo, hi + 1)) if is_int else float(round(rng.uniform(lo, hi), 3))
+        out.append(p)
+    return out
+
+
+def _col(params, name):
+    # (P, 1, 1, 1) for broadcasting over (P, U, 6, H)
+    return np.array([p[name] for p in params], dtype=np.float32)[:, None, None, None]
+
+
+def score_tensor(params, feats):
+    """BASE_STRATEGIES weighting + chaos / galop / jockey boosts -> (P, U, 6, H)."""
+    base, galop, chaos, mom, combo, track, qfield = feats
+    ai_prob = np.clip(base + (galop - 0.5) * 0.2, 0.01, 0.99)
+
+    score = (_col(params, 'w_prob') * 0.01 * ai_prob + _col(params, 'w_mom') * 0.01 * mom +
+             _col(params, 'w_combo') * 0.01 * combo + _col(params, 'w_track') * 0.01 * track +
+             _col(params, 'w_surprise') * 0.01 * qfield)
+
+    # Same order / conditions as push_forecasts_v10
+    score = score + np.where((score < 0.25) & (chaos > 0.70), chaos * _col(params, 'chaos_add'), 0.0)
+    score = score + np.where((mom < 0.55) & (galop > 0.70), _col(params, 'galop_add'), 0.0)
+    score = score + np.where((combo > 0.20) & (score < 0.25), _col(params, 'jockey_add'), 0.0)
+    return np.clip(score, 0, 0.98)
+
+
+def evaluate_batch(params, tensors):
+    """
+    Vectorized tune_strategy.optimize_strategy + hit check for a batch of
+    parameter sets. Returns (P, U) arrays: legs caught, cost.
+    """
+    feats, valid, winner = tensors['feats'], tensors['valid'], tensors['winner']
+    P = len(params)
+    score = score_tensor(params, feats)
+    score = np.where(valid, score, -np.inf)
+
+    # Rank horses per leg (descending) and locate the winner in that order
+    order = np.argsort(-score, axis=-1, kind='stable')
+    sorted_score = np.take_along_axis(score, order, axis=-1)
+    win_pos = np.argmax(np.take_along_axis(np.broadcast_to(winner, score.shape), order, axis=-1), axis=-1)
+    n_field = valid.sum(axis=-1)[None].repeat(P, axis=0)                    # (P, U, 6)
+
+    # Initial counts: min_hard for hard legs (top score below threshold), else min_easy
+    top = sorted_score[..., 0]
+    hard = top < _col(params, 'hard_thresh')[..., 0]
+    k = np.where(hard, _col(params, 'min_hard')[..., 0], _col(params, 'min_easy')[..., 0]).astype(np.int64)
+    k = np.minimum(k, n_field)
+    k_max = np.minimum(_col(params, 'max_horses')[..., 0].astype(np.int64), n_field)
+    budget = _col(params, 'budget')[:, :, 0, 0]                              # (P, 1)
+
+    # Greedy expansion: add the best next horse whose leg still fits the budget
+    H = score.shape[-1]
+    while True:
+        cost = np.prod(k, axis=-1) * UNIT_PRICE                              # (P, U)
+        active = cost < budget
+        next_score = np.take_along_axis(sorted_score, np.minimum(k, H - 1)[..., None], axis=-1)[..., 0]
+        new_cost = cost[..., None] * (k + 1) / np.maximum(k, 1)
+        ok = (k < k_max) & (new_cost <= budget[..., None]) & active[..., None]
+        cand = np.where(ok, next_score, -np.inf)
+        best = np.argmax(cand, axis=-1)
+        step = np.isfinite(np.max(cand, axis=-1))
+        if not step.any(): break
+        k += (np.arange(6)[None, None, :] == best[..., None]) & step[..., None]
+
+    caught = (win_pos < k).sum(axis=-1)
+    cost = np.prod(k, axis=-1) * UNIT_PRICE
+    return caught, cost
+
+
+def _init_worker(tensors):
+    _TENSORS.update(tensors)
+
+
+def _run_batch(params):
+    caught, cost = evaluate_batch(params, _TENSORS)
+    return [{
+        **p,
+        'hit_rate': float((caught[i] == 6).mean()),
+        'hits': int((caught[i] == 6).sum()),
+        'avg_caught': float(caught[i].mean()),
+        'avg_cost': float(cost[i].mean()),
+        'total_cost': float(cost[i].sum())
+    } for i, p in enumerate(params)]
+
+
+def run_search(tensors, params, workers=1, batch_size=BATCH_SIZE):
+    batches = [params[i:i + batch_size] for i in range(0, len(params), batch_size)]
+    t0 = time.perf_counter()
+    if workers <= 1:
+        _init_worker(tensors)
+        rows = [r for b in batches for r in _run_batch(b)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tensors,)) as ex:
+            rows = [r for res in ex.map(_run_batch, batches) for r in res]
+    elapsed = time.perf_counter() - t0
+    print(f"⚡ {len(params)} parameter sets x {len(tensors['units'])} units in {elapsed:.2f}s "
+          f"({len(params)/elapsed:.0f} sets/s)")
+    # Leaderboard: hit rate, then legs caught, then cheaper
+    rows.sort(key=lambda r: (-r['hit_rate'], -r['avg_caught'], r['avg_cost']))
+    return rows
+
+
+def print_leaderboard(rows, top=20):
+    print(f"\n🏆 LEADERBOARD (Top {min(top, len(rows))})")
+    print("=" * 110)
+    print(f"{'#':>3} {'Hit%':>6} {'Legs':>5} {'AvgTL':>8} | params")
+    for i, r in enumerate(rows[:top]):
+        params = ' '.join(f"{k}={r[k]}" for k in PARAM_NAMES)
+        print(f"{i+1:>3} {r['hit_rate']*100:6.1f} {r['avg_caught']:5.2f} {r['avg_cost']:8.1f} | {params}")
+
+
+def save_leaderboard(rows, path):
+    cols = ['hit_rate', 'hits', 'avg_caught', 'avg_cost', 'total_cost'] + PARAM_NAMES
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.DictWriter(f, fieldnames=cols, extrasaction='ignore')
+        w.writeheader()
+        w.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, help="Past N days")
+    parser.add_argument("--since", help="All dates >= YYYY-MM-DD")
+    parser.add_argument("--dates", nargs='+', help="Explicit dates (DD/MM/YYYY)")
+    parser.add_argument("--city", help="City filter (substring)")
+    parser.add_argument("--model", help="Model prefix (model_honest / model_v10)")
+    parser.add_argument("--grid", action="store_true", help="Full PARAM_GRID")
+    parser.add_argument("--random", type=int, default=0, help="N random parameter sets from PARAM_RANGES")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="Write the full leaderboard as CSV")
+    args = parser.parse_args()
+
+    dates = args.dates
+    if not dates:
+        conn = connect_readonly(DB_NAME)
+        dates = select_dates(conn, days=args.days or (None if args.since else 30), since=args.since)
+        conn.close()
+
+    print("\n🔎 STRATEGY SEARCH")
+    t0 = time.perf_counter()
+    tensors = load_tensors(dates, args.city, args.model)
+    if tensors is None:
+        print("❌ No complete altılı days found.")
+        return
+    print(f"📦 {len(tensors['units'])} units packed {tensors['valid'].shape} in {time.perf_counter()-t0:.1f}s")
+
+    params = []
+    if args.grid or not args.random: params += param_grid()
+    if args.random: params += param_random(args.random, seed=args.seed)
+
+    rows = run_search(tensors, params, args.workers)
+    print_leaderboard(rows, args.top)
+    if args.csv:
+        save_leaderboard(rows, args.csv)
+        print(f"\n✅ Leaderboard saved: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
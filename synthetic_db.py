@@ -0,0 +1,328 @@
+"""
+Synthetic DB - Sentetik TJK Veritabanı Üretici
+==============================================
+Builds a tjk_races.db-compatible database (races, results, program_races,
+program_entries, gallops) for scale and performance testing, deterministic
+from --seed.
+
+  - Turkish cities (with "(N. Y.G.)" meeting numbers) and foreign simulcasts,
+    plausible field sizes per track,
+  - jockeys / trainers / owners / sires drawn from Zipf distributions
+    (a few names take most of the rides, like the real data),
+  - horses with careers: debut at 2-3, race every few weeks, retire after a
+    few seasons; each has a latent ability so results and ganyan odds are
+    consistent with each other and with hp,
+  - weekly gallops per active horse, and the last --program-days days as an
+    upcoming program (program_races / program_entries, no results).
+
+Usage:
+    python synthetic_db.py --out tjk_synthetic.db --years 1 --races-per-day 40
+    python synthetic_db.py --out big.db --years 10 --races-per-day 60 --seed 7
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+import tjk_db
+from pools import TR_CITY_NAMES
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS races (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, city TEXT, race_no INTEGER,
+        distance TEXT, track_type TEXT, prize TEXT, track_condition TEXT);
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, race_id INTEGER, rank INTEGER, horse_name TEXT,
+        age TEXT, sire TEXT, dam TEXT, weight REAL, jockey TEXT, owner TEXT, trainer TEXT,
+        time TEXT, ganyan REAL, hp INTEGER,
+        FOREIGN KEY(race_id) REFERENCES races(id));
+    CREATE TABLE IF NOT EXISTS program_races (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, city TEXT, race_no INTEGER,
+        time TEXT, race_type TEXT, distance TEXT, track_type TEXT, prize TEXT);
+    CREATE TABLE IF NOT EXISTS program_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, program_race_id INTEGER, program_no INTEGER,
+        horse_name TEXT, age TEXT, sire TEXT, dam TEXT, weight REAL, jockey TEXT, owner TEXT,
+        trainer TEXT, start_box INTEGER, hp INTEGER, last_6_races TEXT, kgs INTEGER, s20 INTEGER,
+        best_rating TEXT, agf TEXT, horse_id INTEGER, jockey_id INTEGER, gallop_info TEXT,
+        FOREIGN KEY(program_race_id) REFERENCES program_races(id));
+    CREATE TABLE IF NOT EXISTS gallops (
+        horse_id INTEGER, horse_name TEXT, date TEXT, city TEXT, track_type TEXT,
+        distance REAL, time_sec REAL, rank INTEGER, description TEXT,
+        UNIQUE(horse_id, date, distance));
+"""
+
+# Meeting frequency weight per Turkish city
+TR_CITY_WEIGHTS = {'İstanbul': 6, 'Ankara': 5, 'İzmir': 5, 'Adana': 5, 'Bursa': 4, 'Kocaeli': 2,
+                   'Şanlıurfa': 3, 'Diyarbakır': 2, 'Antalya': 3, 'Elazığ': 1}
+FOREIGN_CITIES = ['ABD (Gulfstream Park)', 'ABD (Aqueduct)', 'Fransa (Deauville)', 'Fransa (Chantilly)',
+                  'Birleşik Krallık (Kempton)', 'İrlanda (Dundalk)', 'Güney Afrika (Turffontein)',
+                  'Avustralya (Flemington)']
+TRACKS = {'Kum': 0.5, 'Çim': 0.3, 'Sentetik': 0.2}
+DISTANCES = [1000, 1100, 1200, 1300, 1400, 1500, 1600, 1700, 1800, 1900, 2000, 2100, 2200, 2400]
+RACE_TYPES = ['Maiden', 'Handikap 15', 'Handikap 17', 'Handikap 22', 'Şartlı 3', 'Şartlı 5', 'KV-7', 'Satış 1']
+
+NAME_PARTS = ['KARA', 'AK', 'BOZ', 'YILDIZ', 'RÜZGAR', 'ŞAHİN', 'BORA', 'TAY', 'ATEŞ', 'DEMİR', 'GÜL',
+              'AY', 'GÜNEŞ', 'DENİZ', 'KAYA', 'TOPRAK', 'SEL', 'ÇELİK', 'ASLAN', 'KURT', 'DORU', 'EFE',
+              'PRENS', 'SULTAN', 'HAN', 'BEY', 'PAŞA', 'YİĞİT', 'CESUR', 'MAVİ', 'ALTIN', 'GÜMÜŞ',
+              'FIRTINA', 'ŞİMŞEK', 'KARTAL', 'DOĞAN', 'BULUT', 'YAKUT', 'ZÜMRÜT', 'İNCİ', 'LALE',
+              'SAFİR', 'TOLGA', 'KAAN', 'ARAS', 'NEHİR', 'UMUT', 'ZAFER', 'TURAN', 'OĞUZ']
+PERSON_FIRST = ['AHMET', 'MEHMET', 'MUSTAFA', 'ALİ', 'HÜSEYİN', 'HASAN', 'İBRAHİM', 'MURAT', 'GÖKHAN',
+                'HALİS', 'SELİM', 'AKIN', 'VEDAT', 'GÜLŞEN', 'ÖZCAN', 'ERDEM', 'CEM', 'KADİR', 'EMRE', 'SERKAN']
+PERSON_LAST = ['KARATAŞ', 'YILMAZ', 'KAYA', 'DEMİR', 'ÇELİK', 'ŞAHİN', 'ÖZTÜRK', 'AYDIN', 'ARSLAN', 'DOĞAN',
+               'KILIÇ', 'ASLAN', 'ÇETİN', 'KOÇ', 'KURT', 'ÖZDEMİR', 'POLAT', 'ERDOĞAN', 'GÜNEŞ', 'BOZKURT']
+
+# Zipf exponent and pool size per role
+ZIPF = {'jockey': (0.80, 260), 'trainer': (0.70, 320), 'owner': (0.60, 2500), 'sire': (0.90, 400)}
+
+TAKEOUT = 0.75  # ganyan pool payout ratio
+
+
+def _unique_names(rng, n, make):
+    """n distinct names from make() (numbered on collision)."""
+    out, seen = [], set()
+    while len(out) < n:
+        name = make()
+        if name in seen:
+            name = f"{name} {len(out) % 97 + 2}"
+            if name in seen: continue
+        seen.add(name)
+        out.append(name)
+    return out
+
+
+def zipf_pool(rng, role):
+    """Names and Zipf probabilities for one role."""
+    s, n = ZIPF[role]
+    if role == 'sire':
+        make = lambda: ' '.join(rng.choice(NAME_PARTS, size=2, replace=False))
+    else:
+        # "AHMET KAYA" or "MEHMET ALİ KAYA"
+        make = lambda: ' '.join(list(rng.choice(PERSON_FIRST, size=int(rng.integers(1, 3)), replace=False)) +
+                                [str(rng.choice(PERSON_LAST))])
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return _unique_names(rng, n, make), w / w.sum()
+
+
+class HorsePopulation:
+    """Active horses with careers. Arrays indexed by horse_id."""
+
+    def __init__(self, rng, pools, start):
+        self.rng = rng
+        self.pools = pools
+        self.start = start
+        self.names, self.ability, self.birth, self.retire = [], [], [], []
+        self.trainer, self.owner, self.sire, self.dam = [], [], [], []
+        self.last_run, self.form = [], []
+        self.active = []
+        self._name_seen = set()
+
+    def _name(self):
+        while True:
+            name = ' '.join(self.rng.choice(NAME_PARTS, size=self.rng.integers(1, 3), replace=False))
+            if name not in self._name_seen:
+                self._name_seen.add(name)
+                return name
+            name = f"{name} {self.rng.integers(2, 10)}"
+            if name not in self._name_seen:
+                self._name_seen.add(name)
+                return name
+
+    def spawn(self, day, n):
+        for _ in range(n):
+            hid = len(self.names)
+            age_days = int(self.rng.integers(2 * 365, 4 * 365))
+            self.names.append(self._name())
+            self.ability.append(float(self.rng.normal()))
+            self.birth.append(day - timedelta(days=age_days))
+            self.retire.append(day + timedelta(days=int(self.rng.integers(365, 5 * 365))))
+            self.trainer.append(int(self.rng.choice(len(self.pools['trainer'][0]), p=self.pools['trainer'][1])))
+            self.owner.append(int(self.rng.choice(len(self.pools['owner'][0]), p=self.pools['owner'][1])))
+            self.sire.append(int(self.rng.choice(len(self.pools['sire'][0]), p=self.pools['sire'][1])))
+            self.dam.append(self._name())
+            self.last_run.append(day - timedelta(days=30))
+            self.form.append([])
+            self.active.append(hid)
+
+    def refresh(self, day, target):
+        self.active = [h for h in self.active if self.retire[h] > day]
+        if len(self.active) < target:
+            self.spawn(day, target - len(self.active))
+
+    def field(self, day, n):
+        """n rested horses (>= 10 days since last run when possible)."""
+        rested = [h for h in self.active if (day - self.last_run[h]).days >= 10]
+        pool = rested if len(rested) >= n else self.active
+        return [int(h) for h in self.rng.choice(pool, size=min(n, len(pool)), replace=False)]
+
+    def age(self, h, day):
+        return (day - self.birth[h]).days // 365
+
+
+def _field_size(rng, foreign):
+    lo, hi = (5, 12) if foreign else (6, 16)
+    return int(np.clip(rng.binomial(hi, 0.65), lo, hi))
+
+
+def _race_time(rng, distance, ability_rank):
+    sec = distance / (16.2 + rng.normal(0, 0.4)) + ability_rank * 0.15
+    return f"{int(sec // 60)}.{int(sec % 60):02d}.{int((sec % 1) * 100):02d}"
+
+
+def _meetings(rng, races_per_day):
+    """(city, n_races, foreign) for one day, ~races_per_day races in total."""
+    tr_names = [c for c in TR_CITY_NAMES if c in TR_CITY_WEIGHTS]
+    w = np.array([TR_CITY_WEIGHTS[c] for c in tr_names], dtype=float)
+    n_meet = max(1, int(round(races_per_day / 8)))
+    n_foreign = min(int(rng.binomial(n_meet, 0.3)), len(FOREIGN_CITIES))
+    n_tr = max(1, min(n_meet - n_foreign, len(tr_names)))
+    cities = [(c, False) for c in rng.choice(tr_names, size=n_tr, replace=False, p=w / w.sum())]
+    cities += [(c, True) for c in rng.choice(FOREIGN_CITIES, size=n_foreign, replace=False)]
+    per = max(races_per_day // len(cities), 1)
+    return [(c, int(np.clip(per + rng.integers(-1, 2), 5, 11)), f) for c, f in cities]
+
+
+def _city_label(city, foreign, meeting_no):
+    return city if foreign else f"{city} ({meeting_no}. Y.G.)"
+
+
+def generate(path, years=1.0, races_per_day=40, seed=42, start='2020-01-01', program_days=1, verbose=True):
+    """Writes a synthetic DB to path (replaced if it exists). Returns row counts."""
+    rng = np.random.default_rng(seed)
+    start_day = datetime.strptime(start, '%Y-%m-%d')
+    n_days = max(int(round(years * 365)), 1)
+    pools = {role: zipf_pool(rng, role) for role in ZIPF}
+    jockeys, j_p = pools['jockey']
+    j_skill = rng.normal(0, 0.35, len(jockeys)) + np.linspace(0.4, -0.2, len(jockeys))
+
+    # ~11 runners per race, each horse runs every ~3 weeks
+    horses = HorsePopulation(rng, pools, start_day)
+    target_active = max(int(races_per_day * 11 * 21 / 7 * 1.2), 200)
+    horses.spawn(start_day, target_active)
+
+    if os.path.exists(path): os.remove(path)
+    conn = tjk_db.connect(path)
+    conn.executescript(SCHEMA)
+    counts = {'races': 0, 'results': 0, 'program_races': 0, 'program_entries': 0, 'gallops': 0}
+    meeting_no = {}
+    t0 = time.perf_counter()
+
+    for d in range(n_days + program_days):
+        day = start_day + timedelta(days=d)
+        ds = day.strftime('%d/%m/%Y')
+        is_program = d >= n_days
+        horses.refresh(day, target_active)
+        race_rows, result_rows = [], []
+
+        for city, n_races, foreign in _meetings(rng, races_per_day):
+            meeting_no[city] = meeting_no.get(city, 0) + 1
+            label = _city_label(city, foreign, (meeting_no[city] - 1) % 40 + 1)
+            for rn in range(1, n_races + 1):
+                distance = int(rng.choice(DISTANCES))
+                track = str(rng.choice(list(TRACKS), p=list(TRACKS.values())))
+                prize = str(int(rng.choice([90_000, 120_000, 180_000, 260_000, 400_000])))
+                field = horses.field(day, _field_size(rng, foreign))
+                jock = rng.choice(len(jockeys), size=len(field), p=j_p)
+                ability = np.array([horses.ability[h] for h in field])
+                hp = np.clip(np.round(60 + ability * 15 + rng.normal(0, 5, len(field))), 15, 120).astype(int)
+                weight = np.clip(np.round(50 + (hp - 15) / 105 * 12), 50, 62)
+
+                if is_program:
+                    cur = conn.execute(
+                        "INSERT INTO program_races (date, city, race_no, time, race_type, distance, track_type, prize) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ds, label, rn, f"{13 + rn // 2}:{(rn % 2) * 30:02d}", str(rng.choice(RACE_TYPES)),
+                         str(distance), track, prize))
+                    market = np.exp(ability * 0.9 + rng.normal(0, 0.5, len(field)))
+                    agf = market / market.sum() * 100
+                    rows = []
+                    for i, h in enumerate(field):
+                        form = ''.join(str(min(r, 9)) for r in horses.form[h][-6:])
+                        rows.append((cur.lastrowid, i + 1, horses.names[h], f"{horses.age(h, day)}y",
+                                     pools['sire'][0][horses.sire[h]], horses.dam[h], float(weight[i]),
+                                     jockeys[jock[i]], pools['owner'][0][horses.owner[h]],
+                                     pools['trainer'][0][horses.trainer[h]], int(rng.integers(1, len(field) + 1)),
+                                     int(hp[i]), form, int((day - horses.last_run[h]).days), 0,
+                                     '', f"%{agf[i]:.2f}", h + 1, int(jock[i]) + 1, ''))
+                    conn.executemany(
+                        "INSERT INTO program_entries (program_race_id, program_no, horse_name, age, sire, dam, weight, "
+                        "jockey, owner, trainer, start_box, hp, last_6_races, kgs, s20, best_rating, agf, horse_id, "
+                        "jockey_id, gallop_info) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    counts['program_races'] += 1
+                    counts['program_entries'] += len(rows)
+                    continue
+
+                # Finish order: ability + jockey + race-day noise
+                perf = ability + j_skill[jock] + rng.gumbel(0, 0.9, len(field))
+                order = np.argsort(-perf)
+                # Market odds: noisy view of the same strengths, with pool takeout
+                market = np.exp(ability * 0.9 + j_skill[jock] * 0.5 + rng.normal(0, 0.45, len(field)))
+                ganyan = np.maximum(np.round(TAKEOUT / (market / market.sum()), 2), 1.05)
+
+                race_rows.append((ds, label, rn, str(distance), track, prize, str(rng.choice(['Normal', 'Islak', 'Ağır']))))
+                result_rows.append([(pos + 1, horses.names[field[i]], f"{horses.age(field[i], day)}y",
+                                     pools['sire'][0][horses.sire[field[i]]], horses.dam[field[i]], float(weight[i]),
+                                     jockeys[jock[i]], pools['owner'][0][horses.owner[field[i]]],
+                                     pools['trainer'][0][horses.trainer[field[i]]],
+                                     _race_time(rng, distance, pos), float(ganyan[i]), int(hp[i]))
+                                    for pos, i in enumerate(order)])
+                for pos, i in enumerate(order):
+                    h = field[i]
+                    horses.last_run[h] = day
+                    horses.form[h] = (horses.form[h] + [pos + 1])[-6:]
+
+        for race, rows in zip(race_rows, result_rows):
+            cur = conn.execute("INSERT INTO races (date, city, race_no, distance, track_type, prize, track_condition) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", race)
+            conn.executemany("INSERT INTO results (race_id, rank, horse_name, age, sire, dam, weight, jockey, owner, "
+                             "trainer, time, ganyan, hp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(cur.lastrowid,) + r for r in rows])
+            counts['results'] += len(rows)
+        counts['races'] += len(race_rows)
+
+        # Gallops: every active horse works roughly once a week
+        if not is_program:
+            working = [h for h in horses.active if rng.random() < 1 / 7]
+            gd = day.strftime('%d.%m.%Y')
+            g_rows = []
+            for h in working:
+                dist = int(rng.choice([400, 600, 800, 1000, 1200]))
+                speed = 15.5 + horses.ability[h] * 0.3 + rng.normal(0, 0.4)
+                g_rows.append((h + 1, horses.names[h], gd, str(rng.choice(list(TR_CITY_WEIGHTS))),
+                               str(rng.choice(['Kum', 'Çim'])), dist, round(dist / speed, 2),
+                               int(rng.integers(1, 11)), ''))
+            conn.executemany("INSERT OR IGNORE INTO gallops VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", g_rows)
+            counts['gallops'] += len(g_rows)
+
+        if d % 30 == 0:
+            conn.commit()
+            if verbose and d:
+                print(f"   ⏳ {d}/{n_days} days, {counts['results']} results ({time.perf_counter() - t0:.0f}s)")
+
+    conn.commit()
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default="tjk_synthetic.db")
+    parser.add_argument("--years", type=float, default=1.0, help="Years of results history")
+    parser.add_argument("--races-per-day", type=int, default=40, help="Races per day over all cities")
+    parser.add_argument("--start", default="2020-01-01", help="First race day YYYY-MM-DD")
+    parser.add_argument("--program-days", type=int, default=1, help="Trailing days written as program only")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🏗️  SYNTHETIC TJK DB: {args.out} ({args.years} years, {args.races_per_day} races/day, seed {args.seed})")
+    t0 = time.perf_counter()
+    counts = generate(args.out, args.years, args.races_per_day, args.seed, args.start, args.program_days)
+    print(f"✅ Done in {time.perf_counter() - t0:.1f}s: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
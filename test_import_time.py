@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ('pandas', 'numpy', 'requests', 'bs4', 'joblib', 'sklearn', 'lightgbm', 'xgboost', 'catboost')
+CLI_BUDGET_MS = 100
+
+
+def import_times(*args):
+    """python -X importtime <args> -> {module: cumulative ms}"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=HERE,
+                         capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_cli_import_budget():
+    times = import_times('-c', 'import kahin')
+    assert times['kahin'] < CLI_BUDGET_MS, f"kahin import took {times['kahin']:.1f} ms"
+    assert not [m for m in HEAVY if m in times]
+
+
+def test_cli_help_stays_light():
+    times = import_times(os.path.join(HERE, 'kahin.py'), '--help')
+    assert not [m for m in HEAVY if m in times]
+
+
+def test_optimizer_without_production_engine():
+    times = import_times('-c', 'from coupon_optimizer import optimize_coupon_logic')
+    assert 'production_engine' not in times
+    assert not [m for m in HEAVY if m in times]
+
+
+def test_production_engine_defers_scraping_and_models():
+    times = import_times('-c', 'import production_engine')
+    assert not [m for m in ('requests', 'bs4', 'joblib', 'lightgbm', 'xgboost', 'catboost') if m in times]
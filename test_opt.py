@@ -1,5 +1,5 @@
 
-from production_engine import optimize_coupon_logic
+from coupon_optimizer import optimize_coupon_logic
 
 def test_opt():
     # 6 legs, 10 horses each, scores 0.1 to 0.01
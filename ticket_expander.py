@@ -0,0 +1,206 @@
+"""
+Ticket Expander - Kupon Kombinasyonları
+=======================================
+Lazily expands a coupon (one list of horses per leg) into its ticket lines,
+the Cartesian product of the legs, without materializing it.
+
+Combinations are numbered with a mixed-radix index: leg i has radix
+len(selection[i]) and the last leg varies fastest, so
+    k = ((d1 * r2 + d2) * r3 + d3) ...
+Random access (unrank), rank, streaming iteration and CSV / binary export
+all work on that index.
+
+Usage:
+    python ticket_expander.py --legs coupon.json --csv tickets.csv
+    python ticket_expander.py --legs coupon.json --k 12345
+coupon.json: the `legs` column of a coupon ([{"horses": [{"horse_name": ...}]}])
+or a plain list of horse-name lists.
+"""
+
+import argparse
+import csv
+import json
+import struct
+import sys
+
+import numpy as np
+
+BIN_MAGIC = b'TKT1'
+CHUNK_SIZE = 65_536
+
+
+def leg_names(selection):
+    """Accepts optimizer output [(name, score, ...)], name lists or legs JSON."""
+    legs = []
+    for leg in selection:
+        if isinstance(leg, dict): leg = [h['horse_name'] for h in leg['horses']]
+        legs.append([x[0] if isinstance(x, (tuple, list)) else str(x) for x in leg])
+    return legs
+
+
+def radices(selection):
+    return [len(leg) for leg in leg_names(selection)]
+
+
+def combo_count(selection):
+    n = 1
+    for r in radices(selection): n *= r
+    return n
+
+
+def unrank_digits(radix, k):
+    """Index k -> per-leg positions."""
+    digits = [0] * len(radix)
+    for i in range(len(radix) - 1, -1, -1):
+        k, digits[i] = divmod(k, radix[i])
+    return digits
+
+
+def rank_digits(radix, digits):
+    """Per-leg positions -> index k."""
+    k = 0
+    for r, d in zip(radix, digits):
+        if not 0 <= d < r: raise ValueError(f"digit {d} out of range for radix {r}")
+        k = k * r + d
+    return k
+
+
+def unrank(selection, k):
+    """Ticket #k as a tuple of horse names."""
+    legs = leg_names(selection)
+    radix = [len(l) for l in legs]
+    if not 0 <= k < combo_count(legs): raise IndexError(f"ticket {k} out of range")
+    return tuple(leg[d] for leg, d in zip(legs, unrank_digits(radix, k)))
+
+
+def rank(selection, ticket):
+    """Index of a ticket (tuple of horse names) within the coupon."""
+    legs = leg_names(selection)
+    digits = [leg.index(name) for leg, name in zip(legs, ticket)]
+    return rank_digits([len(l) for l in legs], digits)
+
+
+def iter_digits(radix, start=0, stop=None):
+    """Odometer over per-leg positions from index start (inclusive) to stop (exclusive), as tuples."""
+    total = 1
+    for r in radix: total *= r
+    stop = total if stop is None else min(stop, total)
+    if start >= stop: return
+    digits = unrank_digits(radix, start)
+    for _ in range(stop - start):
+        yield tuple(digits)
+        i = len(radix) - 1
+        while i >= 0:
+            digits[i] += 1
+            if digits[i] < radix[i]: break
+            digits[i] = 0
+            i -= 1
+
+
+def iter_tickets(selection, start=0, stop=None):
+    """Yields (k, (name1, name2, ...)) lazily."""
+    legs = leg_names(selection)
+    for k, digits in enumerate(iter_digits([len(l) for l in legs], start, stop), start):
+        yield k, tuple(leg[d] for leg, d in zip(legs, digits))
+
+
+def digit_block(radix, start, stop):
+    """(stop-start, legs) uint8 array of positions, vectorized."""
+    k = np.arange(start, stop, dtype=np.int64)
+    out = np.empty((len(k), len(radix)), dtype=np.uint8)
+    for i in range(len(radix) - 1, -1, -1):
+        k, out[:, i] = np.divmod(k, radix[i])
+    return out
+
+
+def export_csv(selection, fp, header=True):
+    """Streams every ticket as a CSV row (k, leg1, ..., legN). fp: path or file."""
+    legs = leg_names(selection)
+    radix = [len(l) for l in legs]
+    total = combo_count(legs)
+    own = isinstance(fp, str)
+    f = open(fp, 'w', newline='', encoding='utf-8') if own else fp
+    try:
+        w = csv.writer(f)
+        if header: w.writerow(['k'] + [f'ayak_{i+1}' for i in range(len(legs))])
+        for start in range(0, total, CHUNK_SIZE):
+            block = digit_block(radix, start, min(start + CHUNK_SIZE, total))
+            w.writerows([start + j] + [legs[i][d] for i, d in enumerate(row)] for j, row in enumerate(block.tolist()))
+    finally:
+        if own: f.close()
+    return total
+
+
+def export_binary(selection, path):
+    """
+    Compact binary export:
+      b'TKT1', uint8 legs, uint8 radix per leg,
+      per leg per horse: uint16 length + utf-8 name,
+      uint32 count, then count x legs uint8 positions (row-major, index order).
+    """
+    legs = leg_names(selection)
+    radix = [len(l) for l in legs]
+    if any(r > 255 for r in radix): raise ValueError("more than 255 horses in a leg")
+    total = combo_count(legs)
+    with open(path, 'wb') as f:
+        f.write(BIN_MAGIC)
+        f.write(struct.pack('<B', len(legs)))
+        f.write(bytes(radix))
+        for leg in legs:
+            for name in leg:
+                b = name.encode('utf-8')
+                f.write(struct.pack('<H', len(b)))
+                f.write(b)
+        f.write(struct.pack('<I', total))
+        for start in range(0, total, CHUNK_SIZE):
+            f.write(digit_block(radix, start, min(start + CHUNK_SIZE, total)).tobytes())
+    return total
+
+
+def read_binary(path):
+    """Generator over (k, names) from an export_binary file."""
+    with open(path, 'rb') as f:
+        if f.read(4) != BIN_MAGIC: raise ValueError(f"{path} is not a ticket file")
+        (n_legs,) = struct.unpack('<B', f.read(1))
+        radix = list(f.read(n_legs))
+        legs = []
+        for r in radix:
+            leg = []
+            for _ in range(r):
+                (n,) = struct.unpack('<H', f.read(2))
+                leg.append(f.read(n).decode('utf-8'))
+            legs.append(leg)
+        (total,) = struct.unpack('<I', f.read(4))
+        k = 0
+        while k < total:
+            n = min(CHUNK_SIZE, total - k)
+            block = np.frombuffer(f.read(n * n_legs), dtype=np.uint8).reshape(n, n_legs)
+            for row in block.tolist():
+                yield k, tuple(legs[i][d] for i, d in enumerate(row))
+                k += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expand a coupon into ticket lines")
+    parser.add_argument("--legs", required=True, help="Coupon legs JSON file")
+    parser.add_argument("--csv", help="Write all tickets as CSV ('-' = stdout)")
+    parser.add_argument("--bin", help="Write all tickets in compact binary form")
+    parser.add_argument("--k", type=int, help="Print ticket #k")
+    args = parser.parse_args()
+
+    with open(args.legs, encoding='utf-8') as f:
+        selection = json.load(f)
+
+    print(f"🎫 {combo_count(selection):,} kombinasyon ({' x '.join(map(str, radices(selection)))})", file=sys.stderr)
+    if args.k is not None:
+        print(f"#{args.k}: {' / '.join(unrank(selection, args.k))}")
+    if args.csv:
+        n = export_csv(selection, sys.stdout if args.csv == '-' else args.csv)
+        print(f"✅ {n:,} satır CSV: {args.csv}", file=sys.stderr)
+    if args.bin:
+        n = export_binary(selection, args.bin)
+        print(f"✅ {n:,} bilet binary: {args.bin}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Timing - Aşama Süreleri / Profil
+================================
+Lightweight span timer for the pipeline stages (scrape, galop_fetch, history,
+quantum, encoding, predict, optimize, render, sync ...). Spans nest, so a run
+reads as city -> predict -> history.
+
+  with span('history', city=city): ...
+  @timed('optimize')
+  def optimize(...): ...
+
+At the end of a run finish() writes a Chrome trace JSON (open in
+chrome://tracing, ui.perfetto.dev or speedscope) and prints the top stages by
+wall time. enable_profile(stage) attaches cProfile to every span of that
+stage and prints its hottest functions.
+
+The trace directory defaults to ./traces or $KAHIN_TRACE_DIR (set by
+daily_runner so the child scripts' traces land next to its own).
+
+Process-pool workers (--jobs N) return take_events() with each result and
+the parent calls merge_events() on them, so the per-city spans show up in
+the stage table and, one lane per worker pid, in the trace.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+TRACE_ENV = 'KAHIN_TRACE_DIR'
+DEFAULT_TRACE_DIR = 'traces'
+
+_T0 = time.perf_counter()
+_T0_WALL = time.time()  # epoch of _T0, to line up events from other processes
+_EVENTS = []
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_PROFILE = {'stage': None, 'profiler': None, 'top': 25}
+
+
+def _stack():
+    if not hasattr(_LOCAL, 'stack'): _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+@contextmanager
+def span(name, **args):
+    """Times the block as stage `name`; args end up in the trace event."""
+    stack = _stack()
+    frame = {'name': name, 'child': 0.0}
+    stack.append(frame)
+    prof = _PROFILE['profiler'] if _PROFILE['stage'] == name else None
+    if prof: prof.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        dur = time.perf_counter() - start
+        if prof: prof.disable()
+        stack.pop()
+        if stack: stack[-1]['child'] += dur
+        event = {
+            'name': name,
+            'path': '/'.join([f['name'] for f in stack] + [name]),
+            'start': start - _T0,
+            'dur': dur,
+            'self': dur - frame['child'],
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {k: str(v) for k, v in args.items()}
+        }
+        with _LOCK:
+            _EVENTS.append(event)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*a, **kw):
+            with span(name):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def enable_profile(stage, top=25):
+    _PROFILE.update({'stage': stage, 'profiler': cProfile.Profile() if stage else None, 'top': top})
+
+
+def events():
+    with _LOCK:
+        return list(_EVENTS)
+
+
+def _reset_after_fork():
+    """A forked worker starts with no events and no open spans of the parent."""
+    global _LOCK, _LOCAL
+    _LOCK = threading.Lock()
+    _LOCAL = threading.local()
+    _EVENTS.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def take_events():
+    """Removes and returns the events recorded so far, with epoch start times."""
+    with _LOCK:
+        evts = list(_EVENTS)
+        _EVENTS.clear()
+    return [dict(e, start=e['start'] + _T0_WALL) for e in evts]
+
+
+def merge_events(evts):
+    """Adds events from take_events() in another process, nested under the current span."""
+    prefix = '/'.join(f['name'] for f in _stack())
+    evts = [dict(e, start=e['start'] - _T0_WALL, path=f"{prefix}/{e['path']}" if prefix else e['path'])
+            for e in evts]
+    with _LOCK:
+        _EVENTS.extend(evts)
+
+
+def stage_table(evts=None):
+    """Per stage: calls, total / self wall time and max, sorted by total."""
+    rows = {}
+    for e in evts if evts is not None else events():
+        r = rows.setdefault(e['name'], {'stage': e['name'], 'calls': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0})
+        r['calls'] += 1
+        r['total'] += e['dur']
+        r['self'] += e['self']
+        r['max'] = max(r['max'], e['dur'])
+    return sorted(rows.values(), key=lambda r: -r['total'])
+
+
+def print_report(top=15):
+    table = stage_table()
+    if not table: return
+    wall = time.perf_counter() - _T0
+    print(f"\n⏱️  Top stages by wall time (run: {wall:.1f}s)")
+    print(f"   {'Stage':22} {'Calls':>6} {'Total s':>9} {'Self s':>9} {'Mean ms':>9} {'Max ms':>9} {'%':>6}")
+    for r in table[:top]:
+        print(f"   {r['stage'][:22]:22} {r['calls']:6d} {r['total']:9.2f} {r['self']:9.2f} "
+              f"{r['total']/r['calls']*1000:9.1f} {r['max']*1000:9.1f} {r['total']/wall*100:5.1f}%")
+
+    prof = _PROFILE['profiler']
+    if prof and prof.getstats():
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(_PROFILE['top'])
+        print(f"\n🔬 cProfile: stage '{_PROFILE['stage']}'")
+        print(out.getvalue())
+
+
+def write_trace(path):
+    """Chrome trace-event JSON (complete 'X' events, microseconds)."""
+    trace = [{'name': e['name'], 'cat': e['path'], 'ph': 'X', 'ts': round(e['start'] * 1e6, 1),
+              'dur': round(e['dur'] * 1e6, 1), 'pid': e['pid'], 'tid': e['tid'], 'args': e['args']}
+             for e in events()]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+    return path
+
+
+def finish(run_name, trace_dir=None, top=15):
+    """Writes the run's trace and prints the stage table + profile."""
+    if not events(): return None
+    trace_dir = trace_dir or os.environ.get(TRACE_ENV, DEFAULT_TRACE_DIR)
+    path = write_trace(os.path.join(trace_dir, f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+    print_report(top)
+    print(f"🧵 Trace: {path}")
+    return path
+
+
+def add_timing_args(parser):
+    parser.add_argument("--profile", metavar="STAGE", help="Attach cProfile to a stage (e.g. history, predict)")
+    parser.add_argument("--trace-dir", help=f"Trace JSON directory (default: ${TRACE_ENV} or {DEFAULT_TRACE_DIR}/)")
+    return parser
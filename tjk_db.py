@@ -0,0 +1,332 @@
+"""
+TJK DB - Profilli SQLite Bağlantısı
+===================================
+Connection factory used instead of raw sqlite3.connect(DB_NAME). Every
+statement (cursor.execute, conn.execute, pd.read_sql_query ...) is recorded
+with its normalized text, duration (execute + fetch), rows returned and the
+calling line:
+
+  conn = tjk_db.connect(DB_NAME)
+  df = pd.read_sql_query("SELECT ...", conn, params=(...))
+
+Queries slower than KAHIN_SLOW_QUERY_MS (default 200 ms) are appended to
+logs/slow_queries.log together with their EXPLAIN QUERY PLAN, and a
+"top queries by total time" table is printed at exit.
+
+Every connection is tuned (PRAGMAS) and writable ones switch the file to WAL,
+so scrapers / galop fetchers can write while predictions and backtests read:
+
+  conn = tjk_db.thread_connection()          # one shared connection per thread (not closed by callers)
+  conn = tjk_db.connect_readonly(DB_NAME)    # mode=ro
+  with tjk_db.snapshot() as conn:            # read-only, pinned to one consistent view
+      ...                                    # (WAL read transaction; writers keep going)
+
+Fetch loops buffer their writes in a BatchWriter and commit every
+COMMIT_EVERY items instead of per row / horse.
+
+  KAHIN_SQL_PROFILE=0        plain sqlite3 connections, no recording
+  KAHIN_SQL_REPORT=0         record but skip the exit report
+  KAHIN_SLOW_QUERY_LOG=path  slow-query log file
+  KAHIN_SQL_TUNE=0           default journal mode / pragmas
+"""
+
+import atexit
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_NAME = "tjk_races.db"
+
+PROFILE = os.environ.get('KAHIN_SQL_PROFILE', '1') != '0'
+REPORT = os.environ.get('KAHIN_SQL_REPORT', '1') != '0'
+SLOW_QUERY_MS = float(os.environ.get('KAHIN_SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG = os.environ.get('KAHIN_SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.log'))
+REPORT_TOP = 15
+
+TUNE = os.environ.get('KAHIN_SQL_TUNE', '1') != '0'
+BUSY_TIMEOUT = 30.0        # seconds a writer waits for the lock
+COMMIT_EVERY = 50          # items per transaction in fetch loops
+PRAGMAS = {
+    'synchronous': 'NORMAL',       # safe with WAL, one fsync per checkpoint instead of per commit
+    'cache_size': -65536,          # 64 MB page cache
+    'mmap_size': 268435456,        # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+_STATS = {}
+_LOCK = threading.Lock()
+_CURSORS = weakref.WeakSet()
+_THREAD = threading.local()
+_SKIP_FILES = (os.path.abspath(__file__), os.sep + 'pandas' + os.sep, os.sep + 'sqlite3' + os.sep)
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Literals -> ?, IN (?, ?, ...) -> IN (?...), single spaced."""
+    sql = _RE_STRING.sub('?', sql)
+    sql = _RE_NUMBER.sub('?', sql)
+    sql = _RE_IN_LIST.sub('(?...)', sql)
+    return _RE_SPACE.sub(' ', sql).strip()
+
+
+def _caller():
+    f = sys._getframe(2)
+    while f is not None:
+        path = f.f_code.co_filename
+        if not any(s in path for s in _SKIP_FILES) and path != __file__:
+            return f"{os.path.basename(path)}:{f.f_lineno} {f.f_code.co_name}"
+        f = f.f_back
+    return '?'
+
+
+def _record(conn, sql, params, elapsed, rows, caller):
+    key = normalize_sql(sql)
+    with _LOCK:
+        s = _STATS.get(key)
+        if s is None:
+            s = _STATS[key] = {'sql': key, 'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'callers': {}}
+        s['calls'] += 1
+        s['total'] += elapsed
+        s['max'] = max(s['max'], elapsed)
+        s['rows'] += rows
+        s['callers'][caller] = s['callers'].get(caller, 0) + 1
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow(conn, sql, params, elapsed, rows, caller)
+
+
+def _log_slow(conn, sql, params, elapsed, rows, caller):
+    try:
+        plan = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+        plan = '\n'.join(f"    {'  ' * (parent > 0)}{detail}" for _, parent, _, detail in plan)
+    except sqlite3.Error as e:
+        plan = f"    (no plan: {e})"
+    try:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or '.', exist_ok=True)
+        with open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+            f.write(f"{datetime.now().isoformat(timespec='seconds')} {elapsed*1000:.1f} ms, {rows} rows, {caller}\n"
+                    f"  {normalize_sql(sql)}\n{plan}\n")
+    except OSError:
+        pass
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Times execute + fetches; a statement is recorded once its cursor moves on."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._q = None
+        _CURSORS.add(self)
+
+    def _flush(self):
+        q, self._q = self._q, None
+        if q: _record(self.connection, *q)
+
+    def _begin(self, sql, params, fn):
+        self._flush()
+        caller = _caller()
+        t0 = time.perf_counter()
+        fn()
+        self._q = [sql, params, time.perf_counter() - t0, 0, caller]
+        return self
+
+    def _fetched(self, t0, n):
+        if self._q:
+            self._q[2] += time.perf_counter() - t0
+            self._q[3] += n
+
+    def execute(self, sql, params=()):
+        return self._begin(sql, params, lambda: super(ProfiledCursor, self).execute(sql, params))
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        self._begin(sql, None, lambda: super(ProfiledCursor, self).executemany(sql, seq))
+        self._q[3] = len(seq)
+        return self
+
+    def executescript(self, script):
+        return self._begin(script, None, lambda: super(ProfiledCursor, self).executescript(script))
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows))
+        self._flush()
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0)
+            self._flush()
+            raise
+        self._fetched(t0, 1)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        try: self._flush()
+        except Exception: pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors (and conn.execute shortcuts) are profiled."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def close(self):
+        flush()
+        super().close()
+
+
+def connect(path=None, **kwargs):
+    """Drop-in for sqlite3.connect (defaults to DB_NAME)."""
+    if PROFILE:
+        kwargs.setdefault('factory', ProfiledConnection)
+    kwargs.setdefault('timeout', BUSY_TIMEOUT)
+    conn = sqlite3.connect(path or DB_NAME, **kwargs)
+    if TUNE: tune(conn, readonly='mode=ro' in str(path))
+    return conn
+
+
+def tune(conn, readonly=False):
+    """WAL (writable connections; the mode is stored in the file) + PRAGMAS."""
+    try:
+        if not readonly:
+            sqlite3.Connection.execute(conn, "PRAGMA journal_mode=WAL")
+        for name, value in PRAGMAS.items():
+            sqlite3.Connection.execute(conn, f"PRAGMA {name}={value}")
+    except sqlite3.Error:
+        pass
+
+
+def connect_readonly(path=None, **kwargs):
+    return connect(f"file:{os.path.abspath(path or DB_NAME)}?mode=ro", uri=True, **kwargs)
+
+
+def thread_connection(path=None):
+    """Connection shared by every caller on this thread (one per thread and DB file)."""
+    conns = _THREAD.__dict__.setdefault('conns', {})
+    key = os.path.abspath(path or DB_NAME)
+    if key not in conns:
+        conns[key] = connect(path)
+    return conns[key]
+
+
+class BatchWriter:
+    """Buffers writes of a fetch loop and applies them in one short transaction every
+    `every` items, so slow network loops never hold the write lock between requests."""
+
+    def __init__(self, conn, every=COMMIT_EVERY):
+        self.conn, self.every = conn, every
+        self.ops, self.items = [], 0
+
+    def add(self, sql, params=()):
+        self.ops.append((sql, params))
+
+    def item_done(self):
+        self.items += 1
+        if self.items % self.every == 0: self.flush()
+
+    def flush(self):
+        """-> rows changed"""
+        changed = 0
+        for sql, params in self.ops:
+            try:
+                changed += max(self.conn.execute(sql, params).rowcount, 0)
+            except sqlite3.Error as e:
+                print(f"Database Error: {e}")
+        self.conn.commit()
+        self.ops = []
+        return changed
+
+
+@contextmanager
+def snapshot(path=None):
+    """Read-only connection that sees one consistent state of the DB for the whole block.
+    In WAL mode the open read transaction does not block writers; without WAL it would,
+    so the connection is then handed out without the pinned transaction."""
+    conn = connect_readonly(path)
+    try:
+        mode = sqlite3.Connection.execute(conn, "PRAGMA journal_mode").fetchone()[0]
+        if mode == 'wal':
+            sqlite3.Connection.execute(conn, "BEGIN")
+            sqlite3.Connection.execute(conn, "SELECT COUNT(*) FROM sqlite_master").fetchone()
+        yield conn
+    finally:
+        if conn.in_transaction: conn.rollback()
+        conn.close()
+
+
+def flush():
+    """Records statements still held by open cursors."""
+    for cur in list(_CURSORS):
+        try: cur._flush()
+        except sqlite3.Error: pass
+
+
+def query_stats():
+    """Per normalized statement: calls, total/max seconds, rows, callers; slowest total first."""
+    flush()
+    with _LOCK:
+        stats = [dict(s, callers=dict(s['callers'])) for s in _STATS.values()]
+    return sorted(stats, key=lambda s: -s['total'])
+
+
+def reset_stats():
+    with _LOCK:
+        _STATS.clear()
+
+
+def print_report(top=REPORT_TOP):
+    stats = query_stats()
+    if not stats: return
+    total = sum(s['total'] for s in stats)
+    print(f"\n🗄️  Top queries by total time ({sum(s['calls'] for s in stats):,} statements, {total:.2f}s)")
+    print(f"   {'Total s':>8} {'Calls':>7} {'Mean ms':>8} {'Max ms':>8} {'Rows':>9}  Query / caller")
+    for s in stats[:top]:
+        caller = max(s['callers'], key=s['callers'].get)
+        sql = s['sql'] if len(s['sql']) <= 110 else s['sql'][:107] + '...'
+        print(f"   {s['total']:8.2f} {s['calls']:7d} {s['total']/s['calls']*1000:8.2f} {s['max']*1000:8.1f} "
+              f"{s['rows']:9d}  {sql}")
+        print(f"   {'':44}↳ {caller}" + (f" (+{len(s['callers']) - 1} more)" if len(s['callers']) > 1 else ''))
+
+
+if PROFILE and REPORT:
+    atexit.register(print_report)
@@ -1,10 +1,14 @@
 
-import sqlite3
 import requests
 from bs4 import BeautifulSoup
 import time
 import random
 import re
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tjk_db
 
 DB_NAME = "tjk_races.db"
 
@@ -86,7 +90,7 @@ def fetch_gallop_history(horse_id):
     return gallops
 
 def process_queue():
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     
     # 1. Get Distinct Active Horses first (Priority: CURRENT BURSA RACE)
@@ -106,6 +110,7 @@ def process_queue():
     # For now, just simplistic fetch.
     
     count = 0
+    writer = tjk_db.BatchWriter(conn)
     for h_id, h_name in active_horses:
         count += 1
         print(f"[{count}/{len(active_horses)}] Fetching History for {h_name} ({h_id})...")
@@ -117,26 +122,22 @@ def process_queue():
             latest_str = f"{latest['date']} - {latest['distance']}m: {latest['raw_time']}"
             
             # Update program_entries (Legacy)
-            c.execute("UPDATE program_entries SET gallop_info = ? WHERE horse_id = ?", (latest_str, h_id))
+            writer.add("UPDATE program_entries SET gallop_info = ? WHERE horse_id = ?", (latest_str, h_id))
             
             # Insert into gallops table (History)
-            inserted = 0
             for g in gallops:
-                try:
-                    c.execute('''
-                        INSERT OR IGNORE INTO gallops (horse_id, date, city, distance, duration, track_type)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (g['horse_id'], g['date'], g['city'], g['distance'], g['duration'], g['track_type']))
-                    if c.rowcount > 0: inserted += 1
-                except:
-                    pass
-            print(f"  -> Saved {inserted} new gallops.")
+                writer.add('''
+                    INSERT OR IGNORE INTO gallops (horse_id, date, city, distance, duration, track_type)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (g['horse_id'], g['date'], g['city'], g['distance'], g['duration'], g['track_type']))
+            print(f"  -> Queued {len(gallops)} gallops.")
         else:
             print("  -> No gallops found.")
             
-        conn.commit()
+        writer.item_done()
         time.sleep(0.3) # Fast but polite
         
+    writer.flush()
     conn.close()
     print("Batch processing complete.")
 
@@ -4,12 +4,16 @@ Filters out international races and uses concurrent requests
 """
 import requests
 from bs4 import BeautifulSoup
-import sqlite3
 from datetime import datetime, timedelta
 import concurrent.futures
 import time
 import argparse
 import re
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tjk_db
 
 DB_NAME = "tjk_races.db"
 
@@ -176,7 +180,7 @@ def scrape_day(date_str, conn):
 def fast_scrape(start_date_str, days):
     """Fast scrape with minimal delays"""
     start = datetime.strptime(start_date_str, "%d/%m/%Y")
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     print(f"FAST Turkey-Only Scrape: {days} days from {start_date_str}")
     
@@ -3,14 +3,17 @@ from bs4 import BeautifulSoup
 import pandas as pd
 import time
 import os
-import sqlite3
 from datetime import datetime, timedelta
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tjk_db
 
 # Setup database
 DB_NAME = "tjk_races.db"
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     # Create tables
     c.execute('''
@@ -92,7 +95,7 @@ def parse_race_results(html_content, date_str, city_name):
     # Based on the structure: <div class="races-panes"> -> <div id="12345" sehir="Bursa">
     race_containers = soup.select('div.races-panes > div[sehir]')
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     
     print(f"Found {len(race_containers)} races for {city_name} on {date_str}")
@@ -144,12 +147,23 @@ def parse_race_results(html_content, date_str, city_name):
             if cond_span:
                 track_condition = clean_text(cond_span.get_text())
             
+            # Re-scrapes (intraday results polling) must not duplicate races that already have results
+            existing = c.execute('''
+                SELECT r.id, (SELECT COUNT(*) FROM results res WHERE res.race_id = r.id)
+                FROM races r WHERE r.date = ? AND r.city = ? AND r.race_no = ?
+            ''', (date_str, city_name, race_no)).fetchone()
+            if existing and existing[1]:
+                continue
+
             # Save Race (with track_condition)
-            c.execute('''
-                INSERT INTO races (date, city, race_no, distance, track_type, prize, track_condition)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (date_str, city_name, race_no, distance, track_type, prize, track_condition))
-            race_id = c.lastrowid
+            if existing:
+                race_id = existing[0]
+            else:
+                c.execute('''
+                    INSERT INTO races (date, city, race_no, distance, track_type, prize, track_condition)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (date_str, city_name, race_no, distance, track_type, prize, track_condition))
+                race_id = c.lastrowid
             
             # --- Extract Results ---
             table = race_div.select_one('table.tablesorter tbody')
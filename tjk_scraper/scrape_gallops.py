@@ -1,10 +1,14 @@
 
 import requests
 from bs4 import BeautifulSoup
-import sqlite3
 import time
 import random
 import re
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tjk_db
 
 DB_NAME = "tjk_races.db"
 
@@ -84,7 +88,7 @@ def fetch_gallops_for_horse(horse_id, existing_dates=None):
     return gallops
 
 def main():
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     
     # 1. Get Horses to Scrape
@@ -96,6 +100,7 @@ def main():
     
     count = 0
     total = len(horses)
+    writer = tjk_db.BatchWriter(conn)
     
     for h_id, h_name in horses:
         count += 1
@@ -116,19 +121,17 @@ def main():
         if new_gallops:
             print(f"   ✅ Found {len(new_gallops)} new records.")
             for g in new_gallops:
-                try:
-                    c.execute('''
-                        INSERT OR IGNORE INTO gallops (horse_id, horse_name, date, city, track_type, distance, time_sec, rank, description)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (h_id, h_name, g['date'], g['city'], g['track'], g['dist'], g['time'], g['rank'], g['desc']))
-                except Exception as e:
-                    print(f"Database Error: {e}")
-            conn.commit()
+                writer.add('''
+                    INSERT OR IGNORE INTO gallops (horse_id, horse_name, date, city, track_type, distance, time_sec, rank, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (h_id, h_name, g['date'], g['city'], g['track'], g['dist'], g['time'], g['rank'], g['desc']))
         else:
             print("   ⚠️ No new data.")
+        writer.item_done()
             
         time.sleep(random.uniform(0.1, 0.3)) # Be gentle
         
+    writer.flush()
     conn.close()
     print("🎉 Gallop Scraping Complete.")
 
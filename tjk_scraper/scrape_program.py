@@ -1,14 +1,18 @@
 import requests
 from bs4 import BeautifulSoup
-import sqlite3
 import re
 import argparse
 from datetime import datetime, timedelta
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tjk_db
 
 DB_NAME = "tjk_races.db"
 
 def init_program_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     # Create tables for upcoming programs
     c.execute('''
@@ -90,7 +94,7 @@ def parse_program_details(html_content, date_str, city_name):
     soup = BeautifulSoup(html_content, 'html.parser')
     race_containers = soup.select('div.races-panes > div[sehir]')
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     c = conn.cursor()
     
     print(f"Stats: Found {len(race_containers)} races in {city_name}.")
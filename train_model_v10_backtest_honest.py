@@ -1,5 +1,4 @@
 
-import sqlite3
 import pandas as pd
 import numpy as np
 import joblib
@@ -21,6 +20,7 @@ import os
 # Duplicating logic is safer to modify filtering without breaking original file.
 
 sys.path.append(os.getcwd())
+import tjk_db
 # We will just replicate the logic from train_model_v10_kahin but add date filtering.
 
 DB_NAME = "tjk_races.db"
@@ -54,11 +54,11 @@ def moon_phase(date_str):
     lunar = (day + month * 2) % 30
     return (math.sin(lunar * math.pi / 15) + 1) / 2
 
-def build_extended_features(days_back=5):
+def build_extended_features(days_back=5, cutoff_date=None):
     print("🔮 REAL BACKTEST: Preparing Data (Honest Mode)")
     print("=" * 70)
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     results_df = pd.read_sql_query("""
         SELECT 
             res.id, res.horse_name, res.jockey, res.owner, res.trainer,
@@ -71,10 +71,12 @@ def build_extended_features(days_back=5):
     
     # Parse dates
     results_df['race_date_dt'] = pd.to_datetime(results_df['date'], dayfirst=True, errors='coerce')
+    # DD/MM/YYYY text does not sort chronologically; rolling stats below need true time order
+    results_df = results_df.sort_values(['race_date_dt', 'id'], kind='stable').reset_index(drop=True)
     
-    # Determine Cutoff
-    today = datetime.now()
-    cutoff_date = today - timedelta(days=days_back)
+    # Determine Cutoff (cutoff_date=None -> today - days_back)
+    if cutoff_date is None:
+        cutoff_date = datetime.now() - timedelta(days=days_back)
     print(f"📅 Cutoff Date: {cutoff_date.strftime('%Y-%m-%d')} (Excluding data after this)")
     
     # SPLIT: Training Data vs Test Data
@@ -93,10 +95,18 @@ def build_extended_features(days_back=5):
     # ... (Feature Engineering: Same as original) ...
     # Simplified copy-paste of logic for speed
     
+    # Results are stored in finishing order, so stats must only see a race
+    # once it is complete: rows of the same race read the state as it was
+    # before the race, and its outcomes are applied when the next race starts.
+    race_key = list(zip(results_df['date'], results_df['city'], results_df['race_no']))
+    
     print("\n📈 Calculating 'Son 5 Yarış Trendi'...")
     results_df['last_5_avg'] = 0.0; results_df['improvement_trend'] = 0.0
-    horse_history = {}
+    horse_history = {}; pending = []; prev_key = None
     for idx, row in results_df.iterrows():
+        if race_key[idx] != prev_key:
+            for horse, rank in pending: horse_history.setdefault(horse, []).append(rank)
+            pending = []; prev_key = race_key[idx]
         horse = row['horse_name']
         rank = row['rank'] if row['rank'] and row['rank'] > 0 else 10
         if horse in horse_history and len(horse_history[horse]) >= 2:
@@ -105,42 +115,47 @@ def build_extended_features(days_back=5):
             results_df.at[idx, 'last_5_avg'] = avg
             if len(last_5) >= 5:
                 results_df.at[idx, 'improvement_trend'] = (np.mean(last_5[:3]) - np.mean(last_5[-2:])) / 10
-        if horse not in horse_history: horse_history[horse] = []
-        horse_history[horse].append(rank)
+        pending.append((horse, rank))
     results_df['momentum_5'] = (10 - results_df['last_5_avg'].clip(upper=10)) / 10
     
     # Owner Stats
-    owner_stats = {}; results_df['owner_win_rate'] = 0.0
+    owner_stats = {}; results_df['owner_win_rate'] = 0.0; pending = []; prev_key = None
     for idx, row in results_df.iterrows():
+        if race_key[idx] != prev_key:
+            for owner, is_win in pending:
+                w, t = owner_stats.get(owner, (0, 0)); owner_stats[owner] = (w+is_win, t+1)
+            pending = []; prev_key = race_key[idx]
         owner = row['owner']; is_win = 1 if row['rank'] == 1 else 0
         if owner in owner_stats: w, t = owner_stats[owner]; results_df.at[idx, 'owner_win_rate'] = w/t
-        else: owner_stats[owner] = (0, 0)
-        owner_stats[owner] = (owner_stats[owner][0]+is_win, owner_stats[owner][1]+1)
+        pending.append((owner, is_win))
 
     # Trainer Stats
-    trn_stats = {}; results_df['trainer_win_rate_ext'] = 0.0; results_df['trainer_recent_form'] = 0.0
+    trn_stats = {}; results_df['trainer_win_rate_ext'] = 0.0; results_df['trainer_recent_form'] = 0.0; pending = []; prev_key = None
     for idx, row in results_df.iterrows():
+        if race_key[idx] != prev_key:
+            for trn, is_win in pending:
+                w, t, r = trn_stats.get(trn, (0, 0, [])); trn_stats[trn] = (w+is_win, t+1, r+[is_win])
+            pending = []; prev_key = race_key[idx]
         trn = row['trainer']; is_win = 1 if row['rank'] == 1 else 0
         if trn in trn_stats:
             w, t, r = trn_stats[trn]; results_df.at[idx, 'trainer_win_rate_ext'] = w/t
             results_df.at[idx, 'trainer_recent_form'] = np.mean(r[-10:]) if r else 0
-        else: trn_stats[trn] = (0, 0, [])
-        trn_stats[trn] = (trn_stats[trn][0]+is_win, trn_stats[trn][1]+1, trn_stats[trn][2]+[is_win])
+        pending.append((trn, is_win))
         
     # Combo & Track
-    com_hist = {}; trk_hist = {}; results_df['combo_win_rate'] = 0.0; results_df['track_win_rate'] = 0.0
+    com_hist = {}; trk_hist = {}; results_df['combo_win_rate'] = 0.0; results_df['track_win_rate'] = 0.0; pending = []; prev_key = None
     for idx, row in results_df.iterrows():
+        if race_key[idx] != prev_key:
+            for ck, h, trk, win in pending:
+                w, t = com_hist.get(ck, (0, 0)); com_hist[ck] = (w+win, t+1)
+                w, t = trk_hist.setdefault(h, {}).get(trk, (0, 0)); trk_hist[h][trk] = (w+win, t+1)
+            pending = []; prev_key = race_key[idx]
         h = row['horse_name']; j = row['jockey']; trk = row['track_type'] if row['track_type'] else 'Unknown'
         win = 1 if row['rank'] == 1 else 0
         ck = f"{h}|||{j}"
         if ck in com_hist: results_df.at[idx, 'combo_win_rate'] = com_hist[ck][0]/com_hist[ck][1]
-        else: com_hist[ck] = (0, 0)
-        com_hist[ck] = (com_hist[ck][0]+win, com_hist[ck][1]+1)
-        
-        if h not in trk_hist: trk_hist[h] = {}
-        if trk in trk_hist[h]: results_df.at[idx, 'track_win_rate'] = trk_hist[h][trk][0]/trk_hist[h][trk][1]
-        else: trk_hist[h][trk] = (0, 0)
-        trk_hist[h][trk] = (trk_hist[h][trk][0]+win, trk_hist[h][trk][1]+1)
+        if h in trk_hist and trk in trk_hist[h]: results_df.at[idx, 'track_win_rate'] = trk_hist[h][trk][0]/trk_hist[h][trk][1]
+        pending.append((ck, h, trk, win))
 
     # Quantum
     results_df['quantum_golden'] = results_df['momentum_5'].apply(golden_ratio_score)
@@ -170,8 +185,6 @@ def build_extended_features(days_back=5):
         if not gallops_df.empty:
             gallops_df['gal_date'] = pd.to_datetime(gallops_df['date'], dayfirst=True, errors='coerce')
             gallops_df = gallops_df.dropna(subset=['gal_date']).sort_values('gal_date')
-            results_df = results_df.sort_values('race_date_dt')
-            
             merged = pd.merge_asof(
                 results_df, gallops_df,
                 left_on='race_date_dt', right_on='gal_date',
@@ -179,8 +192,9 @@ def build_extended_features(days_back=5):
             )
             merged['days_since_galop'] = (merged['race_date_dt'] - merged['gal_date']).dt.days
             merged['galop_speed'] = merged['distance_y'] / merged['time_sec']
-            results_df['days_since_galop'] = merged['days_since_galop'].fillna(999)
-            results_df['galop_speed'] = merged['galop_speed'].fillna(0)
+            # merge_asof keeps the (date sorted) left order; assign positionally
+            results_df['days_since_galop'] = merged['days_since_galop'].fillna(999).values
+            results_df['galop_speed'] = merged['galop_speed'].fillna(0).values
         else:
             results_df['days_since_galop'] = 999; results_df['galop_speed'] = 0
     except:
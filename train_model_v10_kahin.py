@@ -1,5 +1,5 @@
 
-import sqlite3
+import tjk_db
 import pandas as pd
 import numpy as np
 import joblib
@@ -92,7 +92,7 @@ def build_extended_features():
     print("🔮 MODEL v10: QUANTUM + EXTENDED DATA")
     print("=" * 70)
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = tjk_db.connect(DB_NAME)
     
     results_df = pd.read_sql_query("""
         SELECT 
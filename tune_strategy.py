@@ -1,30 +1,31 @@
 
 import pandas as pd
 import numpy as np
-import sqlite3
+import tjk_db
 import joblib
 from datetime import datetime
-from production_engine import compute_galop_features, get_historical_stats_v10
+from production_engine import compute_galop_features, add_v10_features, V10_FEATURES
+from feature_cache import cached_frame, cache_stats
+from hit_check import check_coupons
 
 DB_NAME = "tjk_races.db"
+MODEL_PREFIX = 'model_honest'
 
 # Load Models (Fast Load)
 try:
-    lgbm = joblib.load('model_honest_lgbm.pkl')
-    cat = joblib.load('model_honest_cat.pkl')
-    xgb_model = joblib.load('model_honest_xgb.pkl')
+    lgbm = joblib.load(f'{MODEL_PREFIX}_lgbm.pkl')
+    cat = joblib.load(f'{MODEL_PREFIX}_cat.pkl')
+    xgb_model = joblib.load(f'{MODEL_PREFIX}_xgb.pkl')
     le_track = joblib.load('le_track_honest.pkl')
     le_city = joblib.load('le_city_honest.pkl')
 except:
     print("Models missing.")
     exit()
 
-def get_data_for_date(date_str, city):
-    conn = sqlite3.connect(DB_NAME)
-    
-    # Check Program
-    pr_df = pd.read_sql_query(f"SELECT id, race_no FROM program_races WHERE date='{date_str}' AND city='{city}'", conn)
-    if pr_df.empty: return None, None
+def build_program_features(conn, date_str, city):
+    """Full v10 features (real quantum + galop) and base ensemble score for one program."""
+    pr_df = pd.read_sql_query("SELECT id, race_no FROM program_races WHERE date=? AND city=?", conn, params=(date_str, city))
+    if pr_df.empty: return None
     
     race_ids = tuple(pr_df['id'].tolist())
     ph = ','.join(['?']*len(race_ids))
@@ -38,68 +39,40 @@ def get_data_for_date(date_str, city):
     """, conn, params=race_ids)
     
     df = df.drop_duplicates(subset=['race_no', 'horse_name'])
+    df = df[~df['horse_name'].str.contains('UNKNOWN', case=False)]
+    if df.empty: return None
     
-    # Get Results (Target)
-    res_df = pd.read_sql_query(f"""
-        SELECT r.race_no, res.horse_name as winner, res.ganyan 
-        FROM results res JOIN races r ON res.race_id = r.id 
-        WHERE r.date='{date_str}' AND r.city='{city}' AND res.rank=1
-    """, conn)
-    
-    # Features
-    g_df = pd.read_sql_query("SELECT * FROM gallops", conn)
+    # Galops for these horses only
+    names = df['horse_name'].unique().tolist()
+    g_df = pd.read_sql_query(f"SELECT * FROM gallops WHERE horse_name IN ({','.join(['?']*len(names))})", conn, params=names)
     df = compute_galop_features(df, g_df, date_str)
     
-    # Encode
-    def safe_enc(le, val):
-        try: return le.transform([str(val)])[0]
-        except: return 0
-    df['track_encoded'] = df['track_type'].apply(lambda x: safe_enc(le_track, x))
-    df['city_encoded'] = df['city'].apply(lambda x: safe_enc(le_city, x))
-    
-    # History (Optimize loop for speed - or mock?)
-    # We must run it to get strict time-travel stats
-    # To speed up tuning, we might Cache this?
-    # For now, simplistic loop
-    m5_v, imp_v, com_v, trk_v, own_v, trn_v = [], [], [], [], [], []
-    for _, row in df.iterrows():
-         m5, imp, com, trk, own, trn = get_historical_stats_v10(
-            row['horse_name'], row['jockey'], row['track_type'], 
-            row.get('trainer'), row.get('owner'), date_str, conn=conn
-        )
-         m5_v.append(m5); imp_v.append(imp); com_v.append(com)
-         trk_v.append(trk); own_v.append(own); trn_v.append(trn)
-    
-    df['momentum_5'] = m5_v
-    df['improvement_trend'] = imp_v
-    df['combo_win_rate'] = com_v
-    df['track_win_rate'] = trk_v
-    df['owner_win_rate'] = own_v
-    df['trainer_recent_form'] = trn_v
-    df['trainer_win_rate_ext'] = 0.1
-    
-    # Quantum (Simplified for speed)
-    df['quantum_chaos'] = 0.5 # Default
-    # Just minimal quantum
-    
-    # Prediction
-    features = ['distance', 'weight', 'track_encoded', 'city_encoded', 'hp',
-            'momentum_5', 'improvement_trend', 'owner_win_rate', 'trainer_win_rate_ext', 'trainer_recent_form',
-            'combo_win_rate', 'track_win_rate']
-            
-    # Mock Quantum Features for shape compatibility
-    for c in ['quantum_golden', 'quantum_fibonacci', 'quantum_prime', 'quantum_cosmic', 'quantum_chaos', 'quantum_numerology', 'quantum_moon', 'quantum_field', 'days_since_galop', 'galop_speed']:
-        if c not in df.columns: df[c] = 0.5
-        
-    final_features = features + ['quantum_golden', 'quantum_fibonacci', 'quantum_prime', 'quantum_cosmic', 'quantum_chaos', 'quantum_numerology', 'quantum_moon', 'quantum_field', 'days_since_galop', 'galop_speed']
+    # History (strict time-travel) + quantum, same as production
+    df = add_v10_features(df, date_str, le_track, le_city, conn=conn)
+    for f in V10_FEATURES:
+        if f not in df.columns: df[f] = 0
+        df[f] = pd.to_numeric(df[f], errors='coerce').fillna(0)
     
-    df = df[~df['horse_name'].str.contains('UNKNOWN', case=False)]
+    X = df[V10_FEATURES].astype(float)
+    df['base_prob'] = (lgbm.predict_proba(X)[:,1] + cat.predict_proba(X)[:,1] + xgb_model.predict_proba(X)[:,1]) / 3
+    return df
+
+def get_data_for_date(date_str, city):
+    conn = tjk_db.connect(DB_NAME)
     
-    X = df[final_features].astype(float)
-    p = (lgbm.predict_proba(X)[:,1] + cat.predict_proba(X)[:,1] + xgb_model.predict_proba(X)[:,1]) / 3
-    df['base_score'] = p
+    # Features come from .cache/features; only rebuilt when the day's data or the models change
+    df = cached_frame(conn, date_str, city, MODEL_PREFIX, build_program_features, source='program')
     
+    # Get Results (Target)
+    res_df = pd.read_sql_query("""
+        SELECT r.race_no, res.horse_name as winner, res.ganyan 
+        FROM results res JOIN races r ON res.race_id = r.id 
+        WHERE r.date=? AND r.city=? AND res.rank=1
+    """, conn, params=(date_str, city))
     conn.close()
+    
+    if df is None or df.empty: return None, None
+    df['base_score'] = df['base_prob']
     return df, res_df
 
 
@@ -188,6 +161,18 @@ def optimize_strategy(legs_data, params):
             
     return selection, calc_cost(selection)
 
+def apply_boosts(df, p):
+    """Production score (push_forecasts_v10.forecast_city) with the grid's boost sizes."""
+    score = (df['base_score'] + (df['galop_score'] - 0.5) * 0.2).clip(0, 1)
+    # Same order as production: the jockey mask sees the chaos / galop boosted score
+    mask_chaos = (score < 0.25) & (df['quantum_chaos'] > 0.70)
+    score = score + mask_chaos * df['quantum_chaos'] * p['chaos_add']
+    mask_galop = (df['momentum_5'] < 0.55) & (df['galop_score'] > 0.70)
+    score = score + mask_galop * p['galop_add']
+    mask_joc = (df['combo_win_rate'] > 0.20) & (score < 0.25)
+    score = score + mask_joc * p['joc_add']
+    return score.clip(0, 0.98)
+
 # MAIN TUNING LOOP
 dates = [f"{d:02d}/01/2026" for d in range(10, 20)]
 cities_tr = ['Adana', 'İstanbul', 'İzmir', 'Bursa', 'Şanlıurfa', 'Antalya', 'Kocaeli'] # Map roughly
@@ -196,7 +181,7 @@ cities_tr = ['Adana', 'İstanbul', 'İzmir', 'Bursa', 'Şanlıurfa', 'Antalya',
 cache = {}
 print("⏳ Pre-fetching Trace Data (Jan 10-19)...")
 
-conn = sqlite3.connect(DB_NAME)
+conn = tjk_db.connect(DB_NAME)
 # Get all valid (date, city) pairs
 all_pairs = []
 for d in dates:
@@ -221,7 +206,7 @@ for d, c in all_pairs:
                 'date': d, 'city': c, 'df': df, 'res': res, 'legs': race_nos
             })
             
-print(f"✅ Loaded {len(data_store)} race programs.")
+print(f"✅ Loaded {len(data_store)} race programs. Cache: {cache_stats()}")
 
 # 2. Grid Search
 # Params to tune:
@@ -230,42 +215,31 @@ print(f"✅ Loaded {len(data_store)} race programs.")
 # - Min Horses Hard
 
 param_grid = [
-    # { 'chaos_add': 0.2, 'galop_add': 0.2, 'hard_thresh': 0.30, 'min_hard': 4 },
-    { 'chaos_add': 0.45, 'galop_add': 0.35, 'hard_thresh': 0.35, 'min_hard': 5 }, # Current Aggressive
-    { 'chaos_add': 0.50, 'galop_add': 0.40, 'hard_thresh': 0.40, 'min_hard': 6 }, # Super Aggressive
-    { 'chaos_add': 0.0, 'galop_add': 0.0, 'hard_thresh': 0.0, 'min_hard': 1 }, # Raw Model Check
+    # { 'chaos_add': 0.2, 'galop_add': 0.2, 'joc_add': 0.25, 'hard_thresh': 0.30, 'min_hard': 4 },
+    { 'chaos_add': 0.45, 'galop_add': 0.35, 'joc_add': 0.25, 'hard_thresh': 0.35, 'min_hard': 5 }, # Current Aggressive
+    { 'chaos_add': 0.50, 'galop_add': 0.40, 'joc_add': 0.25, 'hard_thresh': 0.40, 'min_hard': 6 }, # Super Aggressive
+    { 'chaos_add': 0.0, 'galop_add': 0.0, 'joc_add': 0.0, 'hard_thresh': 0.0, 'min_hard': 1 }, # Raw Model Check
 ]
 
 print("\n🚀 Starting Tune...")
 
 for p in param_grid:
-    wins = 0
-    total = 0
+    selections = []
+    winners = []
     
     for item in data_store:
         df = item['df'].copy()
         res = item['res']
         legs = item['legs']
         
-        # Apply Logic (Boosts)
-        # Note: We need quantum/galop cols. In pre-fetch I set randoms.
-        # Ideally we need REAL quantum values.
-        # Retrospective: The cached DF should have features.
-        # "production_engine" logic re-impl for speed:
-        
-        # Apply Boosts logic locally
-        # 1. Chaos (use placeholder 0.5? No, that breaks it. We need real quantum features)
-        # Assuming DataStore has them initialized to 0.5.
-        # This tuning is limited if features are flat. 
-        # BUT: Galop is real.
-        
-        # Let's trust base_score + galop for now.
+        # Apply Logic (Boosts) on the cached base score
+        df['score'] = apply_boosts(df, p)
         
         # Sort and Prep Legs
         legs_data = []
         for r in legs:
-             entries = df[df['race_no'] == r].sort_values('base_score', ascending=False)
-             legs_data.append([(x['horse_name'], x['base_score']) for _, x in entries.iterrows()])
+             entries = df[df['race_no'] == r].sort_values('score', ascending=False)
+             legs_data.append([(x['horse_name'], x['score']) for _, x in entries.iterrows()])
              
         # Optimize
         sel, cost = optimize_strategy(legs_data, {
@@ -275,22 +249,13 @@ for p in param_grid:
             'hard_threshold': p['hard_thresh'],
             'max_horses': 12
         })
+        selections.append(sel)
+        race_winners = dict(zip(res['race_no'], res['winner']))
+        winners.append([race_winners.get(r) for r in legs])
         
-        # Check Win
-        caught_legs = 0
-        for i, s in enumerate(sel):
-            r = legs[i]
-            w = res[res['race_no'] == r]
-            if not w.empty:
-                winner = w.iloc[0]['winner']
-                # Check coverage
-                names = [x[0] for x in s]
-                # Fuzzy
-                if any(winner in n or n in winner for n in names):
-                    caught_legs += 1
-                    
-        if caught_legs == 6:
-            wins += 1
-        total += 1
+    # Check Win (all programs at once)
+    hits = check_coupons(selections, winners)
+    wins = int(sum(hits['hit']))
+    total = len(selections)
         
     print(f"Params: {p} => Wins: {wins}/{total}")
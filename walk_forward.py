@@ -0,0 +1,229 @@
+"""
+Walk-Forward - Zaman İçinde Yeniden Eğitim + Değerlendirme
+==========================================================
+Steps a cutoff through time: trains the ensemble (LightGBM + CatBoost +
+XGBoost) only on races before each cutoff and scores the following window.
+
+  - The feature dataset (rolling, past-only stats from
+    train_model_v10_backtest_honest) is built once and cached in
+    .cache/walk_forward/; it is rebuilt only when the results table changes.
+  - After the first step the boosters are warm-started (init_model /
+    xgb_model) and only add --warm-frac of the full tree count, so a step
+    costs a fraction of a full retrain. Warm steps keep growing the
+    ensemble, so a full retrain runs every --full-every K steps (default 5)
+    and whenever the added trees would exceed MAX_WARM_GROWTH x the full
+    size, whatever K is.
+
+Per step: AUC, top-1 / top-3 accuracy and altılı coupon hit rate.
+
+Usage:
+    python walk_forward.py --start 2026-01-01 --end 2026-03-01 --step-days 7
+    python walk_forward.py --start 2026-01-01 --step-days 14 --full-every 4 --csv wf.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+import xgboost as xgb
+from catboost import CatBoostClassifier
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.getcwd())
+import tjk_db
+from production_engine import V10_FEATURES
+from feature_cache import save_frame, load_frame
+from pools import make_pool, build_pool_legs, optimize_pool, check_pool_hit
+
+DB_NAME = "tjk_races.db"
+DATASET_PATH = os.path.join('.cache', 'walk_forward', 'dataset.npz')
+DATASET_COLS = ['date', 'city', 'race_no', 'horse_name', 'rank', 'is_winner'] + V10_FEATURES
+COUPON_BUDGET = 700.0
+DATASET_VERSION = 1  # bump when build_extended_features changes
+
+# Full-retrain sizes (same as train_model_v10_backtest_honest)
+LGBM_TREES = 300
+CAT_ITERS = 700
+XGB_TREES = 300
+DEFAULT_FULL_EVERY = 5
+MAX_WARM_GROWTH = 1.0  # trees added since the last full fit, as a fraction of a full fit
+
+
+def results_fingerprint():
+    conn = tjk_db.connect(DB_NAME)
+    n, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM results").fetchone()
+    conn.close()
+    return f"{n}:{max_id}"
+
+
+def load_dataset(refresh=False):
+    """Full-history feature frame, cached until new results arrive."""
+    fp = results_fingerprint()
+    if not refresh and os.path.exists(DATASET_PATH):
+        df, meta = load_frame(DATASET_PATH)
+        if meta.get('fingerprint') == fp and meta.get('version') == DATASET_VERSION:
+            print(f"💾 Dataset from cache: {len(df)} rows")
+            df['race_date_dt'] = pd.to_datetime(df['date'], format='%d/%m/%Y', errors='coerce')
+            return df
+
+    from train_model_v10_backtest_honest import build_extended_features
+    df, _, _ = build_extended_features(cutoff_date=datetime.max)
+    for col in DATASET_COLS:
+        if col not in df.columns: df[col] = 0
+    df = df[DATASET_COLS].copy()
+    for col in V10_FEATURES + ['rank', 'race_no', 'is_winner']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    save_frame(DATASET_PATH, df.reset_index(drop=True), {'fingerprint': fp, 'version': DATASET_VERSION})
+    df['race_date_dt'] = pd.to_datetime(df['date'], format='%d/%m/%Y', errors='coerce')
+    return df
+
+
+def fit_ensemble(X, y, prev=None, warm_frac=0.2):
+    """Full fit, or warm-start from prev adding warm_frac of the trees."""
+    frac = 1.0 if prev is None else warm_frac
+    n_lgbm = max(int(LGBM_TREES * frac), 1)
+    n_cat = max(int(CAT_ITERS * frac), 1)
+    n_xgb = max(int(XGB_TREES * frac), 1)
+
+    lgbm = lgb.LGBMClassifier(n_estimators=n_lgbm, learning_rate=0.03, num_leaves=47, random_state=42, verbose=-1)
+    cat = CatBoostClassifier(iterations=n_cat, learning_rate=0.03, depth=7, verbose=False, random_state=42, allow_writing_files=False)
+    xgb_model = xgb.XGBClassifier(n_estimators=n_xgb, learning_rate=0.03, max_depth=7, eval_metric='logloss', random_state=42)
+
+    if prev is None:
+        lgbm.fit(X, y)
+        cat.fit(X, y)
+        xgb_model.fit(X, y)
+    else:
+        lgbm.fit(X, y, init_model=prev['lgbm'].booster_)
+        cat.fit(X, y, init_model=prev['cat'])
+        xgb_model.fit(X, y, xgb_model=prev['xgb'].get_booster())
+    return {'lgbm': lgbm, 'cat': cat, 'xgb': xgb_model}
+
+
+def predict_ensemble(models, X):
+    return (models['lgbm'].predict_proba(X)[:, 1] + models['cat'].predict_proba(X)[:, 1] +
+            models['xgb'].predict_proba(X)[:, 1]) / 3.0
+
+
+def score_window(test):
+    """AUC, top-1 / top-3 per race and altılı hit rate for one window."""
+    y = test['is_winner'].to_numpy()
+    auc = roc_auc_score(y, test['prob']) if 0 < y.sum() < len(y) else float('nan')
+
+    races = top1 = top3 = 0
+    for _, g in test.groupby(['date', 'city', 'race_no']):
+        if g['is_winner'].sum() == 0 or len(g) < 3: continue
+        ranked = g.sort_values('prob', ascending=False)['is_winner'].to_numpy()
+        races += 1
+        top1 += int(ranked[0] == 1)
+        top3 += int(ranked[:3].sum() > 0)
+
+    coupons = hits = caught_sum = 0
+    for _, cdf in test.groupby(['date', 'city']):
+        race_nos = sorted(int(r) for r in cdf['race_no'].unique())
+        if len(race_nos) < 6: continue
+        pool = make_pool('ALTILI', race_nos[-6:])
+        legs_data = build_pool_legs(cdf, pool, score_col='prob')
+        selection, _ = optimize_pool(pool, legs_data, COUPON_BUDGET)
+        winners = {int(r): w for r, w in cdf[cdf['rank'] == 1][['race_no', 'horse_name']].itertuples(index=False)}
+        caught, _, is_hit = check_pool_hit(pool, selection, winners)
+        coupons += 1
+        hits += int(is_hit)
+        caught_sum += caught
+
+    return {
+        'auc': auc,
+        'races': races,
+        'top1': top1 / races if races else 0.0,
+        'top3': top3 / races if races else 0.0,
+        'coupons': coupons,
+        'coupon_hit': hits / coupons if coupons else 0.0,
+        'avg_caught': caught_sum / coupons if coupons else 0.0
+    }
+
+
+def walk_forward(df, start, end, step_days=7, warm_frac=0.2, full_every=DEFAULT_FULL_EVERY):
+    rows = []
+    models = None
+    grown = 0.0
+    cutoff = start
+    step = 0
+    while cutoff < end:
+        window_end = min(cutoff + timedelta(days=step_days), end)
+        train = df[df['race_date_dt'] < cutoff]
+        test = df[(df['race_date_dt'] >= cutoff) & (df['race_date_dt'] < window_end)].copy()
+        if train.empty or test.empty or train['is_winner'].nunique() < 2:
+            cutoff = window_end
+            continue
+
+        full = (models is None or (full_every and step % full_every == 0)
+                or grown + warm_frac > MAX_WARM_GROWTH + 1e-9)
+        grown = 0.0 if full else grown + warm_frac
+        t0 = time.perf_counter()
+        models = fit_ensemble(train[V10_FEATURES].astype(float), train['is_winner'].astype(int),
+                              prev=None if full else models, warm_frac=warm_frac)
+        fit_s = time.perf_counter() - t0
+
+        test['prob'] = predict_ensemble(models, test[V10_FEATURES].astype(float))
+        m = score_window(test)
+        m.update({'cutoff': cutoff.strftime('%Y-%m-%d'), 'window_end': window_end.strftime('%Y-%m-%d'),
+                  'train_rows': len(train), 'test_rows': len(test),
+                  'fit': 'full' if full else 'warm', 'fit_seconds': round(fit_s, 2)})
+        rows.append(m)
+        print(f"{m['cutoff']} → {m['window_end']} | {m['fit']:4} {fit_s:6.1f}s | AUC {m['auc']:.4f} | "
+              f"Top1 %{m['top1']*100:5.1f} | Top3 %{m['top3']*100:5.1f} | "
+              f"Altılı {m['coupon_hit']*100:5.1f}% ({m['coupons']}) | Ayak {m['avg_caught']:.2f}/6")
+        cutoff = window_end
+        step += 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", required=True, help="First cutoff YYYY-MM-DD")
+    parser.add_argument("--end", help="Last window end YYYY-MM-DD (default: today)")
+    parser.add_argument("--step-days", type=int, default=7)
+    parser.add_argument("--warm-frac", type=float, default=0.2, help="Trees added per warm step (fraction of full)")
+    parser.add_argument("--full-every", type=int, default=DEFAULT_FULL_EVERY,
+                        help=f"Full retrain every K steps (0 = only when the warm trees reach {MAX_WARM_GROWTH:g}x a full fit)")
+    parser.add_argument("--refresh", action="store_true", help="Rebuild the cached dataset")
+    parser.add_argument("--csv", help="Write the metric time series as CSV")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+
+    print("\n🚶 WALK-FORWARD (Kahin Ensemble)")
+    print("=" * 70)
+    df = load_dataset(args.refresh)
+    rows = walk_forward(df, start, end, args.step_days, args.warm_frac, args.full_every)
+    if not rows:
+        print("❌ No windows with data.")
+        return
+
+    print("=" * 70)
+    aucs = [r['auc'] for r in rows if not np.isnan(r['auc'])]
+    races = sum(r['races'] for r in rows)
+    coupons = sum(r['coupons'] for r in rows)
+    print(f"Steps: {len(rows)} | Mean AUC: {np.mean(aucs) if aucs else float('nan'):.4f} | "
+          f"Top1: %{sum(r['top1']*r['races'] for r in rows)/max(races,1)*100:.1f} | "
+          f"Top3: %{sum(r['top3']*r['races'] for r in rows)/max(races,1)*100:.1f} | "
+          f"Altılı: %{sum(r['coupon_hit']*r['coupons'] for r in rows)/max(coupons,1)*100:.1f} | "
+          f"Fit time: {sum(r['fit_seconds'] for r in rows):.1f}s")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            w.writeheader()
+            w.writerows(rows)
+        print(f"✅ Time series saved: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()